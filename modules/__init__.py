@@ -40,11 +40,16 @@ for module in os.listdir("modules"):
         if hasattr(imported_module, "get_menu"):
             menu_ptr.append(imported_module.get_menu())
         if hasattr(imported_module, "run_module") and hasattr(imported_module, "get_priority"):
+            # Resources the module reads and writes, see util/modulescheduler.py
+            config_module = getattr(imported_module, f"{module}_config", None)
             run_ptr.append(
                 {
                     "run_module": imported_module.run_module,
                     "module_name": module,
                     "priority": imported_module.get_priority(),
+                    # None if the module does not declare them, it is then run after and before every other module
+                    "inputs": getattr(config_module, "inputs", None),
+                    "outputs": getattr(config_module, "outputs", None),
                 }
             )
         if hasattr(imported_module, "send_to_pelican"):
@@ -98,12 +98,10 @@ def generate_asset_md(asset, side_menu_data, notes):
         data["contributors_list"] = asset["x_mitre_contributors"]
 
     if asset.get("x_mitre_platforms"):
-        asset["x_mitre_platforms"].sort()
-        data["platforms"] = ", ".join(asset["x_mitre_platforms"])
+        data["platforms"] = ", ".join(sorted(asset["x_mitre_platforms"]))
 
     if asset.get("x_mitre_sectors"):
-        asset["x_mitre_sectors"].sort()
-        data["sectors"] = ", ".join(asset["x_mitre_sectors"])
+        data["sectors"] = ", ".join(sorted(asset["x_mitre_sectors"]))
 
     # Get initial reference list
     reference_list = {"current_number": 0}
@@ -214,8 +212,7 @@ def get_related_asset_data(related_assets):
             "name": related_asset["name"], # required
         }
         if related_asset.get("related_asset_sectors"):
-            related_asset["related_asset_sectors"].sort()
-            row["sectors"] = ", ".join(related_asset["related_asset_sectors"])
+            row["sectors"] = ", ".join(sorted(related_asset["related_asset_sectors"]))
         if related_asset.get("description"):
             row["descr"] = related_asset["description"]
         related_asset_data.append(row)
@@ -3,6 +3,9 @@ from string import Template
 module_name = "Assets"
 priority = 7.2
 
+inputs = ["stix"]
+outputs = ["content/pages/assets", "content/pages/redirects/assets", "attack-theme/templates/assets"]
+
 # Markdown path for assets
 asset_markdown_path = "content/pages/assets/"
 
@@ -19,7 +19,7 @@ def generate_benefactors():
 
     # Create directory if it does not exist
     if not os.path.isdir(benefactors_config.benefactors_markdown_path):
-        os.mkdir(benefactors_config.benefactors_markdown_path)
+        os.makedirs(benefactors_config.benefactors_markdown_path, exist_ok=True)
 
     benefactors_md = benefactors_config.benefactors_md
 
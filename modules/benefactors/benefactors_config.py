@@ -1,6 +1,9 @@
 module_name = "Benefactors"
 priority = 9
 
+inputs = []
+outputs = ["content/pages/resources/benefactors", "attack-theme/templates/benefactors"]
+
 # Markdown path for benefactors
 benefactors_markdown_path = "content/pages/resources"
 
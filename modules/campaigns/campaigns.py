@@ -71,8 +71,13 @@ def generate_markdown_files():
             md_file.write(subs)
 
         # Create the markdown for the enterprise campaigns in the STIX
-        for campaign in campaign_list:
-            generate_campaign_md(campaign, side_menu_data, notes)
+        util.pagepool.generate_pages(
+            generate_campaign_md,
+            campaign_list,
+            side_menu_data,
+            notes,
+            markdown_path=campaigns_config.campaign_markdown_path,
+        )
 
     return has_campaign
 
@@ -1,8 +1,20 @@
+import os
 from string import Template
 
+from modules import site_config
+
 module_name = "Campaigns"
 priority = 7.1
 
+# Incremental builds copy the pages that did not change from the last build, see util/buildmanifest.py
+inputs = ["stix", site_config.build_manifest_file, site_config.incremental_content_directory]
+outputs = [
+    "content/pages/campaigns",
+    "content/pages/redirects/campaigns",
+    "attack-theme/templates/campaigns",
+    os.path.join(site_config.page_inputs_directory, "campaigns"),
+]
+
 # Markdown path for campaigns
 campaign_markdown_path = "content/pages/campaigns/"
 
@@ -23,9 +23,17 @@ def clean_website_build():
             else:
                 os.remove(full_file_path)
 
-    # Remove output directory
-    if os.path.isdir(site_config.web_directory):
-        shutil.rmtree(site_config.web_directory)
+    # Remove output directory, incremental builds only render the pages that changed into it. The build manifest
+    # describes the output directory, it goes with it
+    if not site_config.args.incremental:
+        if os.path.isdir(site_config.web_directory):
+            shutil.rmtree(site_config.web_directory)
+        if os.path.isfile(site_config.build_manifest_file):
+            os.remove(site_config.build_manifest_file)
+
+    # Remove what the pages of the last build were generated with, the pages of this build record it again
+    if os.path.isdir(site_config.page_inputs_directory):
+        shutil.rmtree(site_config.page_inputs_directory)
 
     # Remove reports directory
     if os.path.isdir(site_config.test_report_directory):
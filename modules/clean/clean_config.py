@@ -1,4 +1,17 @@
 import os
 
+from modules import site_config
+
 module_name = "Clean"
 priority = 0
+
+inputs = []
+outputs = [
+    "content",
+    "output",
+    "reports",
+    "attack-theme/templates",
+    "attack-theme/static/scripts/settings.js",
+    site_config.build_manifest_file,
+    site_config.page_inputs_directory,
+]
@@ -108,12 +108,10 @@ def generate_datasource_md(datasource, side_menu_data, notes):
             data["descr"] = datasource["description"]
 
         if datasource.get("x_mitre_platforms"):
-            datasource["x_mitre_platforms"].sort()
-            data["platforms"] = ", ".join(datasource["x_mitre_platforms"])
+            data["platforms"] = ", ".join(sorted(datasource["x_mitre_platforms"]))
 
         if datasource.get("x_mitre_collection_layers"):
-            datasource["x_mitre_collection_layers"].sort()
-            data["collection_layers"] = ", ".join(datasource["x_mitre_collection_layers"])
+            data["collection_layers"] = ", ".join(sorted(datasource["x_mitre_collection_layers"]))
 
         # Get data components of data source and the technique relationships
         data["datacomponents_list"] = get_datacomponents_data(datasource, reference_list)
@@ -139,34 +137,18 @@ def get_datasources_side_nav_data(datasources):
     """Responsible for generating the links that are located on the left side of individual data sources domain pages."""
     side_nav_data = []
 
-    # Get data components of data source
+    # Get data components of data source and the domains of their detections
     datacomponent_of = rsg.get_datacomponent_of()
-    technique_to_domain = rsg.get_technique_to_domain()
     techniques_detected_by_datacomponent = rsg.get_techniques_detected_by_datacomponent()
-
-    def get_domains_of_datacomponent(datacomponent):
-        """Retrives domains of given data component"""
-        domains_of_datacomponent = []
-
-        # get data components to techniques mapping to find domains
-        techniques_of_datacomp = techniques_detected_by_datacomponent.get(datacomponent["id"])
-        if techniques_of_datacomp:
-            technique_list = {}
-            for technique_rel in techniques_of_datacomp:
-                attack_id = util.buildhelpers.get_attack_id(technique_rel["object"])
-                if attack_id:
-                    domain = technique_to_domain[attack_id].split("-")[0]
-                    if not domain in domains_of_datacomponent:
-                        domains_of_datacomponent.append(domain)
-
-        return domains_of_datacomponent
+    domains_of_datacomponents = rsg.get_domains_of_datacomponent()
+    domains_of_datasources = rsg.get_domains_of_datasource()
 
     # Loop through data sources
     for datasource in datasources:
         attack_id = util.buildhelpers.get_attack_id(datasource)
 
         if attack_id:
-            domains_of_datasource = []
+            domains_of_datasource = list(domains_of_datasources.get(datasource["id"], []))
             datasource_data = {
                 "name": datasource["name"],
                 "id": attack_id,
@@ -180,17 +162,11 @@ def get_datasources_side_nav_data(datasources):
                         # get data component detections
                         techniques_of_datacomp = techniques_detected_by_datacomponent.get(datacomponent["id"])
                         if techniques_of_datacomp:
-                            domains_of_datacomponent = get_domains_of_datacomponent(datacomponent)
-                            # Add missing domains to data source
-                            for domain in domains_of_datacomponent:
-                                if not domain in domains_of_datasource:
-                                    domains_of_datasource.append(domain)
-
                             datacomponent_data = {
                                 "name": datacomponent["name"],
                                 "id": datacomponent["name"],
                                 "path": "/datasources/{}/#{}".format(attack_id, datacomponent["name"]),
-                                "domains": domains_of_datacomponent,
+                                "domains": list(domains_of_datacomponents[datacomponent["id"]]),
                                 "children": [],
                             }
 
@@ -298,7 +274,7 @@ def get_datacomponents_data(datasource, reference_list):
                         # Get domain of technique
                         attack_id = util.buildhelpers.get_attack_id(technique_rel["object"])
                         if attack_id:
-                            domain = technique_to_domain[attack_id].split("-")[0]
+                            domain = site_config.domain_short_names[technique_to_domain[attack_id]]
                             if not domain in domains_of_datacomponent:
                                 domains_of_datacomponent.append(domain)
 
@@ -324,46 +300,7 @@ def get_datacomponents_data(datasource, reference_list):
     return datacomponents_data
 
 
-def get_domains_of_datacomponent(datacomponent, techniques_detected_by_datacomponent, technique_to_domain):
-        """Retrives domains of given data component"""
-        domains_of_datacomponent = []
-
-        # get data components to techniques mapping to find domains
-        techniques_of_datacomp = techniques_detected_by_datacomponent.get(datacomponent["id"])
-        if techniques_of_datacomp:
-            technique_list = {}
-            for technique_rel in techniques_of_datacomp:
-                attack_id = util.buildhelpers.get_attack_id(technique_rel["object"])
-                if attack_id:
-                    domain = technique_to_domain[attack_id].split("-")[0]
-                    if not domain in domains_of_datacomponent:
-                        domains_of_datacomponent.append(domain)
-
-        return domains_of_datacomponent
-
 def get_datasources_domain(datasource):
     """Responsible for generating the list of domains for the datasources and datacomponents."""
-
-    # Get data components of data source
-    datacomponent_of = rsg.get_datacomponent_of()
-    technique_to_domain = rsg.get_technique_to_domain()
-    techniques_detected_by_datacomponent = rsg.get_techniques_detected_by_datacomponent()
-
-    # Loop through data sources
-    attack_id = util.buildhelpers.get_attack_id(datasource)
-
-    if attack_id:
-        domains_of_datasource = []
-        if datacomponent_of.get(datasource["id"]):
-            for datacomponent in datacomponent_of[datasource["id"]]:
-                if not datacomponent.get("x_mitre_deprecated") and not datacomponent.get("revoked"):
-                    # get data component detections
-                    techniques_of_datacomp = techniques_detected_by_datacomponent.get(datacomponent["id"])
-                    if techniques_of_datacomp:
-                        domains_of_datacomponent = get_domains_of_datacomponent(datacomponent, techniques_detected_by_datacomponent, technique_to_domain)
-                        # Add missing domains to data source
-                        for domain in domains_of_datacomponent:
-                            if not domain in domains_of_datasource:
-                                domains_of_datasource.append(domain)
-
-    return domains_of_datasource
\ No newline at end of file
+    # Copied, the caller formats the domain names in place
+    return list(rsg.get_domains_of_datasource().get(datasource["id"], []))
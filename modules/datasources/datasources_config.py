@@ -6,6 +6,9 @@ module_tab_name = "Defenses"
 
 priority = 4.1
 
+inputs = ["stix"]
+outputs = ["content/pages/datasources", "attack-theme/templates/datasources"]
+
 # Markdown path for groups
 datasource_markdown_path = "content/pages/datasources/"
 
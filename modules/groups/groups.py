@@ -76,8 +76,9 @@ def generate_markdown_files():
             md_file.write(subs)
 
         # Create the markdown for the enterprise groups in the STIX
-        for group in group_list:
-            generate_group_md(group, side_menu_data, notes)
+        util.pagepool.generate_pages(
+            generate_group_md, group_list, side_menu_data, notes, markdown_path=groups_config.group_markdown_path
+        )
 
         generate_sidebar_groups(side_menu_data)
     return has_group
@@ -228,34 +229,18 @@ def get_techniques_used_by_group_data(group, reference_list):
     in list, add it.
     """
     technique_list = {}
+    hasInheritedTechniques = False
 
-    techniques_used_by_groups = util.relationshipgetters.get_techniques_used_by_groups()
-
-    if techniques_used_by_groups.get(group.get("id")):
-        for technique in techniques_used_by_groups[group["id"]]:
-            # Do not add if technique is deprecated
-            if not technique["object"].get("x_mitre_deprecated"):
-                technique_list = util.buildhelpers.technique_used_helper(technique_list, technique, reference_list)
-
-    # add campaign-related techniques to list
+    # techniques used by the group come first, followed by the techniques of the campaigns attributed to the group
     # if a campaign-related technique/subtechnique already exists in the list of relationships
     # with the group, the descriptions of these relationships will be concatenated with a newline
-    campaigns_attributed_to_group = {
-        "campaigns": util.relationshipgetters.get_campaigns_attributed_to_group(),
-        "techniques": util.relationshipgetters.get_techniques_used_by_campaigns(),
-    }
-    hasInheritedTechniques = False
-    if campaigns_attributed_to_group["campaigns"].get(group.get("id")):
-        for campaign in campaigns_attributed_to_group["campaigns"][group["id"]]:
-            campaign_id = campaign["object"]["id"]
-            if campaigns_attributed_to_group["techniques"].get(campaign_id):  # campaign has techniques
-                for technique in campaigns_attributed_to_group["techniques"][campaign_id]:
-                    # Do not add if technique is deprecated
-                    if not technique["object"].get("x_mitre_deprecated"):
-                        hasInheritedTechniques = True
-                        technique_list = util.buildhelpers.technique_used_helper(
-                            technique_list, technique, reference_list, True
-                        )
+    techniques_used_by_groups = util.relationshipgetters.get_techniques_used_by_groups_with_campaigns()
+    for technique, inherited, color in techniques_used_by_groups.get(group.get("id"), []):
+        if inherited:
+            hasInheritedTechniques = True
+        technique_list = util.buildhelpers.technique_used_helper(
+            technique_list, technique, reference_list, inherited, color
+        )
 
     technique_data = []
     for item in technique_list:
@@ -348,44 +333,17 @@ def get_software_table_data(group, reference_list):
     software_list = {}
     reference = False
 
-    # map for tools/malware used by groups and techniques used by malware/tools
-    tools_and_malware = [
-        {
-            "software": util.relationshipgetters.get_tools_used_by_groups(),
-            "techniques": util.relationshipgetters.get_techniques_used_by_tools(),
-        },
-        {
-            "software": util.relationshipgetters.get_malware_used_by_groups(),
-            "techniques": util.relationshipgetters.get_techniques_used_by_malware(),
-        },
-    ]
-    # get malware or tools used by group
-    software_list, reference = update_software_list(
-        tools_and_malware, software_list, reference_list, reference, group.get("id")
-    )
-
-    # campaigns attributed to groups
-    campaigns_attributed_to_group = util.relationshipgetters.get_campaigns_attributed_to_group()
-    # map for tools/malware used by campaigns
-    software_used_by_campaigns = [
-        {
-            "software": util.relationshipgetters.get_malware_used_by_campaigns(),
-            "techniques": util.relationshipgetters.get_techniques_used_by_malware(),
-        },
-        {
-            "software": util.relationshipgetters.get_tools_used_by_campaigns(),
-            "techniques": util.relationshipgetters.get_techniques_used_by_tools(),
-        },
-    ]
-
-    # get campaigns attributed to the group
-    if campaigns_attributed_to_group.get(group.get("id")):
-        for campaign in campaigns_attributed_to_group[group["id"]]:
-            campaign_id = campaign["object"]["id"]
-            # get malware or tools used by campaigns
-            software_list, reference = update_software_list(
-                software_used_by_campaigns, software_list, reference_list, reference, campaign_id
-            )
+    # techniques used by malware/tools
+    techniques_used_by_software = {
+        "tool": util.relationshipgetters.get_techniques_used_by_tools(),
+        "malware": util.relationshipgetters.get_techniques_used_by_malware(),
+    }
+    # get malware or tools used by the group, followed by those used by the campaigns attributed to the group
+    software_used_by_group = util.relationshipgetters.get_software_used_by_groups_with_campaigns().get(group.get("id"))
+    if software_used_by_group:
+        software_list, reference = update_software_list(
+            software_used_by_group, techniques_used_by_software, software_list, reference_list, reference
+        )
 
     # Moving it to an array because jinja does not like to loop through dictionaries
     data = []
@@ -400,44 +358,41 @@ def get_software_table_data(group, reference_list):
     return data, reference
 
 
-def update_software_list(pairings, software_list, reference_list, reference, id):
-    for pairing in pairings:
-        if pairing["software"].get(id):
-            for software in pairing["software"][id]:
-                software_stix_id = software["object"]["id"]
-                software_attack_id = util.buildhelpers.get_attack_id(software["object"])
-                # check if software not in software_list dict
-                if software_stix_id not in software_list and software_attack_id:
-                    software_list[software_stix_id] = {"id": software_attack_id, "name": software["object"]["name"]}
-
-                    if software["relationship"].get("description"):
-                        reference = True
-                        # Get filtered description
-                        software_list[software_stix_id]["descr"] = software["relationship"]["description"]
-                        # Update reference list
-                        reference_list = util.buildhelpers.update_reference_list(
-                            reference_list, software["relationship"]
-                        )
-
-                    # Check if techniques exists, add techniques used by software
-                    if pairing["techniques"].get(software_stix_id):
-                        if "techniques" not in software_list[software_stix_id]:
-                            software_list[software_stix_id]["techniques"] = []
-
-                        for technique in pairing["techniques"][software_stix_id]:
-                            tech_data = {}
-                            t_id = util.buildhelpers.get_attack_id(technique["object"])
-                            if t_id:
-                                if util.buildhelpers.is_sub_tid(t_id):
-                                    tech_data["parent_id"] = util.buildhelpers.get_parent_technique_id(t_id)
-                                    tech_data["id"] = util.buildhelpers.get_sub_technique_id(t_id)
-                                    tech_data["name"] = util.buildhelpers.get_technique_name(tech_data["parent_id"])
-                                    tech_data["sub_name"] = technique["object"]["name"]
-                                else:
-                                    tech_data["id"] = t_id
-                                    tech_data["name"] = technique["object"]["name"]
-
-                                software_list[software_stix_id]["techniques"].append(tech_data)
+def update_software_list(software_used, techniques_used_by_software, software_list, reference_list, reference):
+    for software, _, _ in software_used:
+        software_stix_id = software["object"]["id"]
+        software_attack_id = util.buildhelpers.get_attack_id(software["object"])
+        # check if software not in software_list dict
+        if software_stix_id not in software_list and software_attack_id:
+            software_list[software_stix_id] = {"id": software_attack_id, "name": software["object"]["name"]}
+
+            if software["relationship"].get("description"):
+                reference = True
+                # Get filtered description
+                software_list[software_stix_id]["descr"] = software["relationship"]["description"]
+                # Update reference list
+                reference_list = util.buildhelpers.update_reference_list(reference_list, software["relationship"])
+
+            # Check if techniques exists, add techniques used by software
+            techniques = techniques_used_by_software[software["object"]["type"]].get(software_stix_id)
+            if techniques:
+                if "techniques" not in software_list[software_stix_id]:
+                    software_list[software_stix_id]["techniques"] = []
+
+                for technique in techniques:
+                    tech_data = {}
+                    t_id = util.buildhelpers.get_attack_id(technique["object"])
+                    if t_id:
+                        if util.buildhelpers.is_sub_tid(t_id):
+                            tech_data["parent_id"] = util.buildhelpers.get_parent_technique_id(t_id)
+                            tech_data["id"] = util.buildhelpers.get_sub_technique_id(t_id)
+                            tech_data["name"] = util.buildhelpers.get_technique_name(tech_data["parent_id"])
+                            tech_data["sub_name"] = technique["object"]["name"]
+                        else:
+                            tech_data["id"] = t_id
+                            tech_data["name"] = technique["object"]["name"]
+
+                        software_list[software_stix_id]["techniques"].append(tech_data)
     return software_list, reference
 
 def generate_sidebar_groups(side_menu_data):
@@ -1,9 +1,21 @@
+import os
 from string import Template
 
+from modules import site_config
+
 module_name = "Groups"
 module_tab_name = "CTI"
 priority = 6
 
+# Incremental builds copy the pages that did not change from the last build, see util/buildmanifest.py
+inputs = ["stix", site_config.build_manifest_file, site_config.incremental_content_directory]
+outputs = [
+    "content/pages/groups",
+    "content/pages/redirects/groups",
+    "attack-theme/templates/groups",
+    os.path.join(site_config.page_inputs_directory, "groups"),
+]
+
 # Markdown path for groups
 group_markdown_path = "content/pages/groups/"
 
@@ -3,6 +3,9 @@ from string import Template
 module_name = "Matrices"
 priority = 2
 
+inputs = ["stix"]
+outputs = ["content/pages/matrices", "attack-theme/templates/matrices"]
+
 # Matrix markdown path
 matrix_markdown_path = "content/pages/matrices/"
 
@@ -81,8 +81,14 @@ def generate_markdown_files(domain, mitigations, side_nav_data, notes):
             md_file.write(subs)
 
         # Generates the markdown files to be used for page generation
-        for mitigation in mitigations:
-            generate_mitigation_md(mitigation, domain, side_nav_data, notes)
+        util.pagepool.generate_pages(
+            generate_mitigation_md,
+            mitigations,
+            domain,
+            side_nav_data,
+            notes,
+            markdown_path=mitigations_config.mitigation_markdown_path,
+        )
 
         return True
 
@@ -127,8 +133,7 @@ def generate_mitigation_md(mitigation, domain, side_menu_data, notes):
             data["version"] = mitigation["x_mitre_version"]
 
         if mitigation.get("labels"):
-            mitigation["labels"].sort()
-            data["security_controls"] = ", ".join(mitigation["labels"])
+            data["security_controls"] = ", ".join(sorted(mitigation["labels"]))
 
         data["techniques_addressed_data"] = get_techniques_addressed_data(mitigation, reference_list)
 
@@ -1,8 +1,19 @@
+import os
 from string import Template
 
+from modules import site_config
+
 module_name = "Mitigations"
 priority = 5
 
+# Incremental builds copy the pages that did not change from the last build, see util/buildmanifest.py
+inputs = ["stix", site_config.build_manifest_file, site_config.incremental_content_directory]
+outputs = [
+    "content/pages/mitigations",
+    "attack-theme/templates/mitigations",
+    os.path.join(site_config.page_inputs_directory, "mitigations"),
+]
+
 # Markdown path for mitigations
 mitigation_markdown_path = "content/pages/mitigations/"
 
@@ -1,2 +1,5 @@
 module_name = "random_page"
 priority = 16.1
+
+inputs = ["output"]
+outputs = ["output/random_page.json"]
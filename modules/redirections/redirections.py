@@ -15,7 +15,7 @@ def generate_redirections():
 
     # Verify if directory exists
     if not os.path.isdir(site_config.redirects_markdown_path):
-        os.mkdir(site_config.redirects_markdown_path)
+        os.makedirs(site_config.redirects_markdown_path, exist_ok=True)
 
     # Generate redirections
     util.buildhelpers.generate_redirections(
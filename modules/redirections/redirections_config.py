@@ -1,6 +1,9 @@
 module_name = "redirections"
 priority = 8.2
 
+inputs = ["stix"]
+outputs = ["content/pages/redirects/redirections"]
+
 # Resources redirection json location
 redirections_location = "modules/redirections/redirections.json"
 
@@ -22,7 +22,7 @@ def generate_resources():
 
     # Verify if resources directory exists
     if not os.path.isdir(site_config.resources_markdown_path):
-        os.mkdir(site_config.resources_markdown_path)
+        os.makedirs(site_config.resources_markdown_path, exist_ok=True)
 
     # Verify if resources directory exists
     if not os.path.isdir(resources_config.updates_markdown_path):
@@ -68,7 +68,7 @@ def copy_docs(module_docs_path):
     if os.path.isdir(module_docs_path):
         # Check that content directory exist
         if not os.path.exists(site_config.content_dir):
-            os.mkdir(site_config.content_dir)
+            os.makedirs(site_config.content_dir, exist_ok=True)
         # Check that docs directory exist
         if not os.path.exists(site_config.docs_dir):
             os.mkdir(site_config.docs_dir)
@@ -254,7 +254,7 @@ def generate_working_with_attack():
             domain=domain_name,
             version=site_config.full_attack_version,
             output_dir=docs_dir,
-            mem_store=ms[domain_name],
+            mem_store=ms[domain_name].to_memory_store(),
         )
 
     files_json = {"excel_files": []}
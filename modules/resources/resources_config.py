@@ -3,6 +3,18 @@ from modules import site_config
 module_name = "Resources"
 priority = 8
 
+inputs = ["stix", "state:resource_nav", "state:menu"]
+outputs = [
+    "content/pages/resources/resources",
+    "content/pages/updates",
+    "content/pages/redirects/resources",
+    "content/docs",
+    "output/docs",
+    "attack-theme/templates/resources",
+    "state:resource_nav",
+    "state:menu",
+]
+
 # markdown path for updates
 updates_markdown_path = "content/pages/updates/"
 
@@ -1,2 +1,5 @@
 module_name = "Search"
 priority = 17
+
+inputs = ["output"]
+outputs = ["output"]
@@ -40,6 +40,11 @@ domains = [
     {"name": "pre-attack", "location": STIX_LOCATION_PRE, "alias": "PRE-ATT&CK", "deprecated": True},
 ]
 
+# Bit of each domain in the domain membership bitmask of STIX objects
+domain_bits = {domain["name"]: 1 << index for index, domain in enumerate(domains)}
+# Short name of each domain, e.g. "enterprise" for "enterprise-attack"
+domain_short_names = {domain["name"]: domain["name"].split("-")[0] for domain in domains}
+
 # banner for the website
 default_banner_message = "This is a custom instance of the MITRE ATT&CK Website. The official website can be found at <a href='https://attack.mitre.org'>attack.mitre.org</a>."
 BANNER_ENABLED = os.getenv("BANNER_ENABLED", True)
@@ -87,6 +92,24 @@ subdirectory = ""
 # directory for data used in site builds
 data_directory = "data"
 
+# directory for the cache of loaded STIX bundles, kept between builds
+stix_cache_directory = os.getenv("STIX_CACHE_DIRECTORY", ".cache/stix")
+
+# directory for the downloaded STIX bundles and their HTTP validators, kept between builds
+stix_download_directory = os.getenv("STIX_DOWNLOAD_DIRECTORY", ".cache/downloads")
+
+# directory for the indexes of the STIX bundles of the last build and the change sets since then (changes.json)
+stix_index_directory = os.getenv("STIX_INDEX_DIRECTORY", ".cache/stix-index")
+
+# file recording the fingerprint of every page of the last build, for incremental builds (see util/buildmanifest.py)
+build_manifest_file = os.getenv("BUILD_MANIFEST_FILE", ".cache/build-manifest.json")
+
+# directory of the pages incremental builds render, where only the pages that changed since the last build are written
+incremental_content_directory = os.getenv("INCREMENTAL_CONTENT_DIRECTORY", ".cache/content")
+
+# directory where incremental builds record what the pages of every page function were generated with
+page_inputs_directory = os.getenv("PAGE_INPUTS_DIRECTORY", ".cache/page-inputs")
+
 
 def set_subdirectory(subdirectory_str):
     """Globally set the subdirectory."""
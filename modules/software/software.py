@@ -64,8 +64,13 @@ def generate_markdown_files():
             md_file.write(subs)
 
         # Create the markdown for the enterprise groups in the stix
-        for software in software_list:
-            generate_software_md(software, side_menu_data, notes)
+        util.pagepool.generate_pages(
+            generate_software_md,
+            software_list,
+            side_menu_data,
+            notes,
+            markdown_path=software_config.software_markdown_path,
+        )
 
     return has_software
 
@@ -220,27 +225,17 @@ def get_software_table_data(software_list):
 
 def get_groups_using_software(software, reference_list):
     """Given a software object, return group list with id and name of groups."""
-    if software.get("type").lower() == "malware":
-        groups_using_software = util.relationshipgetters.get_groups_using_malware().get(software["id"])
-        groups_attributed_to_campaigns = {
-            "campaigns": util.relationshipgetters.get_campaigns_using_malware(),
-            "groups": util.relationshipgetters.get_groups_attributed_to_campaigns(),
-        }
-    else:
-        groups_using_software = util.relationshipgetters.get_groups_using_tool().get(software["id"])
-        groups_attributed_to_campaigns = {
-            "campaigns": util.relationshipgetters.get_campaigns_using_tool(),
-            "groups": util.relationshipgetters.get_groups_attributed_to_campaigns(),
-        }
+    # groups using the software come first, followed by the groups attributed to the campaigns using the software
+    groups_using_software = util.relationshipgetters.get_groups_using_software_with_campaigns().get(software["id"], [])
 
     groups = []
     seen_attack_ids = {}
 
-    if groups_using_software:
-        # Get name, id of group
-        for group in groups_using_software:
-            attack_id = util.buildhelpers.get_attack_id(group["object"])
+    for group, inherited, _ in groups_using_software:
+        attack_id = util.buildhelpers.get_attack_id(group["object"])
 
+        if not inherited:
+            # Get name, id of group
             if attack_id:
                 if attack_id in seen_attack_ids:
                     software_attack_id = util.buildhelpers.get_attack_id(software)
@@ -258,39 +253,31 @@ def get_groups_using_software(software, reference_list):
 
                 seen_attack_ids[attack_id] = True
                 groups.append(row)
-
-    if groups_attributed_to_campaigns["campaigns"].get(software.get("id")):
-        # campaigns related to this software
-        for campaign in groups_attributed_to_campaigns["campaigns"][software["id"]]:
-            campaign_id = campaign["object"]["id"]
-
-            if groups_attributed_to_campaigns["groups"].get(campaign_id):
-                # groups related to this campaign
-                for group in groups_attributed_to_campaigns["groups"][campaign_id]:
-                    attack_id = util.buildhelpers.get_attack_id(group["object"])
-
-                    descr = None
-                    if group["relationship"].get("description"):
-                        descr = group["relationship"]["description"]
-                        reference_list = util.buildhelpers.update_reference_list(reference_list, group["relationship"])
-
-                    if attack_id in seen_attack_ids:
-                        # group already in table, concatenate descriptions
-                        r = next(row for row in groups if row["id"] == attack_id)
-
-                        if r["descr"] and descr:  # concatenate descriptions
-                            # get unique set of references
-                            r["descr"] = util.buildhelpers.get_reference_set([r["descr"], descr])
-                        elif descr:
-                            r["descr"] = descr
-                    else:  # new group seen, add row
-                        row = {"id": attack_id, "name": group["object"]["name"]}
-
-                        if descr:
-                            row["descr"] = descr
-
-                        seen_attack_ids[attack_id] = True
-                        groups.append(row)
+            continue
+
+        # group attributed to a campaign using the software
+        descr = None
+        if group["relationship"].get("description"):
+            descr = group["relationship"]["description"]
+            reference_list = util.buildhelpers.update_reference_list(reference_list, group["relationship"])
+
+        if attack_id in seen_attack_ids:
+            # group already in table, concatenate descriptions
+            r = next(row for row in groups if row["id"] == attack_id)
+
+            if r["descr"] and descr:  # concatenate descriptions
+                # get unique set of references
+                r["descr"] = util.buildhelpers.get_reference_set([r["descr"], descr])
+            elif descr:
+                r["descr"] = descr
+        else:  # new group seen, add row
+            row = {"id": attack_id, "name": group["object"]["name"]}
+
+            if descr:
+                row["descr"] = descr
+
+            seen_attack_ids[attack_id] = True
+            groups.append(row)
 
     return groups
 
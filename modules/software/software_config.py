@@ -1,8 +1,20 @@
+import os
 from string import Template
 
+from modules import site_config
+
 module_name = "Software"
 priority = 7
 
+# Incremental builds copy the pages that did not change from the last build, see util/buildmanifest.py
+inputs = ["stix", site_config.build_manifest_file, site_config.incremental_content_directory]
+outputs = [
+    "content/pages/software",
+    "content/pages/redirects/software",
+    "attack-theme/templates/software",
+    os.path.join(site_config.page_inputs_directory, "software"),
+]
+
 # Markdown path for software
 software_markdown_path = "content/pages/software/"
 
@@ -1,7 +1,6 @@
 import os
 import re
 
-import stix2
 from loguru import logger
 from tabulate import tabulate
 
@@ -21,20 +20,11 @@ def linkbyid_check():
         all_stix_objects.extend(stix_objects_in_domain)
 
     stix_types_that_should_have_attack_ids = (
-        # STIX 2.0
-        stix2.v20.sdo.AttackPattern,
-        stix2.v20.sdo.CourseOfAction,
-        stix2.v20.sdo.IntrusionSet,
-        stix2.v20.sdo.Malware,
-        stix2.v20.sdo.Tool,
-        # STIX 2.1
-        stix2.v21.sdo.AttackPattern,
-        stix2.v21.sdo.CourseOfAction,
-        stix2.v21.sdo.IntrusionSet,
-        stix2.v21.sdo.Malware,
-        stix2.v21.sdo.Tool,
-    )
-    custom_stix_types_that_should_have_attack_ids = (
+        "attack-pattern",
+        "course-of-action",
+        "intrusion-set",
+        "malware",
+        "tool",
         "x-mitre-data-source",
         "x-mitre-tactic",
     )
@@ -49,9 +39,7 @@ def linkbyid_check():
         stix_id_to_stix_object[_id] = stix_object
 
         external_references = stix_object.get("external_references")
-        if isinstance(stix_object, stix_types_that_should_have_attack_ids) or _id.startswith(
-            custom_stix_types_that_should_have_attack_ids
-        ):
+        if stix_object["type"] in stix_types_that_should_have_attack_ids:
             if external_references:
                 if "external_id" in external_references[0]:
                     attack_id = external_references[0]["external_id"]
@@ -89,7 +77,7 @@ def linkbyid_check():
                 attack_id = external_references[0]["external_id"]
 
         pretty_name = ""
-        if isinstance(stix_object, stix2.v21.sro.Relationship):
+        if stix_object["type"] == "relationship":
             source = stix_object["source_ref"]
             target = stix_object["target_ref"]
 
@@ -5,6 +5,9 @@ from modules import util
 module_name = "STIX Tests"
 priority = 1
 
+inputs = ["stix", "output/stix"]
+outputs = ["reports"]
+
 # Filenames for test reports
 linkbyids_report_filename = "linkbyids-report.md"
 
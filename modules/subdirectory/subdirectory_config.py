@@ -1,2 +1,5 @@
 module_name = "subdirectory"
 priority = 18
+
+inputs = ["output"]
+outputs = ["output"]
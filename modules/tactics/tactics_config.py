@@ -3,6 +3,9 @@ from string import Template
 module_name = "Tactics"
 priority = 3
 
+inputs = ["stix"]
+outputs = ["content/pages/tactics", "content/pages/redirects/tactics", "attack-theme/templates/tactics"]
+
 # Markdown path for tactics
 tactics_markdown_path = "content/pages/tactics/"
 
@@ -94,9 +94,20 @@ def generate_domain_markdown(domain, techniques_no_sub, tactics, side_nav_data,
             md_file.write(subs)
 
         # Create the markdown for techniques in the STIX
-        for technique in techniques_no_sub[domain]:
-            if "revoked" not in technique or technique["revoked"] is False:
-                generate_technique_md(technique, domain, side_nav_data, tactics[domain], notes)
+        not_revoked = [
+            technique
+            for technique in techniques_no_sub[domain]
+            if "revoked" not in technique or technique["revoked"] is False
+        ]
+        util.pagepool.generate_pages(
+            generate_technique_md,
+            not_revoked,
+            domain,
+            side_nav_data,
+            tactics[domain],
+            notes,
+            markdown_path=techniques_config.techniques_markdown_path,
+        )
 
         return True
 
@@ -114,7 +125,7 @@ def generate_technique_md(technique, domain, side_nav_data, tactic_list, notes):
         technique_dict = {}
 
         technique_dict["attack_id"] = attack_id
-        technique_dict["domain"] = domain.split("-")[0]
+        technique_dict["domain"] = site_config.domain_short_names[domain]
         technique_dict["menu"] = side_nav_data
         technique_dict["name"] = technique.get("name")
         technique_dict["notes"] = notes.get(technique["id"])
@@ -143,7 +154,7 @@ def generate_technique_md(technique, domain, side_nav_data, tactic_list, notes):
             for subtechnique in subtechniques:
                 sub_tech_dict = {}
 
-                sub_tech_dict["domain"] = domain.split("-")[0]
+                sub_tech_dict["domain"] = site_config.domain_short_names[domain]
                 sub_tech_dict["menu"] = side_nav_data
                 sub_tech_dict["parent_id"] = technique_dict["attack_id"]
                 sub_tech_dict["parent_name"] = technique.get("name")
@@ -252,24 +263,20 @@ def generate_data_for_md(technique_dict, technique, tactic_list, is_sub_techniqu
 
             # Get platforms that technique uses
             if technique.get("x_mitre_platforms"):
-                technique["x_mitre_platforms"].sort()
-                technique_dict["platforms"] = ", ".join(technique["x_mitre_platforms"])
+                technique_dict["platforms"] = ", ".join(sorted(technique["x_mitre_platforms"]))
 
             # Get system requirements
             if technique.get("x_mitre_system_requirements"):
-                technique["x_mitre_system_requirements"].sort()
-                technique_dict["sysreqs"] = ", ".join(technique["x_mitre_system_requirements"])
+                technique_dict["sysreqs"] = ", ".join(sorted(technique["x_mitre_system_requirements"]))
                 technique_dict["sysreqs"] = re.sub("\.?\\n+", "; ", technique_dict["sysreqs"])
 
             # Get permissions required
             if technique.get("x_mitre_permissions_required"):
-                technique["x_mitre_permissions_required"].sort()
-                technique_dict["perms"] = ", ".join(technique["x_mitre_permissions_required"])
+                technique_dict["perms"] = ", ".join(sorted(technique["x_mitre_permissions_required"]))
 
             # Get effective permissions
             if technique.get("x_mitre_effective_permissions"):
-                technique["x_mitre_effective_permissions"].sort()
-                technique_dict["eff_perms"] = ", ".join(technique["x_mitre_effective_permissions"])
+                technique_dict["eff_perms"] = ", ".join(sorted(technique["x_mitre_effective_permissions"]))
 
             # Get data sources and components
             (
@@ -293,23 +300,19 @@ def generate_data_for_md(technique_dict, technique, tactic_list, is_sub_techniqu
 
             # Get list of impacts
             if technique.get("x_mitre_impact_type"):
-                technique["x_mitre_impact_type"].sort()
-                technique_dict["impact_type"] = ", ".join(technique["x_mitre_impact_type"])
+                technique_dict["impact_type"] = ", ".join(sorted(technique["x_mitre_impact_type"]))
 
             # Get list of defenses bypassed
             if technique.get("x_mitre_defense_bypassed"):
-                technique["x_mitre_defense_bypassed"].sort()
-                technique_dict["def_bypass"] = ", ".join(technique["x_mitre_defense_bypassed"])
+                technique_dict["def_bypass"] = ", ".join(sorted(technique["x_mitre_defense_bypassed"]))
 
             # Get list of contributors
             if technique.get("x_mitre_contributors"):
-                technique["x_mitre_contributors"].sort()
-                technique_dict["contributors"] = "; ".join(technique["x_mitre_contributors"])
+                technique_dict["contributors"] = "; ".join(sorted(technique["x_mitre_contributors"]))
 
             # Get list of tactic types
             if technique.get("x_mitre_tactic_type"):
-                technique["x_mitre_tactic_type"].sort()
-                technique_dict["tactic_type"] = ", ".join(technique["x_mitre_tactic_type"])
+                technique_dict["tactic_type"] = ", ".join(sorted(technique["x_mitre_tactic_type"]))
 
             # Get detection data
             if technique.get("x_mitre_detection"):
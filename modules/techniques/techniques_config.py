@@ -1,8 +1,20 @@
+import os
 from string import Template
 
+from modules import site_config
+
 module_name = "Techniques"
 priority = 4
 
+# Incremental builds copy the pages that did not change from the last build, see util/buildmanifest.py
+inputs = ["stix", site_config.build_manifest_file, site_config.incremental_content_directory]
+outputs = [
+    "content/pages/techniques",
+    "content/pages/redirects/techniques",
+    "attack-theme/templates/techniques",
+    os.path.join(site_config.page_inputs_directory, "techniques"),
+]
+
 # Markdown path for techniques
 techniques_markdown_path = "content/pages/techniques/"
 
@@ -5,6 +5,9 @@ from modules import util
 module_name = "Tests"
 priority = 21
 
+inputs = ["output"]
+outputs = ["reports"]
+
 # Filenames for test reports
 citations_report_filename = "broken-citations-report.txt"
 links_report_filename = "broken-links-report.txt"
@@ -3,4 +3,7 @@ from string import Template
 module_name = "tour"
 priority = 15
 
+inputs = ["stix"]
+outputs = ["attack-theme/static/scripts/settings.js"]
+
 js_tour_settings = Template("var tour_steps = ${tour_steps};\n")
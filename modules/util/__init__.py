@@ -2,3 +2,9 @@ from . import relationshipgetters
 from . import relationshiphelpers
 from . import buildhelpers
 from . import stixhelpers
+from . import modulescheduler
+from . import pagepool
+from . import buildmanifest
+
+# Submodules used by the modules as util.<submodule>, the others are only used within util
+__all__ = ["relationshipgetters", "relationshiphelpers", "buildhelpers", "stixhelpers", "modulescheduler", "pagepool", "buildmanifest"]
@@ -35,10 +35,17 @@ def get_created_and_modified_dates(obj):
     return dates
 
 
+def parse_timestamp(date):
+    """Given a STIX timestamp string, with or without fractional seconds, return a datetime."""
+    if "." in date:
+        return datetime.datetime.strptime(date, "%Y-%m-%dT%H:%M:%S.%fZ")
+    return datetime.datetime.strptime(date, "%Y-%m-%dT%H:%M:%SZ")
+
+
 def format_date(date):
     """Given a date string, format to %d %B %Y."""
     if isinstance(date, str):
-        date = datetime.datetime.strptime(date, "%Y-%m-%dT%H:%M:%S.%fZ")
+        date = parse_timestamp(date)
 
     return ("{} {} {}").format(date.strftime("%d"), date.strftime("%B"), date.strftime("%Y"))
 
@@ -69,7 +76,7 @@ def get_first_last_seen_citations(obj):
 def format_date_as_month_year(date):
     """Given a date string, format to %B %Y."""
     if isinstance(date, str):
-        date = datetime.datetime.strptime(date, "%Y-%m-%dT%H:%M:%SZ")
+        date = parse_timestamp(date)
 
     return ("{} {}").format(date.strftime("%B"), date.strftime("%Y"))
 
@@ -90,6 +97,11 @@ def find_index_id(ext_ref):
 
 def get_attack_id(object):
     """Given an object, return attack_id."""
+    # Served from the ATT&CK ID index once the STIX bundles are loaded
+    attack_id_index = relationshipgetters.get_loaded_attack_id_index()
+    if attack_id_index and object.get("id") in attack_id_index:
+        return attack_id_index.get_attack_id(object["id"])
+
     external_references = object.get("external_references")
     if external_references:
         index = find_index_id(external_references)
@@ -351,18 +363,20 @@ def get_sub_technique_id(sub_tid):
 
 def get_technique_name(tid):
     """Given a technique id, return the technique name."""
-    technique_list = relationshipgetters.get_technique_list()
+    technique = relationshipgetters.get_attack_id_index().get_object(tid, stix_types=["attack-pattern"])
 
-    for technique in technique_list:
-        attack_id = get_attack_id(technique)
-        if attack_id == tid:
-            return technique["name"]
+    if technique:
+        return technique["name"]
 
     return util_config.NOT_FOUND
 
 
-def technique_used_helper(technique_list, technique, reference_list, inherited=False):
-    """Add technique to technique list and make distinction between techniques subtechniques."""
+def technique_used_helper(technique_list, technique, reference_list, inherited=False, color=1):
+    """Add technique to technique list and make distinction between techniques subtechniques.
+
+    color is whether the technique is used by the object (1), inherited from another (2) or both (3), see
+    relationshiphelpers.add_colors.
+    """
     attack_id = get_attack_id(technique["object"])
 
     if attack_id:
@@ -386,7 +400,7 @@ def technique_used_helper(technique_list, technique, reference_list, inherited=F
                 for subtechnique in technique_list[parent_id]["subtechniques"]:
                     # Concatenate the inherited object's description to the existing ID
                     if subtechnique["id"] == technique_data["id"] and inherited:
-                        subtechnique["color"] = 3  # belongs both to object and inherited from another
+                        subtechnique["color"] = color
                         if "descr" in technique_data and "descr" in subtechnique:
                             # add markdown newline between descriptions
                             subtechnique["descr"] += "<p>" + technique_data["descr"] + "</p>"
@@ -395,10 +409,7 @@ def technique_used_helper(technique_list, technique, reference_list, inherited=F
                         break
                 else:  # sub-technique is not in list
                     # Add subtechnique to list
-                    if inherited:
-                        technique_data["color"] = 2  # inherited from another object only
-                    else:
-                        technique_data["color"] = 1  # belongs to object only (not inherited)
+                    technique_data["color"] = color
                     technique_list[parent_id]["subtechniques"].append(technique_data)
 
                 # Sort subtechniques by name
@@ -410,7 +421,7 @@ def technique_used_helper(technique_list, technique, reference_list, inherited=F
             else:
                 # Check if technique is already in list (inherited)
                 if attack_id in technique_list:
-                    technique_list[attack_id]["color"] = 3  # belongs both to object and inherited from another
+                    technique_list[attack_id]["color"] = color
                     if "descr" in technique_data and "descr" in technique_list[attack_id]:
                         # add markdown newline between descriptions
                         technique_list[attack_id]["descr"] += "<p>" + technique_data["descr"] + "</p>"
@@ -418,10 +429,7 @@ def technique_used_helper(technique_list, technique, reference_list, inherited=F
                         technique_list[attack_id]["descr"] = technique_data["descr"]
                 else:
                     # Add technique to list
-                    if inherited:
-                        technique_data["color"] = 2  # inherited from another object only
-                    else:
-                        technique_data["color"] = 1  # belongs to object only (not inherited)
+                    technique_data["color"] = color
                     technique_list[attack_id] = technique_data
 
         # Check if parent ID was added by sub-technique
@@ -447,7 +455,7 @@ def get_technique_data_helper(attack_id, technique, reference_list):
         logger.error(f"{attack_id} not in a known domain. check your site_config")
         return {}
     technique_data["technique_used"] = True
-    technique_data["domain"] = technique_to_domain[attack_id].split("-")[0]
+    technique_data["domain"] = site_config.domain_short_names[technique_to_domain[attack_id]]
 
     if is_sub_tid(attack_id):
         technique_data["id"] = get_sub_technique_id(attack_id)
@@ -473,7 +481,7 @@ def parent_technique_used_helper(parent_id):
 
     technique_to_domain = relationshipgetters.get_technique_to_domain()
 
-    parent_data["domain"] = technique_to_domain[parent_id].split("-")[0]
+    parent_data["domain"] = site_config.domain_short_names[technique_to_domain[parent_id]]
     parent_data["id"] = parent_id
     parent_data["name"] = get_technique_name(parent_id)
     parent_data["technique_used"] = False
@@ -856,7 +864,7 @@ def generate_redirections(redirections_filename, redirect_md=None):
     if redirects:
         # Verify if redirection directory exists
         if not os.path.isdir(site_config.redirects_markdown_path):
-            os.mkdir(site_config.redirects_markdown_path)
+            os.makedirs(site_config.redirects_markdown_path, exist_ok=True)
 
         for obj in redirects:
             subs = redirect_md.substitute(obj)
@@ -869,10 +877,10 @@ def generate_redirections(redirections_filename, redirect_md=None):
 def create_content_pages_dir():
     """Create content pages directory if it does not exist."""
     if not os.path.exists(site_config.content_dir):
-        os.mkdir(site_config.content_dir)
+        os.makedirs(site_config.content_dir, exist_ok=True)
     # Check that docs directory exist
     if not os.path.exists(site_config.pages_dir):
-        os.mkdir(site_config.pages_dir)
+        os.makedirs(site_config.pages_dir, exist_ok=True)
 
 
 def move_templates(module_name, module_template_path):
@@ -0,0 +1,498 @@
+import hashlib
+import json
+import os
+import re
+from collections import defaultdict
+
+from loguru import logger
+
+from modules import site_config
+
+from . import buildhelpers, relationshipgetters, stixdiff, stixstore
+
+# Version of the layout of the build manifest, bump it whenever its keys or the fingerprints change
+MANIFEST_VERSION = 3
+
+# Extensions of the content files that are pages, other files are copied as they are by Pelican
+PAGE_EXTENSIONS = (".md",)
+
+# Files and directories, other than the pages, that every page is rendered with
+SHARED_INPUTS = ("attack-theme", "plugins", "pelicanconf.py", "custom_jinja_filters.py", "data/pelican_settings.json")
+
+# Files and directories, other than the STIX data, that the pages are generated from
+GENERATOR_INPUTS = ("modules", "data", "update-attack.py")
+
+# Command line arguments that change how the pages are generated but not what they hold
+GENERATOR_IGNORED_ARGUMENTS = (
+    "jobs",
+    "module_jobs",
+    "incremental",
+    "stix_changes",
+    "no_stix_cache",
+    "stix_cache_format",
+    "stream_stix",
+    "lazy_stix_text",
+    "offline",
+    "proxy",
+    "tests",
+    "print_tests",
+    "override_exit_status",
+)
+
+# ATT&CK IDs in the pages, sub-techniques are written T1234.001, T1234/001 in links or T1234-001 in file names
+ATTACK_ID_PATTERN = re.compile(r"\b([A-Z]{1,3}\d{4,})(?:[./-](\d{3}))?\b")
+
+# Environment variables that Pelican settings are read from, see pelicanconf.py
+PELICAN_ENVIRONMENT_PREFIX = "PELICAN_"
+
+# Environment variable naming the file with the pages Pelican writes, see pelicanconf.py
+WRITE_SELECTED_VARIABLE = "PELICAN_WRITE_SELECTED_FILE"
+
+# Pelican writes every page when none is selected, this path, that no page is saved as, is selected instead
+NOTHING_SELECTED = ".nothing-selected"
+
+
+def get_page_fingerprint(content):
+    """Return the fingerprint of the content of a page.
+
+    Pages hold everything they show, as metadata, so the fingerprint of their content is the fingerprint of the STIX
+    objects and relationships they were generated from.
+    """
+    return hashlib.sha256(content).hexdigest()
+
+
+def get_save_as(content):
+    """Return the save_as metadata of the content of a markdown page, or None."""
+    for line in content.decode("utf8").splitlines():
+        if not line.strip():
+            break
+        key, separator, value = line.partition(":")
+        if separator and key.strip().lower() == "save_as":
+            return value.strip()
+    return None
+
+
+def index_pages(content_directory):
+    """Return a dict of the path of every page under the content directory => its fingerprint and save_as."""
+    pages = {}
+    for directory, _, files in os.walk(content_directory):
+        for filename in files:
+            if not filename.endswith(PAGE_EXTENSIONS):
+                continue
+            file_path = os.path.join(directory, filename)
+            with open(file_path, "rb") as f:
+                content = f.read()
+            pages[os.path.relpath(file_path, content_directory).replace(os.sep, "/")] = {
+                "fingerprint": get_page_fingerprint(content),
+                "save_as": get_save_as(content),
+            }
+    return pages
+
+
+def index_static_files(content_directory):
+    """Return a dict of the path of every file under the content directory that is not a page => its SHA-256.
+
+    Pelican copies these files, e.g. the documents of the docs directory, without rendering them.
+    """
+    static_files = {}
+    for directory, _, files in os.walk(content_directory):
+        for filename in files:
+            if filename.endswith(PAGE_EXTENSIONS):
+                continue
+            file_path = os.path.join(directory, filename)
+            static_files[os.path.relpath(file_path, content_directory).replace(os.sep, "/")] = (
+                stixstore.get_file_sha256(file_path)
+            )
+    return static_files
+
+
+def get_file_digests(inputs):
+    """Return a dict of the path of every file of the given files and directories => its SHA-256."""
+    digests = {}
+    for path in inputs:
+        if os.path.isfile(path):
+            digests[path] = stixstore.get_file_sha256(path)
+        for directory, subdirectories, files in os.walk(path):
+            subdirectories[:] = [subdirectory for subdirectory in subdirectories if subdirectory != "__pycache__"]
+            for filename in files:
+                file_path = os.path.join(directory, filename)
+                digests[file_path.replace(os.sep, "/")] = stixstore.get_file_sha256(file_path)
+    return digests
+
+
+def get_shared_fingerprint(settings):
+    """Return the fingerprint of what every page is rendered with: templates, theme, Pelican settings and plugins.
+
+    settings is a dict of build settings that change how pages are rendered, e.g. the Pelican command line.
+    """
+    environment = {
+        key: value
+        for key, value in os.environ.items()
+        if key.startswith(PELICAN_ENVIRONMENT_PREFIX) and key != WRITE_SELECTED_VARIABLE
+    }
+    data = {
+        "version": MANIFEST_VERSION,
+        "files": get_file_digests(SHARED_INPUTS),
+        "environment": environment,
+        "settings": settings,
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def get_generator_fingerprint():
+    """Return the fingerprint of what the pages are generated with, other than the STIX data.
+
+    It covers the code and data files of the modules and the command line arguments that change what the pages
+    hold.
+    """
+    arguments = {}
+    if site_config.args:
+        arguments = {
+            key: value for key, value in vars(site_config.args).items() if key not in GENERATOR_IGNORED_ARGUMENTS
+        }
+    data = {"version": MANIFEST_VERSION, "files": get_file_digests(GENERATOR_INPUTS), "arguments": arguments}
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=repr).encode()).hexdigest()
+
+
+def get_stix_digests():
+    """Return a dict of domain name => SHA-256 of the STIX bundle the pages were generated from, or None.
+
+    The digests are those of the change sets of this build, None when they were not computed.
+    """
+    change_sets = relationshipgetters.memo.peek("stix_changes")
+    if change_sets is None:
+        return None
+    return {domain_name: change_set["sha256"] for domain_name, change_set in change_sets.items()}
+
+
+def get_manifest(settings, content_directory):
+    """Return the build manifest of the pages under the content directory, see get_shared_fingerprint for settings.
+
+    Besides the pages, it records what they were generated from, for the next build to reuse them, see
+    reuse_pages.
+    """
+    return {
+        "version": MANIFEST_VERSION,
+        "web_directory": site_config.web_directory,
+        "shared": get_shared_fingerprint(settings),
+        "pages": index_pages(content_directory),
+        "static": index_static_files(content_directory),
+        "generator": get_generator_fingerprint(),
+        "stix": get_stix_digests(),
+        "page_inputs": load_page_inputs(),
+    }
+
+
+def sync_content(content_directory, target_directory):
+    """Make the target directory a copy of the content directory, only writing the files that changed.
+
+    Files that are the same in both directories are not written again, so they keep the modification time of the
+    build that last changed them. Files and directories that are no longer in the content directory are removed.
+    Returns the number of files written and removed.
+    """
+    written = 0
+    content_files = set()
+    for directory, _, files in os.walk(content_directory):
+        for filename in files:
+            file_path = os.path.join(directory, filename)
+            relative_path = os.path.relpath(file_path, content_directory)
+            content_files.add(relative_path)
+
+            with open(file_path, "rb") as f:
+                content = f.read()
+            target_file = os.path.join(target_directory, relative_path)
+            if os.path.isfile(target_file):
+                with open(target_file, "rb") as f:
+                    if f.read() == content:
+                        continue
+
+            os.makedirs(os.path.dirname(target_file), exist_ok=True)
+            with open(target_file, "wb") as f:
+                f.write(content)
+            written += 1
+
+    removed = 0
+    for directory, _, files in os.walk(target_directory, topdown=False):
+        for filename in files:
+            file_path = os.path.join(directory, filename)
+            if os.path.relpath(file_path, target_directory) not in content_files:
+                os.remove(file_path)
+                removed += 1
+        if directory != target_directory and not os.listdir(directory):
+            os.rmdir(directory)
+
+    logger.info(f"Incremental build: {written} content files written, {removed} removed")
+    return written, removed
+
+
+def load_manifest():
+    """Return the build manifest of the last build, or None."""
+    if not os.path.exists(site_config.build_manifest_file):
+        return None
+
+    try:
+        with open(site_config.build_manifest_file, "rb") as f:
+            manifest = stixstore.load_json(f.read())
+    except ValueError as e:
+        logger.warning(f"Ignoring unreadable build manifest {site_config.build_manifest_file}: {e}")
+        return None
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(manifest):
+    """Record the build manifest of this build for the next one."""
+    stixdiff.save_json(site_config.build_manifest_file, manifest)
+
+
+def get_output_path(save_as):
+    """Return the path of the output file of a page."""
+    return os.path.join(site_config.web_directory, save_as)
+
+
+def get_render_plan(manifest):
+    """Return what an incremental build renders and removes, given the build manifest of this build.
+
+    Returns a dict with "selected", the output files of the pages to render (None to render every page), and
+    "stale", the output files of the pages of the last build that are no longer generated. A page is rendered when
+    it is new, its fingerprint or save_as changed or its output file is missing. Every page is rendered when the
+    last build has no manifest, or a different output directory or shared fingerprint. Pelican only copies the
+    static files of the content and the theme when it writes every page, so every page is rendered when a static
+    file was added, changed or removed; the theme is part of the shared fingerprint. Pages without save_as are
+    saved where Pelican decides, which is not known here, so every page is rendered when one of them changed.
+    """
+    previous = load_manifest()
+    if previous is None:
+        logger.info("Incremental build: no manifest of a previous build, rendering every page")
+        return {"selected": None, "stale": []}
+
+    current_outputs = {page["save_as"] for page in manifest["pages"].values()}
+    stale = sorted(
+        get_output_path(page["save_as"])
+        for page in previous["pages"].values()
+        if page["save_as"] and page["save_as"] not in current_outputs
+    )
+
+    if previous["web_directory"] != manifest["web_directory"]:
+        logger.info("Incremental build: the output directory changed, rendering every page")
+        return {"selected": None, "stale": []}
+    if previous["shared"] != manifest["shared"]:
+        logger.info("Incremental build: templates, theme or settings changed, rendering every page")
+        return {"selected": None, "stale": stale}
+    if previous["static"] != manifest["static"]:
+        logger.info("Incremental build: static files changed, rendering every page")
+        return {"selected": None, "stale": stale}
+
+    selected = []
+    for page_path, page in manifest["pages"].items():
+        previous_page = previous["pages"].get(page_path)
+        if (
+            previous_page
+            and previous_page == page
+            and (page["save_as"] is None or os.path.exists(get_output_path(page["save_as"])))
+        ):
+            continue
+        if page["save_as"] is None or (previous_page and previous_page["save_as"] is None):
+            logger.info(f"Incremental build: {page_path} has no save_as, rendering every page")
+            return {"selected": None, "stale": stale}
+        selected.append(get_output_path(page["save_as"]))
+
+    removed = [page for page_path, page in previous["pages"].items() if page_path not in manifest["pages"]]
+    if any(page["save_as"] is None for page in removed):
+        logger.info("Incremental build: a page without save_as was removed, rendering every page")
+        return {"selected": None, "stale": stale}
+
+    logger.info(
+        f"Incremental build: rendering {len(selected)} of {len(manifest['pages'])} pages, "
+        f"removing {len(stale)} pages no longer generated"
+    )
+    return {"selected": sorted(set(selected)), "stale": stale}
+
+
+def write_selected(selected, file_path):
+    """Write the output files Pelican writes to a file, one per line, and return its environment variable."""
+    with open(file_path, "w", encoding="utf8") as f:
+        f.write("\n".join(selected or [get_output_path(NOTHING_SELECTED)]))
+    return {WRITE_SELECTED_VARIABLE: file_path}
+
+
+def remove_outputs(output_files):
+    """Remove output files and the directories they leave empty in the output directory."""
+    web_directory = os.path.abspath(site_config.web_directory)
+    for output_file in output_files:
+        if not os.path.isfile(output_file):
+            continue
+        logger.debug(f"Removing: {output_file}")
+        os.remove(output_file)
+
+        directory = os.path.dirname(os.path.abspath(output_file))
+        while directory.startswith(f"{web_directory}{os.sep}") and not os.listdir(directory):
+            os.rmdir(directory)
+            directory = os.path.dirname(directory)
+
+
+def _expand(data):
+    """Return data with the lazy STIX objects in it as plain dicts, see record_page_inputs."""
+    if isinstance(data, stixstore.LazyStixObject):
+        data = data.to_dict()
+    if isinstance(data, dict):
+        return {key: _expand(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [_expand(value) for value in data]
+    return data
+
+
+def get_page_inputs_file(generate_page, markdown_path):
+    """Return the file recording what the pages of a page function writing to markdown_path are generated with."""
+    return os.path.join(
+        site_config.page_inputs_directory,
+        os.path.basename(os.path.normpath(markdown_path)),
+        f"{generate_page.__name__}.json",
+    )
+
+
+def record_page_inputs(generate_page, markdown_path, args):
+    """Record the digest of the arguments a page function is called with in this build, and return it.
+
+    The arguments are what every page of the function shows besides its own object, e.g. the side menu. Returns
+    None, and records nothing, when they cannot be encoded as JSON.
+    """
+    try:
+        data = json.dumps(_expand(args), sort_keys=True)
+    except TypeError:
+        return None
+    digest = hashlib.sha256(data.encode()).hexdigest()
+
+    inputs_file = get_page_inputs_file(generate_page, markdown_path)
+    digests = []
+    if os.path.exists(inputs_file):
+        with open(inputs_file, "rb") as f:
+            digests = stixstore.load_json(f.read())
+    stixdiff.save_json(inputs_file, digests + [digest])
+    return digest
+
+
+def load_page_inputs():
+    """Return a dict of page function => digests of the arguments it was called with in this build."""
+    page_inputs = {}
+    for directory, _, files in os.walk(site_config.page_inputs_directory):
+        for filename in files:
+            file_path = os.path.join(directory, filename)
+            with open(file_path, "rb") as f:
+                page_inputs[os.path.relpath(file_path, site_config.page_inputs_directory).replace(os.sep, "/")] = (
+                    stixstore.load_json(f.read())
+                )
+    return page_inputs
+
+
+def get_reuse_baseline():
+    """Return what the pages of the last build were generated from, if this build can reuse them, or None.
+
+    The pages of the last build can be reused when it was an incremental build generated with the same code, data
+    files and arguments (see get_generator_fingerprint), and the change sets of this build (see stixdiff) are
+    against the STIX bundles it was generated from. Returns a dict with the page inputs of the last build (see
+    record_page_inputs) and the STIX and ATT&CK IDs of the objects that changed since (see stixdiff.get_changed_ids).
+    """
+    previous = load_manifest()
+    if previous is None:
+        return None
+
+    change_sets = relationshipgetters.memo.peek("stix_changes")
+    if change_sets is None:
+        return None
+
+    baseline = {domain_name: change_set["previous_sha256"] for domain_name, change_set in change_sets.items()}
+    if previous["stix"] != baseline or previous["generator"] != get_generator_fingerprint():
+        logger.info("Incremental build: the STIX data or the code changed since the last build, generating every page")
+        return None
+
+    return {"page_inputs": previous["page_inputs"], "changed": stixdiff.get_changed_ids(change_sets)}
+
+
+def get_attack_ids(content, shared_values=()):
+    """Return the ATT&CK IDs in the content of a page, with the parent technique of every sub-technique.
+
+    Values of the data of the page that are one of shared_values, e.g. the side menu every page shows, are left out.
+    """
+    header, separator, data = content.partition("\ndata: ")
+    if separator:
+        try:
+            data = json.loads(data)
+        except ValueError:
+            pass
+        else:
+            if isinstance(data, dict):
+                data = {key: value for key, value in data.items() if value not in shared_values}
+            content = f"{header}{separator}{json.dumps(data)}"
+
+    attack_ids = set()
+    for attack_id, sub_number in ATTACK_ID_PATTERN.findall(content):
+        attack_ids.add(attack_id)
+        if sub_number:
+            attack_ids.add(f"{attack_id}.{sub_number}")
+    return attack_ids
+
+
+def reuse_pages(generate_page, objects, args, markdown_path):
+    """Copy the pages of the last build that would be generated the same, return the objects left to generate.
+
+    Incremental builds keep a copy of the content of the last build (see sync_content). The page of an object is
+    copied from it when the pages of the last build can be reused (see get_reuse_baseline), generate_page is called
+    with the same arguments as in the last build, and neither the object nor any object whose ATT&CK ID is in its
+    page changed since (see stixdiff.get_changed_ids), leaving out what the page shows of the arguments. The files
+    of the page of an object are the files of markdown_path named after its ATT&CK ID, e.g. G0001.md and
+    G0001-techniques-enterprise.md.
+    """
+    inputs_digest = record_page_inputs(generate_page, markdown_path, args)
+    baseline = get_reuse_baseline()
+    if not baseline:
+        return objects
+
+    inputs_file = os.path.relpath(get_page_inputs_file(generate_page, markdown_path), site_config.page_inputs_directory)
+    if inputs_digest is None or inputs_digest not in baseline["page_inputs"].get(inputs_file, []):
+        logger.info(f"Incremental build: the arguments of {generate_page.__name__} changed, generating every page")
+        return objects
+
+    previous_directory = os.path.join(
+        site_config.incremental_content_directory, os.path.relpath(markdown_path, site_config.content_dir)
+    )
+    previous_files = defaultdict(list)
+    if os.path.isdir(previous_directory):
+        for filename in os.listdir(previous_directory):
+            if filename.endswith(PAGE_EXTENSIONS):
+                previous_files[filename.split("-")[0].split(".")[0]].append(filename)
+
+    changed_stix_ids, changed_attack_ids = baseline["changed"]
+    shared_values = json.loads(json.dumps(_expand(args)))
+    pages = defaultdict(list)
+    for stix_obj in objects:
+        pages[buildhelpers.get_attack_id(stix_obj)].append(stix_obj)
+
+    reused = set()
+    for attack_id, page_objects in pages.items():
+        filenames = previous_files.get(attack_id, [])
+        if f"{attack_id}.md" not in filenames or attack_id in changed_attack_ids:
+            continue
+        if any(stix_obj["id"] in changed_stix_ids for stix_obj in page_objects):
+            continue
+
+        contents = {}
+        for filename in filenames:
+            with open(os.path.join(previous_directory, filename), "rb") as f:
+                contents[filename] = f.read()
+        if any(
+            get_attack_ids(content.decode("utf8"), shared_values) & changed_attack_ids for content in contents.values()
+        ):
+            continue
+
+        for filename, content in contents.items():
+            with open(os.path.join(markdown_path, filename), "wb") as f:
+                f.write(content)
+        reused.add(attack_id)
+
+    logger.info(
+        f"Incremental build: reused {len(reused)} of {len(pages)} {generate_page.__name__} pages of the last build"
+    )
+    return [stix_obj for stix_obj in objects if buildhelpers.get_attack_id(stix_obj) not in reused]
@@ -0,0 +1,644 @@
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+from loguru import logger
+from stix2 import MemoryStore
+from stix2.datastore.filters import FilterSet, apply_common_filters
+
+from modules import site_config
+
+from . import stixstore
+from .relationshiphelpers import RelationshipGraph
+
+# Identifies graph files, followed by the layout version
+GRAPH_FILE_MAGIC = b"ATKGRPH2"
+
+# Length of the JSON header, which follows the magic
+HEADER_LENGTH = struct.Struct("<Q")
+
+# Alignment of the sections in the file, so the NumPy arrays mapped from them are aligned
+SECTION_ALIGNMENT = 64
+
+# Flags of the object table
+REVOKED = 1
+DEPRECATED = 2
+
+# Marks a missing string, row, node or store in the integer columns
+NONE = -1
+
+# Marks a STIX ID that is not in the ATT&CK ID index, as opposed to one that is indexed without an ATT&CK ID
+NOT_INDEXED = -2
+
+
+class GraphFileWriter:
+    """Build the sections of a graph file from the loaded stores, relationship graph and ATT&CK ID index.
+
+    Every string (STIX ID, type, ATT&CK ID, relationship type) is stored once in a string table sorted by its UTF-8
+    bytes, and referenced everywhere else by its index in that table. Each domain has an object table (one NumPy
+    column per property, one row per object in store order) and the JSON of its objects concatenated in a text
+    blob, with the rows sorted by relationship type, source_ref and target_ref to look relationships up by them.
+    The relationship graph is stored as its CSR columns, with the (domain, row) of every node object and edge
+    relationship. The ATT&CK ID index is stored as the ordered (domain, row) candidates of every ATT&CK ID.
+    """
+
+    def __init__(self, ms, relationship_graph, attack_id_index):
+        self.ms = ms
+        self.relationship_graph = relationship_graph
+        self.attack_id_index = attack_id_index
+        self.domains = list(ms)
+
+        # (domain, row) of every object, by object: objects are shared between the stores, graph and index
+        self.object_refs = {}
+        for store_index, domain_name in enumerate(self.domains):
+            for row, stix_obj in enumerate(ms[domain_name].get_all()):
+                self.object_refs[id(stix_obj)] = (store_index, row)
+
+        self.strings = self._collect_strings()
+        self.string_index = {string: i for i, string in enumerate(self.strings)}
+        self.sections = {}
+
+    def _collect_strings(self):
+        strings = set()
+        for store in self.ms.values():
+            for stix_obj in store.get_all():
+                strings.update((stix_obj["id"], stix_obj["type"]))
+                if stix_obj["type"] == "relationship":
+                    strings.update((stix_obj["relationship_type"], stix_obj["source_ref"], stix_obj["target_ref"]))
+                elif store.get_attack_id(stix_obj["id"]):
+                    strings.add(store.get_attack_id(stix_obj["id"]))
+        strings.update(self.relationship_graph.node_ids)
+        return sorted(strings, key=lambda string: string.encode())
+
+    def _ref(self, string):
+        return NONE if string is None else self.string_index[string]
+
+    def _object_ref(self, stix_obj):
+        return self.object_refs[id(stix_obj)]
+
+    def build(self):
+        """Return a dict of section name => NumPy array and a dict of header metadata."""
+        encoded = [string.encode() for string in self.strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(string) for string in encoded], out=offsets[1:])
+        self.sections["strings.offsets"] = offsets
+        self.sections["strings.data"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+        for store_index, domain_name in enumerate(self.domains):
+            self._build_store(store_index, domain_name)
+        self._build_graph()
+        self._build_attack_id_index()
+
+        metadata = {
+            "loader_version": stixstore.LOADER_VERSION,
+            "domains": self.domains,
+            "domain_bits": site_config.domain_bits,
+            "graph_keys": [list(key) for key in self.relationship_graph.keys],
+            "contributors": [self.ms[domain_name].get_contributors() for domain_name in self.domains],
+        }
+        return self.sections, metadata
+
+    def _build_store(self, store_index, domain_name):
+        store = self.ms[domain_name]
+        stix_objs = store.get_all()
+        rows = {stix_obj["id"]: row for row, stix_obj in enumerate(stix_objs)}
+
+        columns = {
+            name: np.full(len(stix_objs), NONE, dtype=np.int32)
+            for name in ("id", "type", "attack_id", "relationship_type", "source_ref", "target_ref", "replacement")
+        }
+        flags = np.zeros(len(stix_objs), dtype=np.uint8)
+        domain_masks = np.zeros(len(stix_objs), dtype=np.int64)
+        blobs = []
+
+        for row, stix_obj in enumerate(stix_objs):
+            stix_id = stix_obj["id"]
+            columns["id"][row] = self._ref(stix_id)
+            columns["type"][row] = self._ref(stix_obj["type"])
+            columns["attack_id"][row] = self._ref(store.get_attack_id(stix_id))
+            if stix_obj["type"] == "relationship":
+                for name in ("relationship_type", "source_ref", "target_ref"):
+                    columns[name][row] = self._ref(stix_obj[name])
+
+            replacement = store.get_replacement(stix_id)
+            if replacement is not None:
+                columns["replacement"][row] = rows[replacement["id"]]
+
+            flags[row] = (REVOKED if store.is_revoked(stix_id) else 0) | (
+                DEPRECATED if store.is_deprecated(stix_id) else 0
+            )
+            domain_masks[row] = stixstore.get_domain_mask(stix_obj.get("x_mitre_domains"))
+            blobs.append(stixstore.dump_json(stix_obj))
+
+        row_by_string = np.full(len(self.strings), NONE, dtype=np.int32)
+        row_by_string[columns["id"]] = np.arange(len(stix_objs), dtype=np.int32)
+
+        # Rows sorted by each relationship column, rows of other objects (NONE) first and rows with the same value in
+        # store order, so the rows of a value are a contiguous range found by binary search
+        sorted_rows = {
+            name: np.argsort(columns[name], kind="stable").astype(np.int32)
+            for name in ("relationship_type", "source_ref", "target_ref")
+        }
+
+        blob_offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+        np.cumsum([len(blob) for blob in blobs], out=blob_offsets[1:])
+
+        prefix = f"stores.{store_index}."
+        for name, column in columns.items():
+            self.sections[f"{prefix}{name}"] = column
+        for name, rows in sorted_rows.items():
+            self.sections[f"{prefix}rows_by_{name}"] = rows
+        self.sections[f"{prefix}flags"] = flags
+        self.sections[f"{prefix}domain_mask"] = domain_masks
+        self.sections[f"{prefix}row_by_string"] = row_by_string
+        self.sections[f"{prefix}blob_offsets"] = blob_offsets
+        self.sections[f"{prefix}blobs"] = np.frombuffer(b"".join(blobs), dtype=np.uint8)
+
+    def _build_graph(self):
+        graph = self.relationship_graph
+
+        node_ids = np.array([self._ref(node_id) for node_id in graph.node_ids], dtype=np.int32)
+        node_by_string = np.full(len(self.strings), NONE, dtype=np.int32)
+        node_by_string[node_ids] = np.arange(len(node_ids), dtype=np.int32)
+
+        node_objects = np.full((len(node_ids), 2), NONE, dtype=np.int32)
+        for node, node_id in enumerate(graph.node_ids):
+            if node_id in graph.objects:
+                node_objects[node] = self._object_ref(graph.objects[node_id])
+
+        edge_relationships = np.array(
+            [self._object_ref(relationship) for relationship in graph.relationships], dtype=np.int32
+        ).reshape(-1, 2)
+
+        self.sections.update(
+            {
+                "graph.node_ids": node_ids,
+                "graph.node_by_string": node_by_string,
+                "graph.node_objects": node_objects,
+                "graph.edge_relationships": edge_relationships,
+                "graph.edge_source": graph.edge_source,
+                "graph.edge_target": graph.edge_target,
+                "graph.edge_key": graph.edge_key,
+                "graph.edge_flags": graph.edge_flags,
+                "graph.node_resolved": graph.node_resolved,
+                "graph.forward_order": graph.forward_order,
+                "graph.forward_offsets": graph.forward_offsets,
+                "graph.reverse_order": graph.reverse_order,
+                "graph.reverse_offsets": graph.reverse_offsets,
+            }
+        )
+
+    def _build_attack_id_index(self):
+        stix_attack_ids = np.full(len(self.strings), NOT_INDEXED, dtype=np.int32)
+        for stix_id, attack_id in self.attack_id_index.iter_stix_ids():
+            stix_attack_ids[self._ref(stix_id)] = self._ref(attack_id)
+
+        offsets = np.zeros(len(self.strings) + 1, dtype=np.int64)
+        counts = np.zeros(len(self.strings), dtype=np.int64)
+        members = []
+        for attack_id, stix_objs in sorted(self.attack_id_index.iter_attack_ids(), key=lambda item: self._ref(item[0])):
+            counts[self._ref(attack_id)] = len(stix_objs)
+            members.extend(self._object_ref(stix_obj) for stix_obj in stix_objs)
+        np.cumsum(counts, out=offsets[1:])
+
+        self.sections["attack_ids.stix_attack_id"] = stix_attack_ids
+        self.sections["attack_ids.offsets"] = offsets
+        self.sections["attack_ids.members"] = np.array(members, dtype=np.int32).reshape(-1, 2)
+
+
+def _align(offset):
+    return -(-offset // SECTION_ALIGNMENT) * SECTION_ALIGNMENT
+
+
+def write_graph_file(file_path, ms, relationship_graph, attack_id_index):
+    """Write the loaded stores of every domain, their relationship graph and ATT&CK ID index to a graph file.
+
+    The file is opened again, without parsing any JSON bundle, with open_graph_file.
+    """
+    sections, metadata = GraphFileWriter(ms, relationship_graph, attack_id_index).build()
+
+    # The header holds the offset of every section, which depends on the length of the header: lay the sections out
+    # after a header of the same length with placeholder offsets, then fill in the actual offsets
+    layout = {name: [0, str(array.dtype), list(array.shape)] for name, array in sections.items()}
+    header = json.dumps({**metadata, "sections": layout}).encode()
+    header_space = len(header) + 32 * len(sections)
+    offset = _align(len(GRAPH_FILE_MAGIC) + HEADER_LENGTH.size + header_space)
+    for name, array in sections.items():
+        layout[name][0] = offset
+        offset = _align(offset + array.nbytes)
+    header = json.dumps({**metadata, "sections": layout}).encode()
+    assert len(header) <= header_space
+
+    tmp_file = f"{file_path}.tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(GRAPH_FILE_MAGIC)
+        f.write(HEADER_LENGTH.pack(len(header)))
+        f.write(header)
+        for name, array in sections.items():
+            f.write(b"\0" * (layout[name][0] - f.tell()))
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(tmp_file, file_path)
+
+    logger.debug(f"Wrote STIX graph file {file_path} ({offset / 2**20:.1f} MiB)")
+
+
+def open_graph_file(file_path):
+    """Open a graph file written by write_graph_file.
+
+    Return a dict with the stores of every domain ("ms", domain name => MappedStixStore), the relationship graph
+    ("relationship_graph") and the ATT&CK ID index ("attack_id_index"), all read lazily from the mapped file.
+    Opening only reads the header, so it takes the same time whatever the size of the bundles.
+    """
+    graph_file = GraphFile(file_path)
+    return {
+        "ms": {
+            domain_name: MappedStixStore(graph_file, store_index)
+            for store_index, domain_name in enumerate(graph_file.domains)
+        },
+        "relationship_graph": MappedRelationshipGraph(graph_file),
+        "attack_id_index": MappedAttackIdIndex(graph_file),
+    }
+
+
+class GraphFile:
+    """A graph file mapped in memory, with the decoded strings and objects read from it so far.
+
+    Sections are read-only NumPy views of the mapping. Strings and objects are decoded on first use and kept, so
+    the objects returned for the same row are the same dict. Pickles as its path and is mapped again on unpickling.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        with open(file_path, "rb") as f:
+            self._mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mapped[: len(GRAPH_FILE_MAGIC)] != GRAPH_FILE_MAGIC:
+            raise ValueError(f"{file_path} is not a STIX graph file")
+
+        (header_length,) = HEADER_LENGTH.unpack_from(self._mapped, len(GRAPH_FILE_MAGIC))
+        header_offset = len(GRAPH_FILE_MAGIC) + HEADER_LENGTH.size
+        header = json.loads(self._mapped[header_offset : header_offset + header_length])
+        if header["loader_version"] != stixstore.LOADER_VERSION:
+            raise ValueError(
+                f"{file_path} was written by loader version {header['loader_version']}, "
+                f"expected {stixstore.LOADER_VERSION}"
+            )
+
+        self.domains = header["domains"]
+        self.domain_bits = header["domain_bits"]
+        self.graph_keys = [tuple(key) for key in header["graph_keys"]]
+        self.contributors = header["contributors"]
+        self._layout = header["sections"]
+        self._sections = {}
+
+        self._string_offsets = self.section("strings.offsets")
+        self._string_data = self.section("strings.data")
+        self._strings = {}
+        self._objects = [{} for _ in self.domains]
+
+    def __reduce__(self):
+        return (GraphFile, (self.file_path,))
+
+    def section(self, name):
+        """Return the NumPy array of a section."""
+        array = self._sections.get(name)
+        if array is None:
+            offset, dtype, shape = self._layout[name]
+            count = int(np.prod(shape))
+            if count:
+                array = np.frombuffer(self._mapped, dtype=dtype, count=count, offset=offset).reshape(shape)
+            else:
+                # Empty sections may be laid out past the end of the file
+                array = np.empty(shape, dtype=dtype)
+            self._sections[name] = array
+        return array
+
+    def get_string(self, index):
+        """Return the string at an index of the string table, or None for NONE."""
+        index = int(index)
+        if index < 0:
+            return None
+        string = self._strings.get(index)
+        if string is None:
+            start, end = self._string_offsets[index], self._string_offsets[index + 1]
+            string = self._strings[index] = self._string_data[start:end].tobytes().decode()
+        return string
+
+    def find_string(self, string):
+        """Return the index of a string in the string table, or NONE. A binary search on the sorted UTF-8 bytes."""
+        if string is None:
+            return NONE
+        encoded = string.encode()
+        low, high = 0, len(self._string_offsets) - 1
+        while low < high:
+            middle = (low + high) // 2
+            start, end = self._string_offsets[middle], self._string_offsets[middle + 1]
+            if self._string_data[start:end].tobytes() < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self._string_offsets) - 1 and self.get_string(low) == string:
+            return low
+        return NONE
+
+    def get_object(self, store_index, row):
+        """Return the object at a row of the object table of a domain, decoding it on first use."""
+        objects = self._objects[store_index]
+        stix_obj = objects.get(row)
+        if stix_obj is None:
+            offsets = self.section(f"stores.{store_index}.blob_offsets")
+            blob = self.section(f"stores.{store_index}.blobs")[offsets[row] : offsets[row + 1]]
+            stix_obj = objects[row] = stixstore.load_json(blob.tobytes())
+        return stix_obj
+
+
+class MappedStixStore:
+    """Read-only StixStore of one domain of a graph file, answering the same queries from the object table.
+
+    Queries select rows with the NumPy columns of the object table and only decode the objects they return. Rows
+    are in the order of the store that was written, so results come in the same order as from that StixStore.
+    """
+
+    lazy = False
+
+    def __init__(self, graph_file, store_index):
+        self._graph_file = graph_file
+        self._store_index = store_index
+        self._lists = {}
+
+        prefix = f"stores.{store_index}."
+        for name in (
+            "id",
+            "type",
+            "attack_id",
+            "relationship_type",
+            "source_ref",
+            "target_ref",
+            "replacement",
+            "flags",
+            "domain_mask",
+            "row_by_string",
+            "rows_by_relationship_type",
+            "rows_by_source_ref",
+            "rows_by_target_ref",
+        ):
+            setattr(self, f"_{name}", graph_file.section(f"{prefix}{name}"))
+
+    def __reduce__(self):
+        return (MappedStixStore, (self._graph_file, self._store_index))
+
+    def _find_row(self, stix_id):
+        string = self._graph_file.find_string(stix_id)
+        if string == NONE:
+            return NONE
+        return int(self._row_by_string[string])
+
+    def _get_objects(self, rows, include_revoked=True):
+        if not include_revoked:
+            rows = rows[(self._flags[rows] & REVOKED) == 0]
+        return [self._graph_file.get_object(self._store_index, row) for row in rows.tolist()]
+
+    def _get_cached(self, key, select):
+        # Lists are built once and copied for the caller, as StixStore returns new lists
+        if key not in self._lists:
+            self._lists[key] = select()
+        return list(self._lists[key])
+
+    def _type_rows(self, stix_type):
+        return np.flatnonzero(self._type == self._graph_file.find_string(stix_type))
+
+    def __len__(self):
+        return len(self._id)
+
+    def __contains__(self, stix_id):
+        return self._find_row(stix_id) != NONE
+
+    def get(self, stix_id):
+        """Return the object with the given STIX ID, or None if it is not in the store."""
+        row = self._find_row(stix_id)
+        if row == NONE:
+            return None
+        return self._graph_file.get_object(self._store_index, row)
+
+    def get_attack_id(self, stix_id):
+        """Return the ATT&CK ID of the object with the given STIX ID, or None."""
+        row = self._find_row(stix_id)
+        if row == NONE:
+            return None
+        return self._graph_file.get_string(int(self._attack_id[row]))
+
+    def get_all(self, include_revoked=True):
+        """Return every object in the store."""
+        return self._get_cached(
+            ("all", include_revoked), lambda: self._get_objects(np.arange(len(self._id)), include_revoked)
+        )
+
+    def get_contributors(self):
+        """Return a dict of contributor name => STIX IDs of the objects crediting them, from the file header."""
+        return {name: list(stix_ids) for name, stix_ids in self._graph_file.contributors[self._store_index].items()}
+
+    def get_by_type(self, stix_type, include_revoked=True):
+        """Return the objects of the given STIX type."""
+        return self._get_cached(
+            ("type", stix_type, include_revoked), lambda: self._get_objects(self._type_rows(stix_type), include_revoked)
+        )
+
+    def get_by_attack_id(self, attack_id, include_revoked=True):
+        """Return the objects that have the given ATT&CK ID."""
+        string = self._graph_file.find_string(attack_id)
+        if string == NONE:
+            return []
+        return self._get_objects(np.flatnonzero(self._attack_id == string), include_revoked)
+
+    def get_by_domain(self, stix_type, domain_name, include_revoked=True):
+        """Return the objects of the given STIX type that belong to the given domain.
+
+        The list is built once per type and domain and shared between callers, who must not modify it.
+        """
+        key = ("domain", stix_type, domain_name, include_revoked)
+        if key not in self._lists:
+            rows = self._type_rows(stix_type)
+            rows = rows[(self._domain_mask[rows] & self._graph_file.domain_bits[domain_name]) != 0]
+            self._lists[key] = self._get_objects(rows, include_revoked)
+        return self._lists[key]
+
+    def in_domain(self, stix_id, domain_name):
+        """Return True if the object with the given STIX ID belongs to the given domain."""
+        row = self._find_row(stix_id)
+        if row == NONE:
+            return False
+        return bool(self._domain_mask[row] & self._graph_file.domain_bits[domain_name])
+
+    def get_merged(self, types):
+        """Return the objects of the given STIX types, deduplicated by STIX and ATT&CK ID (see merge_objects)."""
+        types = tuple(types)
+        return self._get_cached(("merged", types), lambda: stixstore.merge_objects([self], type_groups=[types])[types])
+
+    def get_relationships(self, relationship_type=None, source_ref=None, target_ref=None, include_revoked=True):
+        """Return the relationships matching the given relationship type, source_ref and target_ref.
+
+        Parameters that are None are not filtered on. Like StixStore, the rows of the most selective criterion are
+        looked up in its sorted rows and the remaining criteria are checked on these rows only.
+        """
+        criteria = [
+            (column, sorted_rows, self._graph_file.find_string(value))
+            for column, sorted_rows, value in (
+                (self._source_ref, self._rows_by_source_ref, source_ref),
+                (self._target_ref, self._rows_by_target_ref, target_ref),
+                (self._relationship_type, self._rows_by_relationship_type, relationship_type),
+            )
+            if value
+        ]
+        if not criteria:
+            return self._get_objects(self._type_rows("relationship"), include_revoked)
+        if any(string == NONE for _, _, string in criteria):
+            return []
+
+        column, sorted_rows, string = criteria[0]
+        start = column.searchsorted(string, side="left", sorter=sorted_rows)
+        end = column.searchsorted(string, side="right", sorter=sorted_rows)
+        rows = sorted_rows[start:end]
+        for column, _, string in criteria[1:]:
+            rows = rows[column[rows] == string]
+
+        return self._get_objects(rows, include_revoked)
+
+    def get_replacement(self, stix_id):
+        """Return the object that finally replaces the revoked object with the given STIX ID, or None."""
+        row = self._find_row(stix_id)
+        if row == NONE or self._replacement[row] == NONE:
+            return None
+        return self._graph_file.get_object(self._store_index, int(self._replacement[row]))
+
+    def is_revoked(self, stix_id):
+        """Return True if the object with the given STIX ID is revoked."""
+        row = self._find_row(stix_id)
+        return row != NONE and bool(self._flags[row] & REVOKED)
+
+    def is_deprecated(self, stix_id):
+        """Return True if the object with the given STIX ID is deprecated."""
+        row = self._find_row(stix_id)
+        return row != NONE and bool(self._flags[row] & DEPRECATED)
+
+    def query(self, query=None):
+        """Return the objects matching a list of stix2.Filter, for compatibility with stix2.MemoryStore.query."""
+        query = FilterSet(query)
+
+        candidates = None
+        for _filter in query:
+            if _filter.op == "=" and _filter.property == "id":
+                stix_obj = self.get(_filter.value)
+                candidates = [stix_obj] if stix_obj else []
+                break
+            if _filter.op == "=" and _filter.property == "type":
+                candidates = self.get_by_type(_filter.value)
+
+        if candidates is None:
+            candidates = self.get_all()
+
+        return list(apply_common_filters(candidates, query))
+
+    def to_memory_store(self):
+        """Return a stix2.MemoryStore holding the objects of the store, for libraries that expect stix2 objects."""
+        return MemoryStore(stix_data=self.get_all(), allow_custom=True)
+
+
+class MappedRelationshipGraph(RelationshipGraph):
+    """RelationshipGraph read from a graph file: the CSR columns are mapped, nodes and objects resolved lazily."""
+
+    def __init__(self, graph_file):
+        self._graph_file = graph_file
+        self._views = {}
+        self.keys = graph_file.graph_keys
+        self.key_index = {key: i for i, key in enumerate(self.keys)}
+
+        self._node_ids = graph_file.section("graph.node_ids")
+        self._node_by_string = graph_file.section("graph.node_by_string")
+        self._node_objects = graph_file.section("graph.node_objects")
+        self._edge_relationships = graph_file.section("graph.edge_relationships")
+        for name in (
+            "edge_source",
+            "edge_target",
+            "edge_key",
+            "edge_flags",
+            "node_resolved",
+            "forward_order",
+            "forward_offsets",
+            "reverse_order",
+            "reverse_offsets",
+        ):
+            setattr(self, name, graph_file.section(f"graph.{name}"))
+
+    def __reduce__(self):
+        return (MappedRelationshipGraph, (self._graph_file,))
+
+    def _find_node(self, stix_id):
+        string = self._graph_file.find_string(stix_id)
+        if string == NONE or self._node_by_string[string] == NONE:
+            return None
+        return int(self._node_by_string[string])
+
+    def _get_node_id(self, node):
+        return self._graph_file.get_string(int(self._node_ids[node]))
+
+    def _get_node_object(self, node):
+        store_index, row = self._node_objects[node].tolist()
+        return self._graph_file.get_object(store_index, row)
+
+    def _get_relationship(self, edge):
+        store_index, row = self._edge_relationships[edge].tolist()
+        return self._graph_file.get_object(store_index, row)
+
+
+class MappedAttackIdIndex:
+    """AttackIdIndex read from a graph file, with the candidates of every ATT&CK ID in their order of preference."""
+
+    def __init__(self, graph_file):
+        self._graph_file = graph_file
+        self._stix_attack_ids = graph_file.section("attack_ids.stix_attack_id")
+        self._offsets = graph_file.section("attack_ids.offsets")
+        self._members = graph_file.section("attack_ids.members")
+
+    def __reduce__(self):
+        return (MappedAttackIdIndex, (self._graph_file,))
+
+    def _get_objects(self, attack_id):
+        string = self._graph_file.find_string(attack_id)
+        if string == NONE:
+            return []
+        members = self._members[self._offsets[string] : self._offsets[string + 1]].tolist()
+        return [self._graph_file.get_object(store_index, row) for store_index, row in members]
+
+    def __contains__(self, stix_id):
+        string = self._graph_file.find_string(stix_id)
+        return string != NONE and self._stix_attack_ids[string] != NOT_INDEXED
+
+    def get_attack_id(self, stix_id):
+        """Return the ATT&CK ID of the object with the given STIX ID, or None."""
+        string = self._graph_file.find_string(stix_id)
+        if string == NONE:
+            return None
+        return self._graph_file.get_string(int(self._stix_attack_ids[string]))
+
+    def get_stix_ids(self, attack_id):
+        """Return the STIX IDs of the objects that have the given ATT&CK ID."""
+        return list(dict.fromkeys(stix_obj["id"] for stix_obj in self._get_objects(attack_id)))
+
+    def get_object(self, attack_id, stix_types=None, include_revoked=False):
+        """Return the preferred object with the given ATT&CK ID and one of the given STIX types, or None."""
+        for stix_obj in self._get_objects(attack_id):
+            if stix_types and stix_obj["type"] not in stix_types:
+                continue
+            if not include_revoked and stix_obj.get("revoked"):
+                continue
+            return stix_obj
+        return None
+
+    def get_name(self, attack_id, stix_types=None):
+        """Return the name of the preferred object with the given ATT&CK ID, or None."""
+        stix_obj = self.get_object(attack_id, stix_types=stix_types)
+        if stix_obj:
+            return stix_obj.get("name")
+        return None
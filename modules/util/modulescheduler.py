@@ -0,0 +1,324 @@
+import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from loguru import logger
+from tabulate import tabulate
+
+import modules
+from modules import site_config
+
+from . import buildhelpers, relationshipgetters, sharedsnapshot, stixdiff
+
+# Modules declare the resources they read and write (inputs and outputs in their config), so modules that share none of
+# them can run at the same time (see conflicts). Resources are paths relative to the root of the repository, a
+# directory standing for everything in it. A module writing its own files into a directory other modules write to
+# declares a path in it named after the module, e.g. "content/pages/redirects/groups". A module that declares neither
+# runs alone.
+
+# Resource of the loaded STIX data and the datasets derived from it, see relationshipgetters
+STIX = "stix"
+
+# Prefix of resources that live in the memory of the build process (e.g. "state:resource_nav"), modules that read or
+# write one of them always run in the main process
+STATE_PREFIX = "state:"
+
+# Name of the task that loads the STIX data, scheduled before the first module that reads it
+STIX_TASK = "stix"
+
+
+def normalize_resource(resource):
+    """Return a resource name without "./" and trailing slashes, so equal paths have equal names."""
+    if resource.startswith(STATE_PREFIX):
+        return resource
+    return os.path.normpath(resource).replace(os.sep, "/")
+
+
+def overlaps(resource, other):
+    """Return True if two resources are the same or one is a directory containing the other."""
+    return resource == other or resource.startswith(f"{other}/") or other.startswith(f"{resource}/")
+
+
+def any_overlap(resources, others):
+    """Return True if any resource of the first list overlaps with any resource of the second list."""
+    return any(overlaps(resource, other) for resource in resources for other in others)
+
+
+def conflicts(task, later_task):
+    """Return True if later_task has to wait for task, which comes first in priority order.
+
+    A module waits for an earlier module when it reads what the earlier module writes, writes what the earlier
+    module reads or writes the same thing. A module that does not declare its inputs and outputs waits for, and is
+    waited for by, every other module.
+    """
+    if task["inputs"] is None or later_task["inputs"] is None:
+        return True
+    return (
+        any_overlap(task["outputs"], later_task["inputs"])
+        or any_overlap(task["outputs"], later_task["outputs"])
+        or any_overlap(task["inputs"], later_task["outputs"])
+    )
+
+
+def get_tasks(run_ptr):
+    """Return the tasks to schedule for the modules of run_ptr, in priority order.
+
+    Tasks are dicts with the name, priority, run function, inputs and outputs of a module. When a module reads the
+    STIX data, a task loading it is inserted before the first such module, so the bundles are loaded once, after
+    clean and in the main process.
+    """
+    tasks = []
+    for module in sorted(run_ptr, key=lambda k: k["priority"]):
+        inputs = module.get("inputs")
+        outputs = module.get("outputs")
+        tasks.append(
+            {
+                "name": module["module_name"],
+                "priority": module["priority"],
+                "run_module": module["run_module"],
+                "inputs": None if inputs is None else [normalize_resource(resource) for resource in inputs],
+                "outputs": None if outputs is None else [normalize_resource(resource) for resource in outputs],
+            }
+        )
+
+    for index, task in enumerate(tasks):
+        if task["inputs"] is None or STIX in task["inputs"]:
+            stix_task = {
+                "name": STIX_TASK,
+                "priority": task["priority"],
+                "run_module": None,
+                "inputs": [],
+                # Loading the bundles also writes them to the website, see stixhelpers.get_stix_memory_stores
+                "outputs": [STIX, normalize_resource(os.path.join(site_config.web_directory, "stix"))],
+            }
+            tasks.insert(index, stix_task)
+            break
+
+    return tasks
+
+
+def get_dependencies(tasks):
+    """Return a dict of task name => names of the earlier tasks it waits for (see conflicts)."""
+    return {
+        task["name"]: [earlier_task["name"] for earlier_task in tasks[:index] if conflicts(earlier_task, task)]
+        for index, task in enumerate(tasks)
+    }
+
+
+def get_direct_dependencies(tasks, dependencies):
+    """Return the dependencies without the ones that are already waited for through another dependency."""
+    waits_for = {}
+    direct = {}
+    for task in tasks:
+        name = task["name"]
+        indirect = set()
+        for dependency in dependencies[name]:
+            indirect |= waits_for[dependency]
+        direct[name] = [dependency for dependency in dependencies[name] if dependency not in indirect]
+        waits_for[name] = indirect | set(dependencies[name])
+    return direct
+
+
+def runs_in_main_process(task, jobs):
+    """Return True if a task has to run in the main process rather than in a worker process."""
+    if jobs <= 1 or task["name"] == STIX_TASK or task["inputs"] is None:
+        return True
+    return any(resource.startswith(STATE_PREFIX) for resource in task["inputs"] + task["outputs"])
+
+
+def get_critical_path(tasks, dependencies, durations):
+    """Return the chain of dependent tasks with the longest total duration, and that duration.
+
+    No schedule of the tasks, however many processes run them, can take less time than their critical path.
+    """
+    finish = {}
+    previous = {}
+    for task in tasks:
+        name = task["name"]
+        previous[name] = max(dependencies[name], key=lambda dependency: finish[dependency], default=None)
+        finish[name] = durations[name] + (finish[previous[name]] if previous[name] else 0.0)
+
+    if not finish:
+        return [], 0.0
+
+    name = max(finish, key=lambda name: finish[name])
+    length = finish[name]
+    path = []
+    while name:
+        path.append(name)
+        name = previous[name]
+    return path[::-1], length
+
+
+def load_stix(snapshot_file=None):
+    """Load the STIX data and, if a snapshot file is given, write every dataset to it for the worker processes.
+
+    The change sets since the previous build are computed here, before any module reads the STIX data, when asked
+    for with --stix-changes or --incremental, or when a previous build recorded them.
+    """
+    relationshipgetters.get_ms()
+    args = site_config.args
+    if getattr(args, "stix_changes", False) or getattr(args, "incremental", False) or stixdiff.has_change_sets():
+        relationshipgetters.get_stix_changes()
+    if snapshot_file:
+        sharedsnapshot.export_snapshot(snapshot_file)
+
+
+_attached_snapshot = None
+
+
+def get_worker_state():
+    """Return the state of this process that worker processes start with, see init_worker."""
+    return (
+        site_config.args,
+        [module["module_name"] for module in modules.run_ptr],
+        modules.menu_ptr,
+        site_config.web_directory,
+        site_config.subdirectory,
+    )
+
+
+def init_worker(args, module_names, menu, web_directory, subdirectory):
+    """Give a worker process the state of the main process that modules read: arguments, modules and menu."""
+    site_config.args = args
+    site_config.web_directory = web_directory
+    site_config.subdirectory = subdirectory
+    modules.run_ptr = [module for module in modules.run_ptr if module["module_name"] in module_names]
+    modules.menu_ptr = menu
+
+
+def run_in_worker(module_name, snapshot_file):
+    """Run a module in a worker process and return its start and end times and the modules it removed from the menu.
+
+    The datasets of the STIX snapshot are attached on first use. Removing a module from the navigation menu (see
+    buildhelpers.remove_module_from_menu) is the only change to the state of the main process that modules running
+    in a worker make, it is repeated by the main process.
+    """
+    global _attached_snapshot
+    if snapshot_file and _attached_snapshot != snapshot_file:
+        sharedsnapshot.attach_snapshot(snapshot_file)
+        _attached_snapshot = snapshot_file
+
+    menu = [module["module_name"] for module in modules.menu_ptr]
+    run_module = next(module["run_module"] for module in modules.run_ptr if module["module_name"] == module_name)
+
+    start_time = time.time()
+    run_module()
+    end_time = time.time()
+
+    removed = set(menu) - {module["module_name"] for module in modules.menu_ptr}
+    return start_time, end_time, [name for name in menu if name in removed]
+
+
+def run_modules(run_ptr, jobs=1):
+    """Run the modules of run_ptr, running up to jobs independent modules at once in worker processes.
+
+    Modules are run once every module they depend on (see get_dependencies) is done. With jobs=1 every module runs
+    in the main process in priority order, as the modules are ordered by priority when their dependencies are
+    computed. Otherwise modules run in a process pool, except the ones that use the state of the main process (see
+    runs_in_main_process), which run in the main process while the pool is busy. Worker processes read the STIX
+    datasets from a snapshot written by the main process once they are loaded (see sharedsnapshot).
+
+    Returns a list of the tasks run, with where they ran, their start and end times, and the critical path.
+    """
+    tasks = get_tasks(run_ptr)
+    dependencies = get_dependencies(tasks)
+    needs_pool = any(not runs_in_main_process(task, jobs) for task in tasks)
+
+    done = set()
+    pending = list(tasks)
+    running = {}
+    timings = {}
+    executor = None
+    snapshot_directory = tempfile.TemporaryDirectory(prefix="attack-website-") if needs_pool else None
+    snapshot_file = os.path.join(snapshot_directory.name, "datasets.snapshot") if needs_pool else None
+
+    def get_executor():
+        nonlocal executor
+        if executor is None:
+            executor = ProcessPoolExecutor(
+                max_workers=jobs,
+                initializer=init_worker,
+                initargs=get_worker_state(),
+            )
+        return executor
+
+    def finish(name, start_time, end_time, process):
+        timings[name] = {"start_time": start_time, "end_time": end_time, "process": process}
+        done.add(name)
+        buildhelpers.print_end(name, start_time, end_time)
+
+    try:
+        while pending or running:
+            ready = [task for task in pending if all(dependency in done for dependency in dependencies[task["name"]])]
+
+            for task in ready:
+                if not runs_in_main_process(task, jobs):
+                    pending.remove(task)
+                    future = get_executor().submit(
+                        run_in_worker, task["name"], snapshot_file if STIX in task["inputs"] else None
+                    )
+                    running[future] = task
+
+            main_task = next((task for task in ready if runs_in_main_process(task, jobs)), None)
+            if main_task:
+                pending.remove(main_task)
+                buildhelpers.print_start(main_task["name"])
+                start_time = time.time()
+                if main_task["name"] == STIX_TASK:
+                    load_stix(snapshot_file)
+                else:
+                    main_task["run_module"]()
+                finish(main_task["name"], start_time, time.time(), "main")
+                continue
+
+            if not running:
+                raise RuntimeError(f"Modules waiting on each other: {[task['name'] for task in pending]}")
+
+            completed, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in completed:
+                task = running.pop(future)
+                start_time, end_time, removed = future.result()
+                for module_name in removed:
+                    buildhelpers.remove_module_from_menu(module_name)
+                finish(task["name"], start_time, end_time, "worker")
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+        if snapshot_directory:
+            snapshot_directory.cleanup()
+
+    durations = {name: timing["end_time"] - timing["start_time"] for name, timing in timings.items()}
+    critical_path, critical_length = get_critical_path(tasks, dependencies, durations)
+    return {
+        "tasks": [{"name": task["name"], **timings[task["name"]]} for task in tasks],
+        "dependencies": get_direct_dependencies(tasks, dependencies),
+        "critical_path": critical_path,
+        "critical_length": critical_length,
+    }
+
+
+def log_report(report):
+    """Log when and where every module ran, and the critical path of the build."""
+    if not report["tasks"]:
+        return
+
+    build_start = min(task["start_time"] for task in report["tasks"])
+    build_end = max(task["end_time"] for task in report["tasks"])
+    rows = [
+        {
+            "module": task["name"],
+            "process": task["process"],
+            "start (s)": f"{task['start_time'] - build_start:.2f}",
+            "duration (s)": f"{task['end_time'] - task['start_time']:.2f}",
+            "waits for": ", ".join(report["dependencies"][task["name"]]),
+            "critical": "*" if task["name"] in report["critical_path"] else "",
+        }
+        for task in sorted(report["tasks"], key=lambda task: task["start_time"])
+    ]
+    logger.info(f"Module schedule:\n{tabulate(rows, headers='keys', tablefmt='github')}")
+    logger.info(
+        f"Critical path: {' -> '.join(report['critical_path'])} ({report['critical_length']:.2f}s of "
+        f"{build_end - build_start:.2f}s)"
+    )
@@ -0,0 +1,128 @@
+import os
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from loguru import logger
+from tabulate import tabulate
+
+from modules import site_config
+
+from . import buildhelpers, buildmanifest, modulescheduler, sharedsnapshot
+
+# Fewer objects than this many per job are generated in the calling process, a pool would cost more than it saves
+MIN_PAGES_PER_JOB = 8
+
+# Objects are split into this many chunks per job, so workers that get the smaller pages do not sit idle
+CHUNKS_PER_JOB = 4
+
+# Page function, objects and arguments of the pages generated by a worker process, see init_page_worker
+_page_generator = None
+
+# Directory of the snapshot written for page workers when this process has none, kept until the process exits
+_page_snapshot_directory = None
+
+
+def init_page_worker(state, snapshot_file, generate_page, objects, args):
+    """Give a worker process the state of the main process, the STIX datasets and the pages it generates."""
+    global _page_generator
+    modulescheduler.init_worker(*state)
+    sharedsnapshot.attach_snapshot(snapshot_file)
+    _page_generator = (generate_page, objects, args)
+
+
+def generate_page_chunk(indexes):
+    """Generate the pages of the objects at the given indexes in a worker process.
+
+    Returns the process ID, the start and end times and the number of pages generated.
+    """
+    generate_page, objects, args = _page_generator
+    start_time = time.time()
+    for index in indexes:
+        generate_page(objects[index], *args)
+    return os.getpid(), start_time, time.time(), len(indexes)
+
+
+def get_page_chunks(objects, chunk_count):
+    """Split the indexes of the objects into at most chunk_count contiguous chunks of about the same size.
+
+    Objects with the same ATT&CK ID (or STIX ID when they have none) write the same page, they are kept in the same
+    chunk so that the last of them in the list writes the page, as when the pages are generated one at a time.
+    """
+    groups = defaultdict(list)
+    for index, stix_obj in enumerate(objects):
+        groups[buildhelpers.get_attack_id(stix_obj) or stix_obj["id"]].append(index)
+
+    chunk_size = max(1, -(-len(objects) // chunk_count))
+    chunks = [[]]
+    for indexes in groups.values():
+        if len(chunks[-1]) >= chunk_size:
+            chunks.append([])
+        chunks[-1].extend(indexes)
+    return chunks
+
+
+def get_page_snapshot():
+    """Return a snapshot of the STIX datasets for page workers, writing one if this process has none."""
+    global _page_snapshot_directory
+    snapshot_file = sharedsnapshot.get_current_snapshot()
+    if snapshot_file:
+        return snapshot_file
+
+    if _page_snapshot_directory is None:
+        _page_snapshot_directory = tempfile.TemporaryDirectory(prefix="attack-website-")
+    return sharedsnapshot.export_snapshot(os.path.join(_page_snapshot_directory.name, "datasets.snapshot"))
+
+
+def generate_pages(generate_page, objects, *args, markdown_path=None):
+    """Call generate_page(obj, *args) for every object, in worker processes when the build runs with --jobs.
+
+    The objects are split into chunks (see get_page_chunks) that a pool of --jobs worker processes generates, the
+    workers reading the STIX datasets from a snapshot (see sharedsnapshot). The pages written are the same as when
+    they are generated one at a time, whatever the number of jobs. generate_page has to be a module-level function,
+    and the objects and arguments picklable. With one job, or few objects, the pages are generated in this process.
+
+    Incremental builds copy the pages of the objects that did not change since the last build from it instead of
+    generating them again, when the directory generate_page writes them to is given as markdown_path, see
+    buildmanifest.reuse_pages.
+    """
+    if markdown_path and getattr(site_config.args, "incremental", False):
+        objects = buildmanifest.reuse_pages(generate_page, objects, args, markdown_path)
+
+    jobs = getattr(site_config.args, "jobs", 1) or 1
+    if jobs <= 1 or len(objects) < jobs * MIN_PAGES_PER_JOB:
+        for stix_obj in objects:
+            generate_page(stix_obj, *args)
+        return
+
+    objects = list(objects)
+    chunks = get_page_chunks(objects, jobs * CHUNKS_PER_JOB)
+    workers = {}
+    start_time = time.time()
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=init_page_worker,
+        initargs=(modulescheduler.get_worker_state(), get_page_snapshot(), generate_page, objects, args),
+    ) as executor:
+        for pid, chunk_start, chunk_end, count in executor.map(generate_page_chunk, chunks):
+            worker = workers.setdefault(pid, {"chunks": 0, "pages": 0, "busy": 0.0})
+            worker["chunks"] += 1
+            worker["pages"] += count
+            worker["busy"] += chunk_end - chunk_start
+    total = time.time() - start_time
+
+    rows = [
+        {
+            "worker": number,
+            "chunks": worker["chunks"],
+            "pages": worker["pages"],
+            "busy (s)": f"{worker['busy']:.2f}",
+            "busy (%)": f"{100 * worker['busy'] / total:.0f}" if total else "",
+        }
+        for number, worker in enumerate(workers.values(), start=1)
+    ]
+    logger.debug(
+        f"Generated {len(objects)} {generate_page.__name__} pages with {jobs} jobs in {total:.2f}s:\n"
+        f"{tabulate(rows, headers='keys', tablefmt='github')}"
+    )
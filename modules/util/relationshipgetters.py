@@ -1,473 +1,452 @@
+import time
+
+from loguru import logger
+from tabulate import tabulate
+
 from modules import site_config
 
 from . import relationshiphelpers as rsh
-from . import stixhelpers
-
-malware_used_by_groups = {}
-tools_used_by_groups = {}
-malware_used_by_campaigns = {}
-tools_used_by_campaigns = {}
-techniques_used_by_malware = {}
-techniques_used_by_tools = {}
-techniques_used_by_groups = {}
-techniques_used_by_campaigns = {}
-techniques_targeting_assets = {}
-techniques_detected_by_datacomponent = {}
-groups_using_tool = {}
-groups_using_malware = {}
-mitigation_mitigates_techniques = {}
-technique_mitigated_by_mitigation = {}
-datacomponents_detecting_technique = {}
-tools_using_technique = {}
-malware_using_technique = {}
-groups_using_technique = {}
-assets_targeted_by_techniques = {}
-campaigns_using_technique = {}
-campaigns_using_tool = {}
-campaigns_using_malware = {}
-groups_attributed_to_campaign = {}
-campaigns_attributed_to_group = {}
-subtechniques_of = {}
-datacomponent_of = {}
-datasource_of = {}
-parent_technique_of = {}
-objects_using_notes = {}
-
-ms = {}
-srcs = []
-
-resources = {}
-relationships = []
-
-group_list = []
-software_list = []
-technique_list = []
-datasource_list = []
-datacomponent_list = []
-mitigation_list = []
-campaign_list = []
-asset_list = []
-
-technique_to_domain = {}
+from . import stixdiff, stixhelpers
+
+# Marks an entry that has not been computed yet, None and empty datasets are valid computed values
+_NOT_COMPUTED = object()
+
+
+class MemoRegistry:
+    """Registry of the memoized datasets derived from the STIX data.
+
+    Every dataset is computed once, on first use, and stored under its name. Presence is checked against a
+    sentinel, so a dataset that is legitimately empty is not computed again. Hits, misses and compute time are
+    counted per entry. The compute time of an entry includes the time spent computing the entries it uses for the
+    first time.
+
+    Every entry read while another entry is computed is recorded as a dependency of that entry, so invalidating an
+    entry also invalidates every entry derived from it.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._stats = {}
+        # Entry name => names of the entries that read it while they were computed
+        self._dependents = {}
+        # Names of the entries being computed, innermost last
+        self._computing = []
+
+    def get(self, name, compute):
+        """Return the dataset stored under name, calling compute() to create it on first use."""
+        stats = self._stats.setdefault(name, {"hits": 0, "misses": 0, "compute_time": 0.0})
+        if self._computing:
+            self._dependents.setdefault(name, set()).add(self._computing[-1])
+
+        value = self._values.get(name, _NOT_COMPUTED)
+        if value is not _NOT_COMPUTED:
+            stats["hits"] += 1
+            return value
+
+        stats["misses"] += 1
+        start_time = time.perf_counter()
+        self._computing.append(name)
+        try:
+            value = compute()
+        finally:
+            self._computing.pop()
+        stats["compute_time"] += time.perf_counter() - start_time
+
+        self._values[name] = value
+        return value
+
+    def peek(self, name, default=None):
+        """Return the dataset stored under name without computing it, or default if it was not computed yet."""
+        value = self._values.get(name, _NOT_COMPUTED)
+        if value is _NOT_COMPUTED:
+            return default
+        return value
+
+    def invalidate(self, *names):
+        """Drop the given entries and every entry derived from them, or every entry if no name is given.
+
+        The dropped entries are computed again on next use.
+        """
+        if not names:
+            self._values.clear()
+            self._dependents.clear()
+            return
+
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            self._values.pop(name, None)
+            pending.extend(self._dependents.pop(name, ()))
+
+    def export(self):
+        """Return the datasets of every entry computed so far and the dependencies between them."""
+        return {
+            "values": dict(self._values),
+            "dependents": {name: set(dependents) for name, dependents in self._dependents.items()},
+        }
+
+    def restore(self, exported):
+        """Store the datasets returned by export(), as computed entries, with their dependencies."""
+        self._values.update(exported["values"])
+        for name, dependents in exported["dependents"].items():
+            self._dependents.setdefault(name, set()).update(dependents)
+
+    def get_stats(self):
+        """Return a dict of entry name => hits, misses and compute time (in seconds)."""
+        return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def dump_stats(self):
+        """Log the hit/miss/compute time table of every entry, slowest entries first."""
+        rows = [
+            {
+                "entry": name,
+                "hits": stats["hits"],
+                "misses": stats["misses"],
+                "compute (s)": f"{stats['compute_time']:.3f}",
+            }
+            for name, stats in sorted(self._stats.items(), key=lambda item: item[1]["compute_time"], reverse=True)
+        ]
+        if rows:
+            logger.debug(f"Memoized datasets:\n{tabulate(rows, headers='keys', tablefmt='github')}")
+
+
+memo = MemoRegistry()
+
+
+def invalidate(*names):
+    """Drop the given memoized datasets and the datasets derived from them, or all of them if no name is given."""
+    memo.invalidate(*names)
+
 
 # Relationship getters
 
 
 def get_malware_used_by_groups():
     """malware used by groups getter"""
-    global malware_used_by_groups
-
-    if not malware_used_by_groups:
-        malware_used_by_groups = rsh.malware_used_by_groups(get_srcs())
-
-    return malware_used_by_groups
+    return memo.get(
+        "malware_used_by_groups", lambda: rsh.malware_used_by_groups(get_srcs(), graph=get_relationship_graph())
+    )
 
 
 def get_tools_used_by_groups():
     """tools used by groups getter"""
-    global tools_used_by_groups
-
-    if not tools_used_by_groups:
-        tools_used_by_groups = rsh.tools_used_by_groups(get_srcs())
-
-    return tools_used_by_groups
+    return memo.get(
+        "tools_used_by_groups", lambda: rsh.tools_used_by_groups(get_srcs(), graph=get_relationship_graph())
+    )
 
 
 def get_malware_used_by_campaigns():
     """malware used by campaigns getter"""
-    global malware_used_by_campaigns
-
-    if not malware_used_by_campaigns:
-        malware_used_by_campaigns = rsh.malware_used_by_campaigns(get_srcs())
-
-    return malware_used_by_campaigns
+    return memo.get(
+        "malware_used_by_campaigns", lambda: rsh.malware_used_by_campaigns(get_srcs(), graph=get_relationship_graph())
+    )
 
 
 def get_tools_used_by_campaigns():
     """tools used by campaigns getter"""
-    global tools_used_by_campaigns
-
-    if not tools_used_by_campaigns:
-        tools_used_by_campaigns = rsh.tools_used_by_campaigns(get_srcs())
-
-    return tools_used_by_campaigns
+    return memo.get(
+        "tools_used_by_campaigns", lambda: rsh.tools_used_by_campaigns(get_srcs(), graph=get_relationship_graph())
+    )
 
 
 def get_techniques_used_by_malware():
     """techniques used by malware getter"""
-    global techniques_used_by_malware
-
-    if not techniques_used_by_malware:
-        techniques_used_by_malware = rsh.techniques_used_by_malware(get_srcs())
-
-    return techniques_used_by_malware
+    return memo.get(
+        "techniques_used_by_malware", lambda: rsh.techniques_used_by_malware(get_srcs(), graph=get_relationship_graph())
+    )
 
 
 def get_techniques_used_by_tools():
     """techniques used by tools getter"""
-    global techniques_used_by_tools
-
-    if not techniques_used_by_tools:
-        techniques_used_by_tools = rsh.techniques_used_by_tools(get_srcs())
-
-    return techniques_used_by_tools
+    return memo.get(
+        "techniques_used_by_tools", lambda: rsh.techniques_used_by_tools(get_srcs(), graph=get_relationship_graph())
+    )
 
 
 def get_techniques_used_by_groups():
     """techniques used by groups getter"""
-    global techniques_used_by_groups
-
-    if not techniques_used_by_groups:
-        techniques_used_by_groups = rsh.techniques_used_by_groups(get_srcs())
-
-    return techniques_used_by_groups
+    return memo.get(
+        "techniques_used_by_groups", lambda: rsh.techniques_used_by_groups(get_srcs(), graph=get_relationship_graph())
+    )
 
 
 def get_techniques_used_by_campaigns():
     """techniques used by campaigns getter"""
-    global techniques_used_by_campaigns
-
-    if not techniques_used_by_campaigns:
-        techniques_used_by_campaigns = rsh.techniques_used_by_campaigns(get_srcs())
-
-    return techniques_used_by_campaigns
+    return memo.get(
+        "techniques_used_by_campaigns",
+        lambda: rsh.techniques_used_by_campaigns(get_srcs(), graph=get_relationship_graph()),
+    )
 
 
 def get_techniques_targeting_assets():
     """techniques targeting assets getter"""
-    global techniques_targeting_assets
-
-    if not techniques_targeting_assets:
-        techniques_targeting_assets = rsh.techniques_targeting_assets(get_srcs())
-
-    return techniques_targeting_assets
+    return memo.get(
+        "techniques_targeting_assets",
+        lambda: rsh.techniques_targeting_assets(get_srcs(), graph=get_relationship_graph()),
+    )
 
 
 def get_assets_targeted_by_techniques():
     """assets targeted by techniques getter"""
-    global assets_targeted_by_techniques
-
-    if not assets_targeted_by_techniques:
-        assets_targeted_by_techniques = rsh.assets_targeted_by_techniques(get_srcs())
+    return memo.get(
+        "assets_targeted_by_techniques",
+        lambda: rsh.assets_targeted_by_techniques(get_srcs(), graph=get_relationship_graph()),
+    )
 
-    return assets_targeted_by_techniques
 
 def get_techniques_detected_by_datacomponent():
-    global techniques_detected_by_datacomponent
-
-    if not techniques_detected_by_datacomponent:
-        techniques_detected_by_datacomponent = rsh.techniques_detected_by_datacomponent(get_srcs())
-
-    return techniques_detected_by_datacomponent
+    return memo.get(
+        "techniques_detected_by_datacomponent",
+        lambda: rsh.techniques_detected_by_datacomponent(get_srcs(), graph=get_relationship_graph()),
+    )
 
 
 def get_datacomponents_detecting_technique():
-    global datacomponents_detecting_technique
-
-    if not datacomponents_detecting_technique:
-        datacomponents_detecting_technique = rsh.datacomponents_detecting_technique(get_srcs())
-
-    return datacomponents_detecting_technique
+    return memo.get(
+        "datacomponents_detecting_technique",
+        lambda: rsh.datacomponents_detecting_technique(get_srcs(), graph=get_relationship_graph()),
+    )
 
 
 def get_groups_using_tool():
     """groups using tool getter"""
-    global groups_using_tool
-
-    if not groups_using_tool:
-        groups_using_tool = rsh.groups_using_tool(get_srcs())
-
-    return groups_using_tool
+    return memo.get("groups_using_tool", lambda: rsh.groups_using_tool(get_srcs(), graph=get_relationship_graph()))
 
 
 def get_groups_using_malware():
     """groups using malware getter"""
-    global groups_using_malware
-
-    if not groups_using_malware:
-        groups_using_malware = rsh.groups_using_malware(get_srcs())
-
-    return groups_using_malware
+    return memo.get(
+        "groups_using_malware", lambda: rsh.groups_using_malware(get_srcs(), graph=get_relationship_graph())
+    )
 
 
 def get_mitigation_mitigates_techniques():
     """mitigation migates techniques getter"""
-    global mitigation_mitigates_techniques
-
-    if not mitigation_mitigates_techniques:
-        mitigation_mitigates_techniques = rsh.mitigation_mitigates_techniques(get_srcs())
-
-    return mitigation_mitigates_techniques
+    return memo.get(
+        "mitigation_mitigates_techniques",
+        lambda: rsh.mitigation_mitigates_techniques(get_srcs(), graph=get_relationship_graph()),
+    )
 
 
 def get_technique_mitigated_by_mitigation():
     """technique mitigated by mitigation getter"""
-    global technique_mitigated_by_mitigation
-
-    if not technique_mitigated_by_mitigation:
-        technique_mitigated_by_mitigation = rsh.technique_mitigated_by_mitigation(get_srcs())
-
-    return technique_mitigated_by_mitigation
+    return memo.get(
+        "technique_mitigated_by_mitigation",
+        lambda: rsh.technique_mitigated_by_mitigation(get_srcs(), graph=get_relationship_graph()),
+    )
 
 
 def get_tools_using_technique():
     """tools using technique getter"""
-    global tools_using_technique
-
-    if not tools_using_technique:
-        tools_using_technique = rsh.tools_using_technique(get_srcs())
-
-    return tools_using_technique
+    return memo.get(
+        "tools_using_technique", lambda: rsh.tools_using_technique(get_srcs(), graph=get_relationship_graph())
+    )
 
 
 def get_malware_using_technique():
     """malware using technique getter"""
-    global malware_using_technique
-
-    if not malware_using_technique:
-        malware_using_technique = rsh.malware_using_technique(get_srcs())
-
-    return malware_using_technique
+    return memo.get(
+        "malware_using_technique", lambda: rsh.malware_using_technique(get_srcs(), graph=get_relationship_graph())
+    )
 
 
 def get_groups_using_technique():
     """groups using technique getter"""
-    global groups_using_technique
-
-    if not groups_using_technique:
-        groups_using_technique = rsh.groups_using_technique(get_srcs())
-
-    return groups_using_technique
+    return memo.get(
+        "groups_using_technique", lambda: rsh.groups_using_technique(get_srcs(), graph=get_relationship_graph())
+    )
 
 
 def get_campaigns_using_technique():
     """campaigns using technique getter"""
-    global campaigns_using_technique
-
-    if not campaigns_using_technique:
-        campaigns_using_technique = rsh.campaigns_using_technique(get_srcs())
-
-    return campaigns_using_technique
+    return memo.get(
+        "campaigns_using_technique", lambda: rsh.campaigns_using_technique(get_srcs(), graph=get_relationship_graph())
+    )
 
 
 def get_campaigns_using_tool():
     """campaigns using tool getter"""
-    global campaigns_using_tool
-
-    if not campaigns_using_tool:
-        campaigns_using_tool = rsh.campaigns_using_tool(get_srcs())
-
-    return campaigns_using_tool
+    return memo.get(
+        "campaigns_using_tool", lambda: rsh.campaigns_using_tool(get_srcs(), graph=get_relationship_graph())
+    )
 
 
 def get_campaigns_using_malware():
     """campaigns using malware getter"""
-    global campaigns_using_malware
-
-    if not campaigns_using_malware:
-        campaigns_using_malware = rsh.campaigns_using_malware(get_srcs())
-
-    return campaigns_using_malware
+    return memo.get(
+        "campaigns_using_malware", lambda: rsh.campaigns_using_malware(get_srcs(), graph=get_relationship_graph())
+    )
 
 
 def get_groups_attributed_to_campaigns():
     """groups attributed to campaign getter"""
-    global groups_attributed_to_campaign
-
-    if not groups_attributed_to_campaign:
-        groups_attributed_to_campaign = rsh.groups_attributed_to_campaign(get_srcs())
-
-    return groups_attributed_to_campaign
+    return memo.get(
+        "groups_attributed_to_campaign",
+        lambda: rsh.groups_attributed_to_campaign(get_srcs(), graph=get_relationship_graph()),
+    )
 
 
 def get_campaigns_attributed_to_group():
     """campaigns attributed to group getter"""
-    global campaigns_attributed_to_group
+    return memo.get(
+        "campaigns_attributed_to_group",
+        lambda: rsh.campaigns_attributed_to_group(get_srcs(), graph=get_relationship_graph()),
+    )
+
 
-    if not campaigns_attributed_to_group:
-        campaigns_attributed_to_group = rsh.campaigns_attributed_to_group(get_srcs())
+def get_techniques_used_by_groups_with_campaigns():
+    """Return the techniques used by groups directly or through their attributed campaigns."""
+    return memo.get(
+        "techniques_used_by_groups_with_campaigns",
+        lambda: rsh.techniques_used_by_groups_with_campaigns(get_srcs(), graph=get_relationship_graph()),
+    )
 
-    return campaigns_attributed_to_group
+
+def get_software_used_by_groups_with_campaigns():
+    """Return the software used by groups directly or through their attributed campaigns."""
+    return memo.get(
+        "software_used_by_groups_with_campaigns",
+        lambda: rsh.software_used_by_groups_with_campaigns(get_srcs(), graph=get_relationship_graph()),
+    )
+
+
+def get_groups_using_software_with_campaigns():
+    """Return the groups using software directly or through their attributed campaigns."""
+    return memo.get(
+        "groups_using_software_with_campaigns",
+        lambda: rsh.groups_using_software_with_campaigns(get_srcs(), graph=get_relationship_graph()),
+    )
 
 
 def get_subtechniques_of():
     """subtechniques of techniques getter"""
-    global subtechniques_of
+    return memo.get("subtechniques_of", lambda: rsh.subtechniques_of(get_srcs(), graph=get_relationship_graph()))
 
-    if not subtechniques_of:
-        subtechniques_of = rsh.subtechniques_of(get_srcs())
 
-    return subtechniques_of
+def get_datasource_maps():
+    """Return the maps between data sources, data components and their domains."""
+    return memo.get("datasource_maps", lambda: stixhelpers.get_datasource_maps())
 
 
 def get_datacomponent_of():
     """data components of data sources getter"""
-    global datacomponent_of
-
-    if not datacomponent_of:
-        datacomponent_of = stixhelpers.datacomponent_of()
-
-    return datacomponent_of
+    return get_datasource_maps()["datacomponent_of"]
 
 
 def get_datasource_of():
     """data source of data component getter"""
-    global datasource_of
+    return get_datasource_maps()["datasource_of"]
 
-    if not datasource_of:
-        datasource_of = stixhelpers.datasource_of()
 
-    return datasource_of
+def get_domains_of_datacomponent():
+    """Return the domains of the techniques each data component detects."""
+    return get_datasource_maps()["domains_of_datacomponent"]
 
 
-def get_parent_technique_of():
-    """parent of subtechnique getter"""
-    global parent_technique_of
+def get_domains_of_datasource():
+    """Return the domains of the data components of each data source."""
+    return get_datasource_maps()["domains_of_datasource"]
 
-    if not parent_technique_of:
-        parent_technique_of = rsh.parent_technique_of(get_srcs())
 
-    return parent_technique_of
+def get_parent_technique_of():
+    """parent of subtechnique getter"""
+    return memo.get("parent_technique_of", lambda: rsh.parent_technique_of(get_srcs(), graph=get_relationship_graph()))
 
 
 def get_objects_using_notes():
     """get objects using notes"""
-    global objects_using_notes
+    return memo.get("objects_using_notes", lambda: rsh.get_objects_using_notes(get_srcs()))
 
-    if not objects_using_notes:
-        objects_using_notes = rsh.get_objects_using_notes(get_srcs())
 
-    return objects_using_notes
+def get_loaded_attack_id_index():
+    """Return the ATT&CK ID index if the STIX data is loaded, or None, without loading it."""
+    stix = memo.peek("stix")
+    if stix is None:
+        return None
+    return stix.attack_id_index
 
 
 def get_ms():
     """memory shares getter"""
-    global ms
-    global srcs
-
-    if not ms:
-        # Update both of them if one was not already declared
-        ms, srcs = stixhelpers.get_stix_memory_stores()
-
-    return ms
+    return memo.get("stix", stixhelpers.get_stix_memory_stores).ms
 
 
 def get_srcs():
     """memory shares without domain getter"""
-    global ms
-    global srcs
+    return memo.get("stix", stixhelpers.get_stix_memory_stores).srcs
 
-    if not srcs:
-        # Update both of them if one was not already declared
-        ms, srcs = stixhelpers.get_stix_memory_stores()
 
-    return srcs
+def get_relationship_graph():
+    """Return the relationship graph of the STIX data."""
+    return memo.get("stix", stixhelpers.get_stix_memory_stores).relationship_graph
 
 
-def get_resources():
-    """resources getter"""
-    global resources
+def get_attack_id_index():
+    """Return the bidirectional ATT&CK ID index of the STIX data."""
+    return memo.get("stix", stixhelpers.get_stix_memory_stores).attack_id_index
 
-    if not resources:
-        resources = stixhelpers.grab_resources(get_ms())
 
-    return resources
+def get_stix_changes():
+    """Return the change sets of every domain since the previous build, see stixdiff.update_change_sets.
 
+    They are only computed, and recorded for the next build, when they are asked for, see modulescheduler.load_stix.
+    """
+    return memo.get(
+        "stix_changes",
+        lambda: stixdiff.update_change_sets(memo.get("stix", stixhelpers.get_stix_memory_stores).stix_files),
+    )
 
-def get_relationships():
-    """relationship getter"""
-    global relationships
 
-    if not relationships:
-        relationships = get_resources()["relationships"]
+def get_resources():
+    """resources getter"""
+    return memo.get("resources", lambda: stixhelpers.grab_resources(get_ms()))
+
 
-    return relationships
+def get_relationships():
+    """relationship getter"""
+    return memo.get("relationships", lambda: get_resources()["relationships"])
 
 
 def get_group_list():
     """group list getter"""
-    global group_list
-
-    if not group_list:
-        group_list = get_resources()["groups"]
-
-    return group_list
+    return memo.get("group_list", lambda: get_resources()["groups"])
 
 
 def get_software_list():
     """software list getter"""
-    global software_list
-
-    if not software_list:
-        software_list = get_resources()["software"]
-
-    return software_list
+    return memo.get("software_list", lambda: get_resources()["software"])
 
 
 def get_technique_list():
     """technique list getter"""
-    global technique_list
-
-    if not technique_list:
-        technique_list = get_resources()["techniques"]
-
-    return technique_list
+    return memo.get("technique_list", lambda: get_resources()["techniques"])
 
 
 def get_datasource_list():
     """data source list getter"""
-    global datasource_list
-
-    if not datasource_list:
-        datasource_list = stixhelpers.get_datasources(get_srcs())
-
-    return datasource_list
+    return memo.get("datasource_list", lambda: stixhelpers.get_datasources(get_srcs()))
 
 
 def get_datacomponent_list():
     """data component list getter"""
-    global datacomponent_list
-
-    if not datacomponent_list:
-        datacomponent_list = stixhelpers.get_datacomponents(get_srcs())
-
-    return datacomponent_list
+    return memo.get("datacomponent_list", lambda: stixhelpers.get_datacomponents(get_srcs()))
 
 
 def get_mitigation_list():
     """mitigation list getter"""
-    global mitigation_list
-
-    if not mitigation_list:
-        mitigation_list = get_resources()["mitigations"]
-
-    return mitigation_list
+    return memo.get("mitigation_list", lambda: get_resources()["mitigations"])
 
 
 def get_campaign_list():
     """campaign list getter"""
-    global campaign_list
+    return memo.get("campaign_list", lambda: get_resources()["campaigns"])
 
-    if not campaign_list:
-        campaign_list = get_resources()["campaigns"]
-
-    return campaign_list
 
 def get_asset_list():
     """asset list getter"""
-    global asset_list
-
-    if not asset_list:
-        asset_list = get_resources()["assets"]
-
-    return asset_list
+    return memo.get("asset_list", lambda: get_resources()["assets"])
 
 
 def get_technique_to_domain():
     """technique to domain getter"""
-    global technique_to_domain
-
-    if not technique_to_domain:
-        technique_to_domain = stixhelpers.get_technique_id_domain_map(get_ms())
-
-    return technique_to_domain
+    return memo.get("technique_to_domain", lambda: stixhelpers.get_technique_id_domain_map(get_ms()))
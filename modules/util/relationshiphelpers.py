@@ -1,9 +1,7 @@
-import json
-from collections import OrderedDict
 from itertools import chain
 
+import numpy as np
 from loguru import logger
-from stix2 import Filter
 
 
 def query_all(srcs, filters):
@@ -11,7 +9,212 @@ def query_all(srcs, filters):
     return list(chain.from_iterable(src.query(filters) for src in srcs))
 
 
-def get_related(srcs, src_type, rel_type, target_type, reverse=False):
+def get_all_by_type(srcs, stix_type, include_revoked=True):
+    """Return the union of the objects of a STIX type across multiple memorystores."""
+    return list(chain.from_iterable(src.get_by_type(stix_type, include_revoked=include_revoked) for src in srcs))
+
+
+def get_stix_type(stix_id):
+    """Return the STIX type of a STIX ID, e.g "attack-pattern" for "attack-pattern--<uuid>"."""
+    return stix_id.split("--", 1)[0]
+
+
+class RelatedObject:
+    """A related object and the relationship it is related through, as returned in get_related mappings.
+
+    Slotted to keep the edges of every mapping small. Supports the mapping-style access of the dicts it replaces,
+    e.g. related["object"] and related["relationship"].
+    """
+
+    __slots__ = ("object", "relationship")
+
+    def __init__(self, object, relationship):
+        self.object = object
+        self.relationship = relationship
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def get(self, key, default=None):
+        """Return the value for key if key is "object" or "relationship", else default."""
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def keys(self):
+        """Return the keys of the mapping-style access, "object" and "relationship"."""
+        return self.__slots__
+
+    def __repr__(self):
+        return f"RelatedObject(object={self.object['id']!r}, relationship={self.relationship['id']!r})"
+
+
+class RelationshipGraph:
+    """Relationships across multiple memorystores, stored as a compressed sparse row (CSR) graph.
+
+    The relationships are walked once. Every STIX ID at either end of a relationship becomes a node, and every
+    relationship an edge with a source node, a target node, a key (source type, relationship type, target type) and
+    flags, each kept in a NumPy column. The edges are ordered by source node with an offset per node (forward
+    adjacency), the reverse adjacency is the same edges ordered by target node (the transpose).
+
+    Every mapping returned by get_related is a view selected from these columns with boolean masks: edges of the
+    requested key that are neither revoked nor deprecated, grouped by source (or target) node in the order the
+    relationships were walked.
+
+    Relationships are deduplicated by STIX ID across the memorystores, the first non revoked copy wins. Related
+    objects are resolved against the objects of all memorystores (the last memorystore wins), revoked objects are
+    only kept for the x-mitre types.
+    """
+
+    REVOKED = 1
+    DEPRECATED = 2
+
+    def __init__(self, srcs):
+        self.objects = {}
+        self.node_ids = []
+        self.node_index = {}
+        self.keys = []
+        self.key_index = {}
+        self.relationships = []
+        self._views = {}
+
+        for src in srcs:
+            for stix_obj in src.get_all():
+                if stix_obj["type"] == "relationship":
+                    continue
+                if stix_obj["type"].startswith("x-mitre") or not src.is_revoked(stix_obj["id"]):
+                    self.objects[stix_obj["id"]] = stix_obj
+
+        sources = []
+        targets = []
+        edge_keys = []
+        flags = []
+
+        def add_edge(relationship, flag):
+            source_ref = relationship["source_ref"]
+            target_ref = relationship["target_ref"]
+            key = (get_stix_type(source_ref), relationship["relationship_type"], get_stix_type(target_ref))
+
+            if relationship.get("x_mitre_deprecated"):
+                flag |= self.DEPRECATED
+
+            self.relationships.append(relationship)
+            sources.append(self._get_node(source_ref))
+            targets.append(self._get_node(target_ref))
+            edge_keys.append(self.key_index.setdefault(key, len(self.key_index)))
+            flags.append(flag)
+
+        seen = set()
+        for src in srcs:
+            for relationship in src.get_relationships(include_revoked=False):
+                if relationship["id"] not in seen:
+                    seen.add(relationship["id"])
+                    add_edge(relationship, 0)
+
+        # Revoked relationships are kept as flagged edges, unless a copy that is not revoked was found
+        for src in srcs:
+            for relationship in src.get_relationships():
+                if relationship["id"] not in seen:
+                    seen.add(relationship["id"])
+                    add_edge(relationship, self.REVOKED)
+
+        self.keys = list(self.key_index)
+
+        # Edge columns
+        self.edge_source = np.array(sources, dtype=np.int32)
+        self.edge_target = np.array(targets, dtype=np.int32)
+        self.edge_key = np.array(edge_keys, dtype=np.int32)
+        self.edge_flags = np.array(flags, dtype=np.uint8)
+
+        # Node column: whether the STIX ID resolves to an object that can be returned
+        self.node_resolved = np.array([node_id in self.objects for node_id in self.node_ids], dtype=bool)
+
+        # Forward adjacency (edges by source node) and its transpose (edges by target node). The sort is stable, so
+        # the edges of a node stay in the order the relationships were walked
+        self.forward_order, self.forward_offsets = self._get_csr(self.edge_source)
+        self.reverse_order, self.reverse_offsets = self._get_csr(self.edge_target)
+
+    def _get_node(self, stix_id):
+        node = self.node_index.get(stix_id)
+        if node is None:
+            node = self.node_index[stix_id] = len(self.node_ids)
+            self.node_ids.append(stix_id)
+        return node
+
+    def _get_csr(self, edge_nodes):
+        """Return the edge order and per node offsets that group the edges by the given node column."""
+        order = np.argsort(edge_nodes, kind="stable").astype(np.int32)
+        offsets = np.zeros(len(self.node_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(edge_nodes, minlength=len(self.node_ids)), out=offsets[1:])
+        return order, offsets
+
+    def _find_node(self, stix_id):
+        """Return the node of a STIX ID, or None."""
+        return self.node_index.get(stix_id)
+
+    def _get_node_id(self, node):
+        """Return the STIX ID of a node."""
+        return self.node_ids[node]
+
+    def _get_node_object(self, node):
+        """Return the object a resolved node stands for."""
+        return self.objects[self.node_ids[node]]
+
+    def _get_relationship(self, edge):
+        """Return the relationship of an edge."""
+        return self.relationships[edge]
+
+    def _get_flags_mask(self, edges):
+        return (self.edge_flags[edges] & (self.REVOKED | self.DEPRECATED)) == 0
+
+    def related(self, src_type, rel_type, target_type, reverse=False):
+        """Return stix_id => [RelatedObject] for the given relationship key and direction."""
+        view_key = (src_type, rel_type, target_type, reverse)
+        if view_key not in self._views:
+            self._views[view_key] = self._build_view((src_type, rel_type, target_type), reverse)
+
+        return self._views[view_key]
+
+    def _build_view(self, key, reverse):
+        key_id = self.key_index.get(key)
+        if key_id is None:
+            return {}
+
+        if reverse:
+            order, from_nodes, to_nodes = self.reverse_order, self.edge_target, self.edge_source
+        else:
+            order, from_nodes, to_nodes = self.forward_order, self.edge_source, self.edge_target
+
+        edges = order[(self.edge_key[order] == key_id) & self._get_flags_mask(order)]
+        from_edge_nodes = from_nodes[edges]
+        to_edge_nodes = to_nodes[edges]
+        # Nodes with only unresolved related objects (e.g. revoked ones) keep an empty list
+        resolved = self.node_resolved[to_edge_nodes]
+
+        output = {}
+        for edge, from_node, to_node, is_resolved in zip(
+            edges.tolist(), from_edge_nodes.tolist(), to_edge_nodes.tolist(), resolved.tolist()
+        ):
+            from_id = self._get_node_id(from_node)
+            value = output.get(from_id)
+            if value is None:
+                value = output[from_id] = []
+            if is_resolved:
+                value.append(RelatedObject(self._get_node_object(to_node), self._get_relationship(edge)))
+
+        return output
+
+
+def get_related(srcs, src_type, rel_type, target_type, reverse=False, graph=None):
     """Build relationship mappings.
 
     params:
@@ -20,323 +223,383 @@ def get_related(srcs, src_type, rel_type, target_type, reverse=False):
         rel_type: relationship type for the relationships, e.g "uses"
         target_type: target type for the relationship, e.g "intrusion-set"
         reverse: build reverse mapping of target to source
+        graph: RelationshipGraph already built for srcs, built on the fly if not given
     """
+    if graph is None:
+        graph = RelationshipGraph(srcs)
 
-    relationships_with_dups = query_all(
-        srcs,
-        [
-            Filter("type", "=", "relationship"),
-            Filter("relationship_type", "=", rel_type),
-            Filter("revoked", "=", False),
-        ],
-    )
-
-    relationships_dict = OrderedDict()
-    for relationship in relationships_with_dups:
-        if relationship["id"] not in relationships_dict:
-            relationships_dict[relationship["id"]] = relationship
-
-    relationships = relationships_dict.values()
-
-    # stix_id => [ ids of objects with relationships with stix_id ]
-    id_to_related = {}
-
-    # build the dict
-    for relationship in relationships:
-        if relationship.get("x_mitre_deprecated"):
-            continue
-
-        if src_type in relationship.source_ref and target_type in relationship.target_ref:
-            if (relationship.source_ref in id_to_related and not reverse) or (
-                relationship.target_ref in id_to_related and reverse
-            ):
-                if not reverse:
-                    id_to_related[relationship.source_ref].append(
-                        {"relationship": relationship, "id": relationship.target_ref}
-                    )
-                else:
-                    id_to_related[relationship.target_ref].append(
-                        {"relationship": relationship, "id": relationship.source_ref}
-                    )
-            else:
-                if not reverse:
-                    id_to_related[relationship.source_ref] = [
-                        {"relationship": relationship, "id": relationship.target_ref}
-                    ]
-                else:
-                    id_to_related[relationship.target_ref] = [
-                        {"relationship": relationship, "id": relationship.source_ref}
-                    ]
-    # all objects of target type
-    if not reverse:
-        if target_type.startswith("x-mitre"):
-            targets = query_all(srcs, [Filter("type", "=", target_type)])
-        else:
-            targets = query_all(srcs, [Filter("type", "=", target_type), Filter("revoked", "=", False)])
-    else:
-        if src_type.startswith("x-mitre"):
-            targets = query_all(srcs, [Filter("type", "=", src_type)])
-        else:
-            targets = query_all(srcs, [Filter("type", "=", src_type), Filter("revoked", "=", False)])
-
-    id_to_target = {}
-    # build the dict
-    for target in targets:
-        if target.get("id"):
-            id_to_target[target["id"]] = target
-
-    output = {}
-    for stix_id in id_to_related:
-        value = []
-        for related in id_to_related[stix_id]:
-            if not related["id"] in id_to_target:
-                continue  # targetting a revoked object
-
-            if related["id"].startswith("x-mitre"):
-                value.append(
-                    {
-                        "object": id_to_target[related["id"]],
-                        "relationship": json.loads(related["relationship"].serialize()),
-                    }
-                )
-            else:
-                value.append(
-                    {
-                        "object": json.loads(id_to_target[related["id"]].serialize()),
-                        "relationship": json.loads(related["relationship"].serialize()),
-                    }
-                )
-        output[stix_id] = value
-    return output
+    return graph.related(src_type, rel_type, target_type, reverse=reverse)
 
 
 # tool:group
-def tools_used_by_groups(srcs):
+def tools_used_by_groups(srcs, graph=None):
     """Return group_id => {tool, relationship} for each tool used by the group.
 
     srcs should be an array of memorystores for enterprise, mobile, and pre
     """
-    return get_related(srcs, "intrusion-set", "uses", "tool")
+    return get_related(srcs, "intrusion-set", "uses", "tool", graph=graph)
 
 
-def groups_using_tool(srcs):
+def groups_using_tool(srcs, graph=None):
     """Return tool_id => {group, relationship} for each group using the tool.
 
     srcs should be an array of memorystores for enterprise, mobile and pre
     """
-    return get_related(srcs, "intrusion-set", "uses", "tool", reverse=True)
+    return get_related(srcs, "intrusion-set", "uses", "tool", reverse=True, graph=graph)
 
 
 # tool:campaign
-def tools_used_by_campaigns(srcs):
+def tools_used_by_campaigns(srcs, graph=None):
     """Return campaign_id => {tool, relationship} for each tool used by the campaign.
 
     srcs should be an array of memorystores for enterprise, mobile, and pre
     """
-    return get_related(srcs, "campaign", "uses", "tool")
+    return get_related(srcs, "campaign", "uses", "tool", graph=graph)
 
 
-def campaigns_using_tool(srcs):
+def campaigns_using_tool(srcs, graph=None):
     """Return tool_id => {campaign, relationship} for each campaign using the tool.
 
     srcs should be an array of memorystores for enterprise, mobile and pre
     """
-    return get_related(srcs, "campaign", "uses", "tool", reverse=True)
+    return get_related(srcs, "campaign", "uses", "tool", reverse=True, graph=graph)
 
 
 # malware:group
-def malware_used_by_groups(srcs):
+def malware_used_by_groups(srcs, graph=None):
     """Return group_id => {malware, relationship} for each malware used by group.
 
     srcs should be an array of memorystores for enterprise, mobile, and pre
     """
-    return get_related(srcs, "intrusion-set", "uses", "malware")
+    return get_related(srcs, "intrusion-set", "uses", "malware", graph=graph)
 
 
-def groups_using_malware(srcs):
+def groups_using_malware(srcs, graph=None):
     """Return malware_id => {group, relationship} for each group using the malware.
 
     srcs should be an array of memorystores for enterprise, mobile, and pre
     """
-    return get_related(srcs, "intrusion-set", "uses", "malware", reverse=True)
+    return get_related(srcs, "intrusion-set", "uses", "malware", reverse=True, graph=graph)
 
 
 # malware:campaign
-def malware_used_by_campaigns(srcs):
+def malware_used_by_campaigns(srcs, graph=None):
     """Return campaign_id => {malware, relationship} for each malware used by campaign.
 
     srcs should be an array of memorystores for enterprise, mobile, and pre
     """
-    return get_related(srcs, "campaign", "uses", "malware")
+    return get_related(srcs, "campaign", "uses", "malware", graph=graph)
 
 
-def campaigns_using_malware(srcs):
+def campaigns_using_malware(srcs, graph=None):
     """Return malware_id => {campaign, relationship} for each campaign using the malware.
 
     srcs should be an array of memorystores for enterprise, mobile, and pre
     """
-    return get_related(srcs, "campaign", "uses", "malware", reverse=True)
+    return get_related(srcs, "campaign", "uses", "malware", reverse=True, graph=graph)
 
 
 # technique:data component
-def techniques_detected_by_datacomponent(srcs):
+def techniques_detected_by_datacomponent(srcs, graph=None):
     """Return datacomponent_id => {technique, relationship} for each technique detected by data component.
 
     srcs should be an array of memorystores for enterprise, mobile, and pre.
     The mobile and pre memorystores should not contain data components nor data sources.
     """
-    return get_related(srcs, "x-mitre-data-component", "detects", "attack-pattern")
+    return get_related(srcs, "x-mitre-data-component", "detects", "attack-pattern", graph=graph)
 
 
-def datacomponents_detecting_technique(srcs):
+def datacomponents_detecting_technique(srcs, graph=None):
     """Return technique => {data component, relationship} for each data component decting a technique.
 
     srcs should be an array of memorystores for enterprise, mobile, and pre.
     The mobile and pre memorystores should not contain data components nor data sources.
     """
-    return get_related(srcs, "x-mitre-data-component", "detects", "attack-pattern", reverse=True)
+    return get_related(srcs, "x-mitre-data-component", "detects", "attack-pattern", reverse=True, graph=graph)
 
 
 # technique:group
-def techniques_used_by_groups(srcs):
+def techniques_used_by_groups(srcs, graph=None):
     """Return group_id => {technique, relationship} for each technique used by the group.
 
     srcs should be an array of memorystores for enterprise, mobile, and pre
     """
-    return get_related(srcs, "intrusion-set", "uses", "attack-pattern")
+    return get_related(srcs, "intrusion-set", "uses", "attack-pattern", graph=graph)
 
 
-def groups_using_technique(srcs):
+def groups_using_technique(srcs, graph=None):
     """Return technique_id => {group, relationship} for each group using the technique.
 
     srcs should be an array of memorystores for enterprise, mobile and pre
     """
-    return get_related(srcs, "intrusion-set", "uses", "attack-pattern", reverse=True)
+    return get_related(srcs, "intrusion-set", "uses", "attack-pattern", reverse=True, graph=graph)
 
 
 # technique:campaign
-def techniques_used_by_campaigns(srcs):
+def techniques_used_by_campaigns(srcs, graph=None):
     """Return campaign_id => {technique, relationship} for each technique used by the campaign.
 
     srcs should be an array of memorystores for enterprise, mobile, and pre
     """
-    return get_related(srcs, "campaign", "uses", "attack-pattern")
+    return get_related(srcs, "campaign", "uses", "attack-pattern", graph=graph)
 
 
-def campaigns_using_technique(srcs):
+def campaigns_using_technique(srcs, graph=None):
     """Return technique_id => {campaign, relationship} for each campaign using the technique.
 
     srcs should be an array of memorystores for enterprise, mobile and pre
     """
-    return get_related(srcs, "campaign", "uses", "attack-pattern", reverse=True)
+    return get_related(srcs, "campaign", "uses", "attack-pattern", reverse=True, graph=graph)
 
 
-def groups_attributed_to_campaign(srcs):
+def groups_attributed_to_campaign(srcs, graph=None):
     """Return campaign_id => {group, relationship} for each group attributed to the campaign
 
     srcs should be an array of memorystores for enterprise, mobile, and pre
     """
-    return get_related(srcs, "campaign", "attributed-to", "intrusion-set")
+    return get_related(srcs, "campaign", "attributed-to", "intrusion-set", graph=graph)
 
 
-def campaigns_attributed_to_group(srcs):
+def campaigns_attributed_to_group(srcs, graph=None):
     """Return group_id => {campaign, relationship} for each campaign attributed to the group
 
     srcs should be an array of memorystores for enterprise, mobile, and pre
     """
-    return get_related(srcs, "campaign", "attributed-to", "intrusion-set", reverse=True)
+    return get_related(srcs, "campaign", "attributed-to", "intrusion-set", reverse=True, graph=graph)
 
 
 # technique:asset
-def techniques_targeting_assets(srcs):
+def techniques_targeting_assets(srcs, graph=None):
     """Return asset_id => {technique, relationship} for each technique targeting the asset.
 
     srcs should be an array of memorystores for enterprise, mobile, and pre
     """
-    return get_related(srcs, "attack-pattern", "targets", "x-mitre-asset", reverse=True)
+    return get_related(srcs, "attack-pattern", "targets", "x-mitre-asset", reverse=True, graph=graph)
+
 
-def assets_targeted_by_techniques(srcs):
+def assets_targeted_by_techniques(srcs, graph=None):
     """Return technique_id => {asset, relationship} for each asset targeted by the technique.
 
     srcs should be an array of memorystores for enterprise, mobile, and pre
     """
-    return get_related(srcs, "attack-pattern", "targets", "x-mitre-asset")
+    return get_related(srcs, "attack-pattern", "targets", "x-mitre-asset", graph=graph)
+
 
 # technique:malware
-def techniques_used_by_malware(srcs):
+def techniques_used_by_malware(srcs, graph=None):
     """Return malware => {technique, relationship} for each technique used by the malware.
 
     srcs should be an array of memorystores for enterprise, mobile, and pre
     """
-    return get_related(srcs, "malware", "uses", "attack-pattern")
+    return get_related(srcs, "malware", "uses", "attack-pattern", graph=graph)
 
 
-def malware_using_technique(srcs):
+def malware_using_technique(srcs, graph=None):
     """Return technique_id  => {malware, relationship} for each malware using the technique.
 
     srcs should be an array of memorystores for enterprise, mobile, and pre
     """
-    return get_related(srcs, "malware", "uses", "attack-pattern", reverse=True)
+    return get_related(srcs, "malware", "uses", "attack-pattern", reverse=True, graph=graph)
 
 
 # technique:tool
-def techniques_used_by_tools(srcs):
+def techniques_used_by_tools(srcs, graph=None):
     """Return tool_id => {technique, relationship} for each technique used by the tool.
 
     srcs should be an array of memorystores for enterprise, mobile, and pre
     """
-    return get_related(srcs, "tool", "uses", "attack-pattern")
+    return get_related(srcs, "tool", "uses", "attack-pattern", graph=graph)
 
 
-def tools_using_technique(srcs):
+def tools_using_technique(srcs, graph=None):
     """Return technique_id => {tool, relationship} for each tool using the technique.
 
     srcs should be an array of memorystores for enterprise, mobile, and pre
     """
-    return get_related(srcs, "tool", "uses", "attack-pattern", reverse=True)
+    return get_related(srcs, "tool", "uses", "attack-pattern", reverse=True, graph=graph)
 
 
 # technique:mitigation
-def mitigation_mitigates_techniques(srcs):
+def mitigation_mitigates_techniques(srcs, graph=None):
     """Return mitigation_id => {technique, relationship} for each technique mitigated by the mitigation.
 
     srcs should be an array of memorystores for enterprise, mobile, and pre
     """
-    return get_related(srcs, "course-of-action", "mitigates", "attack-pattern", reverse=False)
+    return get_related(srcs, "course-of-action", "mitigates", "attack-pattern", reverse=False, graph=graph)
 
 
-def technique_mitigated_by_mitigation(srcs):
+def technique_mitigated_by_mitigation(srcs, graph=None):
     """Return technique_id => {mitigation, relationship} for each mitigation of the technique.
 
     srcs should be an array of memorystores for enterprise, mobile, and pre
     """
-    return get_related(srcs, "course-of-action", "mitigates", "attack-pattern", reverse=True)
+    return get_related(srcs, "course-of-action", "mitigates", "attack-pattern", reverse=True, graph=graph)
 
 
 # technique:technique
-def technique_related_to_technique(srcs):
+def technique_related_to_technique(srcs, graph=None):
     """Return technique_id => {technique, relationship} for each technique related to the technique.
 
     srcs should be an array of memorystores for enterprise, mobile, and pre
     """
-    return get_related(srcs, "attack-pattern", "related-to", "attack-pattern")
+    return get_related(srcs, "attack-pattern", "related-to", "attack-pattern", graph=graph)
 
 
 # technique:subtechnique
-def subtechniques_of(srcs):
+def subtechniques_of(srcs, graph=None):
     """Return technique_id => {subtechnique, relationship} for each subtechnique of the technique.
 
     srcs should be an array of memorystores for enterprise, mobile, and pre
     """
-    return get_related(srcs, "attack-pattern", "subtechnique-of", "attack-pattern", reverse=True)
+    return get_related(srcs, "attack-pattern", "subtechnique-of", "attack-pattern", reverse=True, graph=graph)
 
 
-def parent_technique_of(srcs):
+def parent_technique_of(srcs, graph=None):
     """Return subtechnique_id => {technique, relationship} describing the parent technique of the subtechnique.
 
     srcs should be an array of memorystores for enterprise, mobile, and pre
     """
-    return get_related(srcs, "attack-pattern", "subtechnique-of", "attack-pattern")
+    return get_related(srcs, "attack-pattern", "subtechnique-of", "attack-pattern", graph=graph)
+
+
+# group => campaign closures
+
+# Colors of the objects a group is related to directly (by the group), by inheritance (by the campaigns attributed to
+# the group) or both, as in the navigator layers of the group, see buildhelpers.technique_used_helper
+DIRECT_COLOR = 1
+INHERITED_COLOR = 2
+BOTH_COLOR = DIRECT_COLOR | INHERITED_COLOR
+
+
+def add_colors(entries):
+    """Return [(RelatedObject, inherited, color)] for the [(RelatedObject, inherited)] entries of a closure.
+
+    The color of an entry is how the object it reaches is reached by all the entries: directly, by inheritance or
+    both. The entries keep their order, so that the citations of the pages are numbered the same.
+    """
+    colors = {}
+    for related, inherited in entries:
+        object_id = related["object"]["id"]
+        colors[object_id] = colors.get(object_id, 0) | (INHERITED_COLOR if inherited else DIRECT_COLOR)
+    return [(related, inherited, colors[related["object"]["id"]]) for related, inherited in entries]
+
+
+def techniques_used_by_groups_with_campaigns(srcs, graph=None):
+    """Return group_id => [(RelatedObject, inherited, color)] for each technique used by the group or its campaigns.
+
+    Techniques are used by the group directly or through the campaigns attributed to it.
+
+    The techniques used directly come first (inherited=False), followed by the techniques of each attributed
+    campaign (inherited=True). color tells whether the technique is used directly, by inheritance or both, see
+    add_colors. Deprecated techniques are skipped.
+
+    srcs should be an array of memorystores for enterprise, mobile, and pre
+    """
+    if graph is None:
+        graph = RelationshipGraph(srcs)
+
+    techniques_by_group = techniques_used_by_groups(srcs, graph=graph)
+    campaigns_by_group = campaigns_attributed_to_group(srcs, graph=graph)
+    techniques_by_campaign = techniques_used_by_campaigns(srcs, graph=graph)
+
+    closure = {}
+    for group_id in chain(techniques_by_group, campaigns_by_group):
+        if group_id in closure:
+            continue
+
+        techniques = [
+            (technique, False)
+            for technique in techniques_by_group.get(group_id, [])
+            if not technique["object"].get("x_mitre_deprecated")
+        ]
+        for campaign in campaigns_by_group.get(group_id, []):
+            techniques.extend(
+                (technique, True)
+                for technique in techniques_by_campaign.get(campaign["object"]["id"], [])
+                if not technique["object"].get("x_mitre_deprecated")
+            )
+
+        closure[group_id] = add_colors(techniques)
+
+    return closure
+
+
+def software_used_by_groups_with_campaigns(srcs, graph=None):
+    """Return group_id => [(RelatedObject, inherited, color)] for each software used by the group or its campaigns.
+
+    Software is used by the group directly or through the campaigns attributed to it.
+
+    Tools and malware used directly come first (inherited=False), followed by the malware and tools of each
+    attributed campaign (inherited=True). Each software is only listed the first time it is reached, color tells
+    whether it is used directly, by inheritance or both, see add_colors.
+
+    srcs should be an array of memorystores for enterprise, mobile, and pre
+    """
+    if graph is None:
+        graph = RelationshipGraph(srcs)
+
+    tools_by_group = tools_used_by_groups(srcs, graph=graph)
+    malware_by_group = malware_used_by_groups(srcs, graph=graph)
+    campaigns_by_group = campaigns_attributed_to_group(srcs, graph=graph)
+    malware_by_campaign = malware_used_by_campaigns(srcs, graph=graph)
+    tools_by_campaign = tools_used_by_campaigns(srcs, graph=graph)
+
+    closure = {}
+    for group_id in chain(tools_by_group, malware_by_group, campaigns_by_group):
+        if group_id in closure:
+            continue
+
+        reached = [(software, False) for software in tools_by_group.get(group_id, [])]
+        reached.extend((software, False) for software in malware_by_group.get(group_id, []))
+        for campaign in campaigns_by_group.get(group_id, []):
+            campaign_id = campaign["object"]["id"]
+            reached.extend((software, True) for software in malware_by_campaign.get(campaign_id, []))
+            reached.extend((software, True) for software in tools_by_campaign.get(campaign_id, []))
+
+        seen = set()
+        software_list = []
+        for software, inherited, color in add_colors(reached):
+            if software["object"]["id"] not in seen:
+                seen.add(software["object"]["id"])
+                software_list.append((software, inherited, color))
+
+        closure[group_id] = software_list
+
+    return closure
+
+
+def groups_using_software_with_campaigns(srcs, graph=None):
+    """Return software_id => [(RelatedObject, inherited, color)] for each group using the software or its campaigns.
+
+    Groups use the software directly or through the campaigns attributed to them.
+
+    The groups using the software directly come first (inherited=False), followed by the groups attributed to each
+    campaign using the software (inherited=True). color tells whether the group uses the software directly, by
+    inheritance or both, see add_colors.
+
+    srcs should be an array of memorystores for enterprise, mobile, and pre
+    """
+    if graph is None:
+        graph = RelationshipGraph(srcs)
+
+    groups_by_campaign = groups_attributed_to_campaign(srcs, graph=graph)
+
+    closure = {}
+    for groups_by_software, campaigns_by_software in (
+        (groups_using_tool(srcs, graph=graph), campaigns_using_tool(srcs, graph=graph)),
+        (groups_using_malware(srcs, graph=graph), campaigns_using_malware(srcs, graph=graph)),
+    ):
+        for software_id in chain(groups_by_software, campaigns_by_software):
+            if software_id in closure:
+                continue
+
+            groups = [(group, False) for group in groups_by_software.get(software_id, [])]
+            for campaign in campaigns_by_software.get(software_id, []):
+                groups.extend((group, True) for group in groups_by_campaign.get(campaign["object"]["id"], []))
+
+            closure[software_id] = add_colors(groups)
+
+    return closure
 
 
 def get_objects_using_notes(srcs):
@@ -345,7 +608,7 @@ def get_objects_using_notes(srcs):
     params:
         srcs: memorystores array
     """
-    notes = query_all(srcs, [Filter("type", "=", "note"), Filter("revoked", "=", False)])
+    notes = get_all_by_type(srcs, "note", include_revoked=False)
 
     # stix_id => [ ids of objects with relationships with stix_id ]
     id_to_notes = {}
@@ -354,8 +617,8 @@ def get_objects_using_notes(srcs):
         if note.get("object_refs"):
             for obj in note["object_refs"]:
                 if obj in id_to_notes:
-                    id_to_notes[obj].append(json.loads(note.serialize()))
+                    id_to_notes[obj].append(note)
                 else:
-                    id_to_notes[obj] = [json.loads(note.serialize())]
+                    id_to_notes[obj] = [note]
 
     return id_to_notes
@@ -0,0 +1,136 @@
+import mmap
+import os
+import pickle
+import struct
+
+from loguru import logger
+
+from . import relationshipgetters, stixstore
+
+# Identifies snapshot files, followed by the layout version
+SNAPSHOT_MAGIC = b"ATKSNAP1"
+
+# Header after the magic: offset and length of the pickled datasets, then the number of out-of-band buffers. It is
+# followed by the offset and length of every buffer.
+HEADER = struct.Struct("<QQQ")
+BUFFER_ENTRY = struct.Struct("<QQ")
+
+# Alignment of the out-of-band buffers in the file, so the NumPy arrays mapped from them are aligned
+BUFFER_ALIGNMENT = 64
+
+# relationshipgetters functions that are not datasets, or datasets that are only computed when asked for
+SKIPPED_GETTERS = ("get_loaded_attack_id_index", "get_stix_changes")
+
+# Snapshot file last written or attached by this process, see get_current_snapshot
+_current_snapshot = None
+
+
+def compute_all():
+    """Compute every dataset of relationshipgetters that was not computed yet."""
+    for name, getter in vars(relationshipgetters).items():
+        if name.startswith("get_") and name not in SKIPPED_GETTERS and callable(getter):
+            getter()
+
+
+def _align(offset):
+    return -(-offset // BUFFER_ALIGNMENT) * BUFFER_ALIGNMENT
+
+
+def export_snapshot(file_path):
+    """Write every dataset of relationshipgetters, computing the missing ones first, to a read-only snapshot file.
+
+    The snapshot is meant for worker processes of the build: they attach to it (see attach_snapshot) instead of
+    loading the STIX bundles and computing the datasets again. The datasets are pickled (protocol 5) with the
+    contiguous buffers of the NumPy arrays of the relationship graph written out-of-band, aligned, after the pickle,
+    so that attached workers map the arrays from the file without copying them.
+    """
+    compute_all()
+
+    buffers = []
+
+    def keep_out_of_band(buffer):
+        try:
+            buffers.append(buffer.raw())
+        except BufferError:
+            # Not contiguous, pickled in-band instead
+            return True
+        return False
+
+    data = pickle.dumps(
+        {"loader_version": stixstore.LOADER_VERSION, "memo": relationshipgetters.memo.export()},
+        protocol=5,
+        buffer_callback=keep_out_of_band,
+    )
+
+    data_offset = len(SNAPSHOT_MAGIC) + HEADER.size + BUFFER_ENTRY.size * len(buffers)
+    buffer_entries = []
+    offset = data_offset + len(data)
+    for buffer in buffers:
+        offset = _align(offset)
+        buffer_entries.append((offset, buffer.nbytes))
+        offset += buffer.nbytes
+
+    tmp_file = f"{file_path}.tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(HEADER.pack(data_offset, len(data), len(buffers)))
+        for entry in buffer_entries:
+            f.write(BUFFER_ENTRY.pack(*entry))
+        f.write(data)
+        for (buffer_offset, _), buffer in zip(buffer_entries, buffers):
+            f.write(b"\0" * (buffer_offset - f.tell()))
+            f.write(buffer)
+    os.replace(tmp_file, file_path)
+
+    global _current_snapshot
+    _current_snapshot = file_path
+
+    logger.debug(f"Wrote snapshot of the STIX datasets to {file_path} ({offset / 2**20:.1f} MiB)")
+    return file_path
+
+
+def attach_snapshot(file_path):
+    """Load the datasets of a snapshot written by export_snapshot into relationshipgetters.
+
+    Afterwards every relationshipgetters getter returns the dataset of the snapshot, so code running in a worker
+    process uses the same API as in the main process. Can be used as the initializer of a process pool. The NumPy
+    arrays are read-only views of the memory-mapped file, shared by every process attached to it; the other
+    datasets are unpickled into the process.
+    """
+    with open(file_path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    view = memoryview(mapped)
+    if view[: len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        raise ValueError(f"{file_path} is not a STIX snapshot")
+
+    data_offset, data_length, buffer_count = HEADER.unpack_from(view, len(SNAPSHOT_MAGIC))
+    buffers = []
+    for i in range(buffer_count):
+        buffer_offset, buffer_length = BUFFER_ENTRY.unpack_from(
+            view, len(SNAPSHOT_MAGIC) + HEADER.size + i * BUFFER_ENTRY.size
+        )
+        buffers.append(view[buffer_offset : buffer_offset + buffer_length])
+
+    snapshot = pickle.loads(view[data_offset : data_offset + data_length], buffers=buffers)
+    if snapshot["loader_version"] != stixstore.LOADER_VERSION:
+        raise ValueError(
+            f"{file_path} was written by loader version {snapshot['loader_version']}, "
+            f"expected {stixstore.LOADER_VERSION}"
+        )
+
+    relationshipgetters.memo.restore(snapshot["memo"])
+
+    global _current_snapshot
+    _current_snapshot = file_path
+
+
+def get_current_snapshot():
+    """Return the snapshot file this process last wrote or attached, or None.
+
+    Worker processes started by a process that has a snapshot can attach the same file instead of a new one being
+    written. The file is only valid as long as its writer keeps it.
+    """
+    if _current_snapshot and os.path.exists(_current_snapshot):
+        return _current_snapshot
+    return None
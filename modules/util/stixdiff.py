@@ -0,0 +1,285 @@
+import hashlib
+import json
+import os
+
+from loguru import logger
+
+from modules import site_config
+
+from . import buildhelpers, stixstore, util_config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Version of the layout of the bundle indexes and change sets, bump it whenever their keys change
+CHANGE_SET_VERSION = 2
+
+# Categories of the objects of a change set, an object is in at most one of them
+OBJECT_CHANGES = ("added", "modified", "deprecated", "revoked", "removed")
+
+# Categories of the relationships of a change set
+RELATIONSHIP_CHANGES = ("added", "modified", "removed")
+
+# References of every object that are not indexed, they point to the identity and markings of the whole bundle
+IGNORED_REFS = ("created_by_ref", "object_marking_refs")
+
+
+def get_digest(stix_obj):
+    """Return the SHA-256 hex digest of the content of a STIX object, independent of the order of its keys."""
+    if isinstance(stix_obj, stixstore.LazyStixObject):
+        stix_obj = stix_obj.to_dict()
+    if orjson:
+        data = orjson.dumps(stix_obj, option=orjson.OPT_SORT_KEYS)
+    else:
+        data = json.dumps(stix_obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+    return hashlib.sha256(data).hexdigest()
+
+
+def get_object_attack_id(stix_obj):
+    """Return the ATT&CK ID in the external references of a STIX object, or None."""
+    external_references = stix_obj.get("external_references")
+    if external_references:
+        index = buildhelpers.find_index_id(external_references)
+        if index != util_config.NOT_FOUND:
+            return external_references[index]["external_id"]
+    return None
+
+
+def get_index_entry(stix_obj, attack_id=None):
+    """Return the bundle index entry of a STIX object: what a change set needs to know about it."""
+    entry = {
+        "type": stix_obj["type"],
+        "modified": stix_obj.get("modified"),
+        "digest": get_digest(stix_obj),
+        "revoked": bool(stix_obj.get("revoked")),
+        "deprecated": bool(stix_obj.get("x_mitre_deprecated")),
+    }
+    if stix_obj["type"] == "relationship":
+        entry["relationship_type"] = stix_obj["relationship_type"]
+        entry["source_ref"] = stix_obj["source_ref"]
+        entry["target_ref"] = stix_obj["target_ref"]
+    else:
+        entry["attack_id"] = attack_id
+        entry["name"] = stix_obj.get("name")
+        entry["refs"] = get_refs(stix_obj)
+    return entry
+
+
+def get_refs(stix_obj):
+    """Return the sorted STIX IDs a STIX object, other than a relationship, refers to in its *_ref(s) properties."""
+    refs = set()
+    for key, value in stix_obj.items():
+        if key in IGNORED_REFS:
+            continue
+        if key.endswith("_ref") and isinstance(value, str):
+            refs.add(value)
+        elif key.endswith("_refs") and isinstance(value, list):
+            refs.update(ref for ref in value if isinstance(ref, str))
+    return sorted(refs)
+
+
+def index_objects(stix_objs):
+    """Return the bundle index (STIX ID => index entry) of STIX objects as they are in a bundle.
+
+    When a STIX ID is there more than once, the most recently modified version is indexed, as in StixStore.
+    """
+    index = {}
+    for stix_obj in stix_objs:
+        current = index.get(stix_obj["id"])
+        if current and current["modified"] and stix_obj.get("modified"):
+            if stix_obj["modified"] <= current["modified"]:
+                continue
+        index[stix_obj["id"]] = get_index_entry(stix_obj, attack_id=get_object_attack_id(stix_obj))
+    return index
+
+
+def index_bundle(file_path):
+    """Return the bundle index of a STIX bundle on disk, parsed one object at a time, see index_objects."""
+    return index_objects(stixstore.iter_bundle_objects(file_path))
+
+
+def _get_change(stix_id, entry, previous_entry=None):
+    change = {"id": stix_id, "type": entry["type"]}
+    if entry["type"] == "relationship":
+        change.update({key: entry[key] for key in ("relationship_type", "source_ref", "target_ref")})
+    else:
+        change.update({"attack_id": entry["attack_id"], "name": entry["name"]})
+    change["modified"] = entry["modified"]
+    if previous_entry:
+        change["previous_modified"] = previous_entry["modified"]
+    return change
+
+
+def _sort_key(change):
+    return (change["type"], change.get("attack_id") or "", change["id"])
+
+
+def diff_indexes(previous, current):
+    """Return the change set between the bundle indexes of the previous and current bundle of a domain.
+
+    Objects, other than relationships, are either added, modified (their modified timestamp or content digest
+    changed), deprecated or revoked (they were not before, whatever else changed) or removed. Relationships are
+    added, modified or removed. Objects at either end of a relationship that changed are listed as
+    relationship_changed, and objects another object that changed refers to (e.g. the data source of a data
+    component) as reference_changed, whether they changed themselves or not. Every list is sorted by type, ATT&CK ID
+    and STIX ID. Runs in time linear in the size of the indexes.
+    """
+    objects = {category: [] for category in OBJECT_CHANGES}
+    relationships = {category: [] for category in RELATIONSHIP_CHANGES}
+    relationship_changed = set()
+    reference_changed = set()
+    unchanged = 0
+
+    def add_change(category, stix_id, entry, previous_entry=None):
+        change = _get_change(stix_id, entry, previous_entry)
+        if entry["type"] == "relationship":
+            relationships[category].append(change)
+            relationship_changed.update((entry["source_ref"], entry["target_ref"]))
+            if previous_entry:
+                relationship_changed.update((previous_entry["source_ref"], previous_entry["target_ref"]))
+        elif category in objects:
+            objects[category].append(change)
+            reference_changed.update(entry["refs"])
+            if previous_entry:
+                reference_changed.update(previous_entry["refs"])
+
+    for stix_id, entry in current.items():
+        previous_entry = previous.get(stix_id)
+        if previous_entry is None:
+            add_change("added", stix_id, entry)
+        elif previous_entry["modified"] == entry["modified"] and previous_entry["digest"] == entry["digest"]:
+            unchanged += 1
+        elif entry["type"] == "relationship":
+            add_change("modified", stix_id, entry, previous_entry)
+        elif entry["revoked"] and not previous_entry["revoked"]:
+            add_change("revoked", stix_id, entry, previous_entry)
+        elif entry["deprecated"] and not previous_entry["deprecated"]:
+            add_change("deprecated", stix_id, entry, previous_entry)
+        else:
+            add_change("modified", stix_id, entry, previous_entry)
+
+    for stix_id, previous_entry in previous.items():
+        if stix_id not in current:
+            add_change("removed", stix_id, previous_entry)
+
+    def get_object_changes(stix_ids):
+        # Only objects of either bundle are listed, relationships can point to objects of another domain
+        changes = []
+        for stix_id in stix_ids:
+            entry = current.get(stix_id) or previous.get(stix_id)
+            if entry and entry["type"] != "relationship":
+                changes.append(_get_change(stix_id, entry))
+        return sorted(changes, key=_sort_key)
+
+    change_set = {category: sorted(changes, key=_sort_key) for category, changes in objects.items()}
+    change_set["relationship_changed"] = get_object_changes(relationship_changed)
+    change_set["reference_changed"] = get_object_changes(reference_changed)
+    change_set["relationships"] = {
+        category: sorted(changes, key=_sort_key) for category, changes in relationships.items()
+    }
+    change_set["unchanged"] = unchanged
+    return change_set
+
+
+def diff_bundles(previous_file, current_file):
+    """Return the change set between two STIX bundles on disk, see diff_indexes."""
+    return diff_indexes(index_bundle(previous_file), index_bundle(current_file))
+
+
+def get_index_file(domain_name):
+    """Return the path of the bundle index recorded for a domain."""
+    return os.path.join(site_config.stix_index_directory, f"{domain_name}.json")
+
+
+def get_change_set_file():
+    """Return the path of the change sets of the last build."""
+    return os.path.join(site_config.stix_index_directory, "changes.json")
+
+
+def load_index(domain_name):
+    """Return the bundle index recorded for a domain by the last build, or None."""
+    index_file = get_index_file(domain_name)
+    if not os.path.exists(index_file):
+        return None
+
+    try:
+        with open(index_file, "rb") as f:
+            index = stixstore.load_json(f.read())
+    except ValueError as e:
+        logger.warning(f"Ignoring unreadable STIX index {index_file}: {e}")
+        return None
+
+    if index.get("version") != CHANGE_SET_VERSION:
+        return None
+    return index
+
+
+def save_json(file_path, data, indent=None):
+    """Write data to a JSON file, replacing it at once."""
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    tmp_file = f"{file_path}.tmp"
+    with open(tmp_file, "w", encoding="utf8") as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+    os.replace(tmp_file, file_path)
+
+
+def update_change_sets(stix_files):
+    """Compare the bundles of every domain with the bundles of the last build and record the change sets.
+
+    For each domain the bundle index of the last build is read from the index directory. When the bundle has the
+    same SHA-256 there are no changes and the objects are not read at all. Otherwise the bundle is indexed, diffed
+    with the previous index and its index recorded for the next build. The raw objects of the bundle are indexed,
+    however the build loads them, so their digests do not depend on --validate-stix. A domain without a previous
+    index has "previous_sha256" set to None and every object added.
+
+    The change sets of all domains are written to changes.json in the index directory, for the later stages of the
+    build and for tooling, and returned as a dict of domain name => change set.
+    """
+    change_sets = {}
+    for domain_name, stix_file in stix_files.items():
+        sha256 = stixstore.get_file_sha256(stix_file)
+        previous = load_index(domain_name)
+
+        previous_sha256 = previous["sha256"] if previous else None
+        if previous_sha256 == sha256:
+            change_set = diff_indexes({}, {})
+            change_set["unchanged"] = previous["count"]
+        else:
+            index = index_bundle(stix_file)
+            change_set = diff_indexes(previous["objects"] if previous else {}, index)
+            save_json(
+                get_index_file(domain_name),
+                {"version": CHANGE_SET_VERSION, "sha256": sha256, "count": len(index), "objects": index},
+            )
+
+        change_sets[domain_name] = {"previous_sha256": previous_sha256, "sha256": sha256, **change_set}
+
+        changes = ", ".join(f"{len(change_set[category])} {category}" for category in OBJECT_CHANGES)
+        relationship_changes = sum(len(changes) for changes in change_set["relationships"].values())
+        logger.info(f"STIX changes in {domain_name}: {changes}, {relationship_changes} relationships changed")
+
+    save_json(get_change_set_file(), {"version": CHANGE_SET_VERSION, "domains": change_sets}, indent=2)
+    return change_sets
+
+
+def has_change_sets():
+    """Return True if a previous build recorded its change sets."""
+    return os.path.exists(get_change_set_file())
+
+
+def get_changed_ids(change_sets):
+    """Return the STIX IDs and ATT&CK IDs of every object of the change sets, whatever the category of its change.
+
+    Pages that show none of them are generated from the same objects and relationships as in the previous build.
+    """
+    stix_ids = set()
+    attack_ids = set()
+    for change_set in change_sets.values():
+        for category in (*OBJECT_CHANGES, "relationship_changed", "reference_changed"):
+            for change in change_set[category]:
+                stix_ids.add(change["id"])
+                if change["attack_id"]:
+                    attack_ids.add(change["attack_id"])
+    return stix_ids, attack_ids
@@ -1,6 +1,9 @@
+import hashlib
 import json
 import os
 import shutil
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
 import requests
@@ -11,28 +14,27 @@ from requests.adapters import HTTPAdapter, Retry
 
 from modules import site_config
 
-from . import buildhelpers, relationshipgetters
+from . import buildhelpers, graphfile, relationshipgetters, stixstore
 from . import relationshiphelpers as rsh
 
+# The loaded STIX data of every domain, see get_stix_memory_stores
+StixData = namedtuple("StixData", ["ms", "srcs", "relationship_graph", "attack_id_index", "stix_files"])
+
 
 def get_mitigation_list(src, get_deprecated=False):
     """Read the STIX and return a list of all mitigations in the STIX."""
-    mitigations = src.query([stix2.Filter("type", "=", "course-of-action"), stix2.Filter("revoked", "=", False)])
+    mitigations = src.get_by_type("course-of-action", include_revoked=False)
 
     if not get_deprecated:
         # Filter out deprecated objects for mitigation pages
-        mitigations = [x for x in mitigations if not hasattr(x, "x_mitre_deprecated") or x.x_mitre_deprecated is False]
+        mitigations = [x for x in mitigations if not x.get("x_mitre_deprecated")]
 
     return sorted(mitigations, key=lambda k: k["name"].lower())
 
 
 def get_matrices(src, domain):
     """Read the STIX and return a list of all matrices in the STIX."""
-    stix_matrices = src.query(
-        [
-            stix2.Filter("type", "=", "x-mitre-matrix"),
-        ]
-    )
+    stix_matrices = src.get_by_type("x-mitre-matrix")
 
     # Filter out by domain
     matrices = []
@@ -48,44 +50,28 @@ def get_matrices(src, domain):
     return matrices
 
 
-def get_datasources(srcs):
-    """Read the STIX and return a list of data sources in the STIX."""
-    datasources = rsh.query_all(srcs, [stix2.Filter("type", "=", "x-mitre-data-source")])
+def get_unique_by_id(stix_objs):
+    """Return the STIX objects without duplicates, keeping the first object of every STIX ID."""
+    unique = {}
+    for stix_obj in stix_objs:
+        unique.setdefault(stix_obj["id"], stix_obj)
+    return list(unique.values())
 
-    resultUsedIds = []
-    results = []
-    # Filter out duplicates
-    for datasource in datasources:
-        if datasource["id"] not in resultUsedIds:
-            results.append(datasource)
-            resultUsedIds.append(datasource["id"])
 
-    return results
+def get_datasources(srcs):
+    """Read the STIX and return a list of data sources in the STIX."""
+    return get_unique_by_id(rsh.get_all_by_type(srcs, "x-mitre-data-source"))
 
 
 def get_datacomponents(srcs):
     """Read the STIX and return a list of data components in the STIX."""
-    datacomponents = rsh.query_all(srcs, [stix2.Filter("type", "=", "x-mitre-data-component")])
-
-    resultUsedIds = []
-    results = []
-    # Filter out duplicates
-    for datacomponent in datacomponents:
-        if datacomponent["id"] not in resultUsedIds:
-            results.append(datacomponent)
-            resultUsedIds.append(datacomponent["id"])
-
-    return results
+    return get_unique_by_id(rsh.get_all_by_type(srcs, "x-mitre-data-component"))
 
 
 def get_tactic_list(src, domain, matrix_id=None):
     """Read the STIX and return a list of all tactics in the STIX."""
     tactics = []
-    matrices = src.query(
-        [
-            stix2.Filter("type", "=", "x-mitre-matrix"),
-        ]
-    )
+    matrices = src.get_by_type("x-mitre-matrix")
 
     matrices = sorted(matrices, key=lambda k: len(k["tactic_refs"]), reverse=True)
 
@@ -93,14 +79,14 @@ def get_tactic_list(src, domain, matrix_id=None):
         for curr_matrix in matrices:
             if curr_matrix["id"] == matrix_id:
                 for tactic_id in curr_matrix["tactic_refs"]:
-                    tactics.append(src.query([stix2.Filter("id", "=", tactic_id)])[0])
+                    tactics.append(src.get(tactic_id))
     else:
         for matrix in matrices:
             for tactic_id in matrix["tactic_refs"]:
-                tactics.append(src.query([stix2.Filter("id", "=", tactic_id)])[0])
+                tactics.append(src.get(tactic_id))
 
     # Filter out by domain
-    tactics = [x for x in tactics if not hasattr(x, "x_mitre_domains") or domain in x.get("x_mitre_domains")]
+    tactics = [x for x in tactics if src.in_domain(x["id"], domain)]
 
     return tactics
 
@@ -110,67 +96,42 @@ def get_all_of_type(src, types):
 
     Removes duplicate STIX and ATT&CK IDs.
     """
-    stix_objs = {}
-    attack_id_objs = {}
-
-    for stix_type in types:
-        result = src.query([stix2.Filter("type", "=", stix_type)])
-        for obj in result:
-            add_replace_or_ignore(
-                stix_objs=stix_objs,
-                attack_id_objs=attack_id_objs,
-                obj_in_question=obj,
-            )
-
-    return [attack_id_objs[key] for key in attack_id_objs]
+    return src.get_merged(types)
 
 
 def get_techniques(src, domain):
     """Read the STIX and return a list of all techniques in the STIX by given domain."""
-    tech_list = src.query([stix2.Filter("type", "=", "attack-pattern"), stix2.Filter("revoked", "=", False)])
-    # Filter out by domain
-    tech_list = [x for x in tech_list if not hasattr(x, "x_mitre_domains") or domain in x.get("x_mitre_domains")]
+    tech_list = src.get_by_domain("attack-pattern", domain, include_revoked=False)
 
     tech_list = sorted(tech_list, key=lambda k: k["name"].lower())
     return tech_list
 
 
 def get_revoked_by(stix_id, src):
-    """Given a stix_id, return an object that revokes it, if no object is found, return None."""
-    relations = src.relationships(stix_id, "revoked-by", source_only=True)
-    revoked_by = src.query(
-        [
-            stix2.Filter("id", "in", [r.target_ref for r in relations]),
-            # this filter was originally used so redirects could not take you to a revoked page
-            # however, there are some techniques that have been revoked, then revoked again,
-            # so removing this filter for now to see if it does more to help or hurt (should work though)
-            # stix2.Filter("revoked", "=", False)
-        ]
-    )
-    if revoked_by:
-        try:
-            revoked_by = revoked_by[0]
-        except IndexError:
-            logger.error("Malformed STIX content detected")
-            logger.error(stix_id)
-            revoked_by = revoked_by[0]
-    return revoked_by
+    """Given a stix_id, return the object that finally replaces it, if no object is found, return None.
+
+    Techniques that have been revoked, then revoked again, are resolved to the last object of the revoked-by chain,
+    so redirects take you to a page that still exists.
+    """
+    return src.get_replacement(stix_id)
 
 
 def get_examples(tech_stix_id, src):
     """Given a technique stix id, return a list of examples with their external references."""
     examples = []
     ext_refs = []
-    for r in src.relationships(tech_stix_id, "uses", target_only=True):
-        if stix2.utils.get_type_from_id(r.source_ref) in ["intrusion-set", "tool", "malware"]:
+    for r in src.get_relationships("uses", target_ref=tech_stix_id):
+        if stix2.utils.get_type_from_id(r["source_ref"]) in ["intrusion-set", "tool", "malware"]:
+            if src.is_revoked(r["source_ref"]) or r["source_ref"] not in src:
+                continue
             curr_refs = None
             attack_id = None
             if "external_references" in r:
-                curr_refs = r.external_references
-            example = src.query([stix2.Filter("id", "=", r.source_ref), stix2.Filter("revoked", "=", False)])[0]
+                curr_refs = r["external_references"]
+            example = src.get(r["source_ref"])
             attack_id = buildhelpers.get_attack_id(example)
             examples.append(
-                {"name": example.name, "id": attack_id, "description": r.description, "ext_refs": curr_refs}
+                {"name": example["name"], "id": attack_id, "description": r.get("description"), "ext_refs": curr_refs}
             )
 
     examples = sorted(examples, key=lambda k: k["name"].lower())
@@ -187,285 +148,279 @@ def get_technique_id_domain_map(ms):
     for domain in site_config.domains:
         if domain["deprecated"]:
             continue
-        curr_list = ms[domain["name"]].query(
-            [stix2.Filter("type", "=", "attack-pattern"), stix2.Filter("revoked", "=", False)]
-        )
+        curr_list = ms[domain["name"]].get_by_domain("attack-pattern", domain["name"], include_revoked=False)
         for val in curr_list:
             technique_id = buildhelpers.get_attack_id(val)
             if technique_id:
-                if val.get("x_mitre_domains"):
-                    if domain["name"] in val["x_mitre_domains"]:
-                        if tech_list.get(technique_id) and domain["name"] not in tech_list[technique_id]:
-                            tech_list[technique_id].append(domain["name"])
-                        else:
-                            tech_list[technique_id] = domain["name"]
-                else:
-                    tech_list[technique_id] = domain["name"]
+                tech_list[technique_id] = domain["name"]
     return tech_list
 
 
-def datacomponent_of():
-    """Build a map from data source STIX ID to data components STIX objects."""
-    datacomponents = relationshipgetters.get_datacomponent_list()
-    datacomponent_of = {}
-    for datacomponent in datacomponents:
-        if not datacomponent_of.get(datacomponent["x_mitre_data_source_ref"]):
-            datacomponent_of[datacomponent["x_mitre_data_source_ref"]] = []
-        datacomponent_of[datacomponent["x_mitre_data_source_ref"]].append(datacomponent)
-
-    return datacomponent_of
+def get_datasource_maps():
+    """Build the maps between data sources, data components and the domains of the techniques they detect.
 
+    Returns a dict of:
+        datacomponent_of: data source STIX ID => data component STIX objects
+        datasource_of: data component STIX ID => data source STIX object
+        domains_of_datacomponent: data component STIX ID => short names of the domains of the techniques it detects
+        domains_of_datasource: data source STIX ID => short names of the domains of its data components that are
+            neither deprecated nor revoked
 
-def get_datasource_from_list(datasource_stix_id):
-    """Return data source object with given data source stix id."""
-    datasources = relationshipgetters.get_datasource_list()
+    Domains are listed in the order their first technique is detected. Every data component is visited once, the
+    data sources are looked up by STIX ID.
+    """
+    datasources = {datasource["id"]: datasource for datasource in relationshipgetters.get_datasource_list()}
+    techniques_detected_by_datacomponent = relationshipgetters.get_techniques_detected_by_datacomponent()
+    technique_to_domain = relationshipgetters.get_technique_to_domain()
 
-    for datasource in datasources:
-        if datasource["id"] == datasource_stix_id:
-            return datasource
+    datacomponent_of = {}
+    datasource_of = {}
+    domains_of_datacomponent = {}
+    domains_of_datasource = {}
+    for datacomponent in relationshipgetters.get_datacomponent_list():
+        datasource_ref = datacomponent["x_mitre_data_source_ref"]
+        datacomponent_of.setdefault(datasource_ref, []).append(datacomponent)
+        if datasource_ref in datasources:
+            datasource_of[datacomponent["id"]] = datasources[datasource_ref]
+
+        # Dicts keep the domains unique, in the order they are found
+        domains = {}
+        for technique_rel in techniques_detected_by_datacomponent.get(datacomponent["id"], []):
+            attack_id = buildhelpers.get_attack_id(technique_rel["object"])
+            if attack_id and attack_id in technique_to_domain:
+                domains[site_config.domain_short_names[technique_to_domain[attack_id]]] = True
+        domains_of_datacomponent[datacomponent["id"]] = list(domains)
+
+        if not datacomponent.get("x_mitre_deprecated") and not datacomponent.get("revoked"):
+            datasource_domains = domains_of_datasource.setdefault(datasource_ref, {})
+            for domain in domains:
+                datasource_domains[domain] = True
+
+    return {
+        "datacomponent_of": datacomponent_of,
+        "datasource_of": datasource_of,
+        "domains_of_datacomponent": domains_of_datacomponent,
+        "domains_of_datasource": {
+            datasource_id: list(domains) for datasource_id, domains in domains_of_datasource.items()
+        },
+    }
 
-    return None
 
+def grab_resources(ms):
+    """Return a dict that contains lists for the software, group, technique and mitigation objects."""
+    srcs = [ms[domain["name"]] for domain in site_config.domains if not domain["deprecated"]]
 
-def datasource_of():
-    """Build map from data component STIX ID to data source STIX object."""
-    datacomponents = relationshipgetters.get_datacomponent_list()
+    # Builds lists from unique ATT&CK IDs across the domains, in a single pass over the objects
+    merged = stixstore.merge_objects(srcs, include_revoked=False)
 
-    datasource_of = {}
-    for datacomponent in datacomponents:
-        if not datasource_of.get(datacomponent["id"]):
-            datasource = get_datasource_from_list(datacomponent["x_mitre_data_source_ref"])
+    def get_domain_resources(types):
+        # Returns sorted list by name of domain resources by given type list
+        return sorted(merged[tuple(types)], key=lambda k: k["name"].lower())
 
-            if datasource:
-                datasource_of[datacomponent["id"]] = datasource
+    resources = {
+        "relationships": rsh.get_all_by_type(srcs, "relationship"),
+        "groups": get_domain_resources(["intrusion-set"]),
+        "software": get_domain_resources(["malware", "tool"]),
+        "techniques": get_domain_resources(["attack-pattern"]),
+        "mitigations": get_domain_resources(["course-of-action"]),
+        "campaigns": get_domain_resources(["campaign"]),
+        "assets": get_domain_resources(["x-mitre-asset"]),
+    }
+    return resources
 
-    return datasource_of
 
+def get_stix_memory_stores():
+    """Read the json files for each domain and create a dict that contains the memory stores for each domain.
+
+    Return a StixData with the memory stores, the memory stores of the non-deprecated domains, the relationship
+    graph of the non-deprecated domains, the ATT&CK ID index of all domains and the bundle file of every domain. All
+    but the bundle files are restored from the STIX cache when none of the bundles has changed since they were
+    cached.
+
+    With --lazy-stix-text the descriptions, detections, external references and note contents of the objects stay
+    encoded in memory and are decoded only when a page reads them, which lowers the memory held by the build. With
+    --stream-stix the bundles are parsed one object at a time instead of as whole documents, which lowers the peak
+    memory of loading them. With --stix-cache-format mapped the cache is a memory-mapped graph file (see graphfile)
+    that is opened without parsing the bundles and read lazily.
+    """
 
-def add_replace_or_ignore(stix_objs, attack_id_objs, obj_in_question):
-    """Add if object does not already exist.
+    ms = {}
+    srcs = []
+    stix_files = {}
 
-    Replace object if exist depending on deprecation status or modified date
-    Ignore if object already exists but object in question is outdated
+    stix_output_dir = Path(f"{site_config.web_directory}/stix")
+    stix_output_dir.mkdir(parents=True, exist_ok=True)
 
-    Deconflicts objects by ATT&CK and STIX IDs
-    """
+    # Download or copy the bundles of every domain at the same time, downloads share one connection pool
+    session = None
+    if any(domain["location"].startswith("http") for domain in site_config.domains):
+        session = get_download_session(pool_size=len(site_config.domains))
 
-    def has_STIX_ATTACK_ID_conflict(attack_id):
-        """Check if STIX ID has been seen before.
+    with ThreadPoolExecutor(max_workers=len(site_config.domains)) as executor:
+        futures = {
+            domain["name"]: executor.submit(
+                fetch_stix_file, domain["location"], f"{stix_output_dir}/{domain['name']}.json", session
+            )
+            for domain in site_config.domains
+        }
+        for domain in site_config.domains:
+            stix_files[domain["name"]] = futures[domain["name"]].result()
 
-        If it has, return ATT&CK ID of conflict ATT&CK if ATT&CK IDs are different.
-        """
-        conflict = stix_objs.get(obj_in_question.get("id"))
-        if conflict:
-            conflict_attack_id = buildhelpers.get_attack_id(conflict)
-            if conflict_attack_id != attack_id and attack_id_objs.get(conflict_attack_id):
-                return conflict_attack_id
+    validate = site_config.args.validate_stix
+    lazy = site_config.args.lazy_stix_text
+    stream = site_config.args.stream_stix
+    use_cache = not site_config.args.no_stix_cache
 
-        return None
+    cache_format = site_config.args.stix_cache_format
 
-    def replace_object(attack_id, conflict_attack_id):
-        # Replaces object on ATT&CK and STIX maps
-        # Verify for STIX to ATT&CK conflict
-        if conflict_attack_id:
-            attack_id_objs[attack_id] = obj_in_question
-            # Remove outdated ATT&CK ID from map
-            attack_id_objs.pop(conflict_attack_id)
+    snapshot = None
+    if use_cache:
+        cache_key = stixstore.get_cache_key(stix_files, validate=validate, lazy=lazy)
+        if cache_format == "mapped":
+            snapshot = load_graph_file(site_config.stix_cache_directory, cache_key)
         else:
-            attack_id_objs[attack_id] = obj_in_question
+            snapshot = stixstore.load_snapshot(site_config.stix_cache_directory, cache_key)
+
+    if snapshot:
+        logger.info(f"Loading STIX from cache: {site_config.stix_cache_directory}")
+        ms = snapshot["ms"]
+        relationship_graph = snapshot["relationship_graph"]
+        attack_id_index = snapshot["attack_id_index"]
+        srcs = [ms[domain["name"]] for domain in site_config.domains if not domain["deprecated"]]
+    else:
+        ms = load_stix_files(stix_files, validate=validate, lazy=lazy, stream=stream)
+        srcs = [ms[domain["name"]] for domain in site_config.domains if not domain["deprecated"]]
 
-        stix_objs[obj_in_question.get("id")] = obj_in_question
+        relationship_graph = rsh.RelationshipGraph(srcs)
+        attack_id_index = stixstore.AttackIdIndex(
+            srcs, [ms[domain["name"]] for domain in site_config.domains if domain["deprecated"]]
+        )
 
-    # Get ATT&CK ID
-    attack_id = buildhelpers.get_attack_id(obj_in_question)
+        if use_cache and cache_format == "mapped":
+            save_graph_file(site_config.stix_cache_directory, cache_key, ms, relationship_graph, attack_id_index)
+        elif use_cache:
+            stixstore.save_snapshot(
+                site_config.stix_cache_directory,
+                cache_key,
+                {"ms": ms, "relationship_graph": relationship_graph, "attack_id_index": attack_id_index},
+            )
 
-    if not attack_id:
-        # Ignore if ATT&CK ID does not exist
-        return
+    return StixData(ms, srcs, relationship_graph, attack_id_index, stix_files)
 
-    # Get ATT&CK ID if there is possible conflict with STIX ID and ATT&CK ID
-    conflict_attack_id = has_STIX_ATTACK_ID_conflict(attack_id)
 
-    # Check if object in question exists by STIX ID
-    stix_id_obj_in_question = stix_objs.get(obj_in_question.get("id"))
-    if not stix_id_obj_in_question:
-        # Add if object does not exist in STIX ID map
-        stix_objs[obj_in_question.get("id")] = obj_in_question
+def load_graph_file(cache_directory, cache_key):
+    """Open the graph file cached under the given key (see graphfile), or return None if there is no usable one."""
+    graph_file = os.path.join(cache_directory, f"{cache_key}.graph")
+    if not os.path.exists(graph_file):
+        return None
 
-    # Get ATT&CK ID conflicts
-    if conflict_attack_id:
-        attack_id_obj_in_conflict = attack_id_objs.get(conflict_attack_id)
-    else:
-        attack_id_obj_in_conflict = attack_id_objs.get(attack_id)
+    try:
+        return graphfile.open_graph_file(graph_file)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable STIX graph file {graph_file}: {e}")
+        return None
 
-    # Add: Object does not exist
-    if not attack_id_obj_in_conflict:
-        # Add if object does not exist in ATT&CK ID map
-        attack_id_objs[attack_id] = obj_in_question
 
-    # Replace: Object already exists
-    # Ignore if object in question is deprecated and object in conflict is not
-    elif not attack_id_obj_in_conflict.get("x_mitre_deprecated") and obj_in_question.get("x_mitre_deprecated"):
-        return
+def save_graph_file(cache_directory, cache_key, ms, relationship_graph, attack_id_index):
+    """Write a graph file to the cache under the given key and remove the graph files of older keys."""
+    os.makedirs(cache_directory, exist_ok=True)
+    graph_file = os.path.join(cache_directory, f"{cache_key}.graph")
+    graphfile.write_graph_file(graph_file, ms, relationship_graph, attack_id_index)
+
+    for filename in os.listdir(cache_directory):
+        if filename.endswith(".graph") and filename != os.path.basename(graph_file):
+            os.remove(os.path.join(cache_directory, filename))
 
-    # If object in conflict is deprecated and recent object is not, select recent
-    elif attack_id_obj_in_conflict.get("x_mitre_deprecated") and not obj_in_question.get("x_mitre_deprecated"):
-        # Replace object in conflict with object in question
-        replace_object(attack_id, conflict_attack_id)
 
-    # Replace if modified date is more recent
+def fetch_stix_file(location, stix_filename, session=None):
+    """Download (http or https) or copy the STIX bundle at location to stix_filename and return stix_filename."""
+    if location.startswith("http"):
+        download_stix_file(url=location, filepath=stix_filename, session=session)
     else:
-        conflict_modified = attack_id_obj_in_conflict.get("modified")
-        in_question_modified = obj_in_question.get("modified")
+        shutil.copy(location, str(stix_filename))
 
-        if in_question_modified > conflict_modified:
-            # Replace object in conflict with object in question
-            replace_object(attack_id, conflict_attack_id)
+    if not os.path.exists(stix_filename):
+        logger.error(f"\n{stix_filename} file does not exist.")
+        exit()
 
+    return stix_filename
 
-def grab_resources(ms):
-    """Return a dict that contains lists for the software, group, technique and mitigation objects."""
 
-    def get_domain_resources(types):
-        # Track objects by STIX ID
-        stix_objs = {}
-        # Track objects by ATT&CK ID
-        attack_id_objs = {}
-        for domain in site_config.domains:
-            if domain["deprecated"]:
-                continue
-
-            for stix_type in types:
-                # Returns sorted list by name of domain resources by given type list
-                # Builds list from unique ATT&CK IDs
-                curr_list = ms[domain["name"]].query(
-                    [stix2.Filter("type", "=", stix_type), stix2.Filter("revoked", "=", False)]
-                )
+def load_stix_files(stix_files, validate=False, lazy=False, stream=False):
+    """Load a dict of domain name => STIX bundle file into a dict of domain name => StixStore.
 
-                for val in curr_list:
-                    add_replace_or_ignore(stix_objs, attack_id_objs, val)
+    With lazy=True the heavy text fields of the objects are kept encoded until they are read (see
+    stixstore.LazyStixObject). With stream=True the bundles are parsed incrementally, one object at a time (see
+    stixstore.iter_bundle_objects).
 
-        # Convert into list of values
-        resource_list = [attack_id_objs[key] for key in attack_id_objs]
-        return sorted(resource_list, key=lambda k: k["name"].lower())
-
-    # Generates the list of techniques
-    tech_list = get_domain_resources(["attack-pattern"])
+    Validating the objects with stix2 is CPU bound, so with validate=True the bundles are loaded in separate
+    processes when more than one CPU is available. Plain JSON loading is faster than sending the loaded stores back
+    from another process and is done in this process.
+    """
+    workers = min(len(stix_files), os.cpu_count() or 1)
+    if not validate or workers < 2:
+        ms = {}
+        for domain_name, stix_file in stix_files.items():
+            logger.info(f"Loading STIX file from: {stix_file}")
+            ms[domain_name] = stixstore.load_store(stix_file, validate=validate, lazy=lazy, stream=stream)
+        return ms
 
-    # Generates list of software
-    software_list = get_domain_resources(["malware", "tool"])
+    logger.info(f"Loading STIX files from: {', '.join(stix_files.values())} ({workers} processes)")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            domain_name: executor.submit(stixstore.load_store, stix_file, validate, lazy, stream)
+            for domain_name, stix_file in stix_files.items()
+        }
+        return {domain_name: future.result() for domain_name, future in futures.items()}
 
-    # Generates list of groups
-    group_list = get_domain_resources(["intrusion-set"])
 
-    # Generates a list of CoA
-    coa_list = get_domain_resources(["course-of-action"])
+# Contributors credited on the contributors page who are not in the STIX content
+EXTRA_CONTRIBUTORS = ["Craig Aitchison", "Elly Searle, CrowdStrike — contributed to tactic definitions"]
 
-    # Generates list of campaigns
-    campaign_list = get_domain_resources(["campaign"])
 
-    # Generates list of assets
-    asset_list = get_domain_resources(["x-mitre-asset"])
+def get_contributions(ms):
+    """Return a dict of contributor name => STIX IDs of the objects crediting them, in every current domain.
 
-    # Generates list of relationships
-    rel_list = []
+    Built from the contributors each store collects while indexing (see StixStore.get_contributors), so the objects
+    are not read again. Names that only differ in case are one contributor, and objects shared by several domains
+    are counted once.
+    """
+    contributions = {contributor.casefold(): (contributor, set()) for contributor in EXTRA_CONTRIBUTORS}
     for domain in site_config.domains:
         if domain["deprecated"]:
             continue
-        curr_list = ms[domain["name"]].query(
-            [
-                stix2.Filter("type", "=", "relationship"),
-            ]
-        )
-        rel_list = rel_list + curr_list
-    resources = {
-        "relationships": rel_list,
-        "groups": group_list,
-        "software": software_list,
-        "techniques": tech_list,
-        "mitigations": coa_list,
-        "campaigns": campaign_list,
-        "assets": asset_list,
-    }
-    return resources
-
+        for contributor, stix_ids in ms[domain["name"]].get_contributors().items():
+            contributions.setdefault(contributor.casefold(), (contributor, set()))[1].update(stix_ids)
 
-def get_stix_memory_stores():
-    """Read the json files for each domain and create a dict that contains the memory stores for each domain."""
-
-    ms = {}
-    srcs = []
-
-    stix_output_dir = Path(f"{site_config.web_directory}/stix")
-    stix_output_dir.mkdir(parents=True, exist_ok=True)
-
-    for domain in site_config.domains:
-        stix_filename = None
-
-        # Download json from http or https
-        stix_filename = f"{stix_output_dir}/{domain['name']}.json"
-        if domain["location"].startswith("http"):
-            download_stix_file(url=domain["location"], filepath=stix_filename)
-        else:
-            shutil.copy(domain["location"], str(stix_filename))
-
-        if os.path.exists(stix_filename):
-            logger.info(f"Loading STIX file from: {stix_filename}")
-            ms[domain["name"]] = stix2.MemoryStore()
-            ms[domain["name"]].load_from_file(stix_filename)
-        else:
-            logger.error(f"\n{stix_filename} file does not exist.")
-            exit()
-
-        if not domain["deprecated"]:
-            srcs.append(ms[domain["name"]])
-
-    return ms, srcs
+    return {contributor: stix_ids for contributor, stix_ids in contributions.values()}
 
 
 def get_contributors(ms):
     """Get all contributors in the STIX content."""
-    # contributors not in STIX are stored here:
-    contributors = ["Craig Aitchison", "Elly Searle, CrowdStrike — contributed to tactic definitions"]
+    return sorted(get_contributions(ms), key=lambda k: k.lower())
 
-    for domain in site_config.domains:
-        if domain["deprecated"]:
-            continue
-        obj_types = [
-            "attack-pattern",
-            "campaign",
-            "course-of-action",
-            "intrusion-set",
-            "malware",
-            "tool",
-            "x-mitre-data-component",
-            "x-mitre-data-source",
-            "x-mitre-tactic",
-            "x-mitre-asset",
-        ]
-        src = ms[domain["name"]]
-        obj_list = []
-        for curr_type in obj_types:
-            obj_list += src.query([stix2.Filter("type", "=", curr_type)])
-
-        for obj in obj_list:
-            if "x_mitre_contributors" in obj:
-                contributors += obj["x_mitre_contributors"]
-    contributors = list(set(contributors))
-
-    return sorted(contributors, key=lambda k: k.lower())
-
-
-def download_stix_file(url, filepath):
-    """Download a STIX file to disk."""
-    logger.info(f"Downloading {url} --> {filepath}")
 
-    # Set proxy
+def get_download_cache_files(url):
+    """Return the cached bundle file and the HTTP validators file used for a STIX bundle URL."""
+    url_hash = hashlib.sha256(url.encode()).hexdigest()[:16]
+    cached_file = os.path.join(site_config.stix_download_directory, f"{url_hash}.json")
+    return cached_file, f"{cached_file}.headers"
+
+
+def get_download_proxies():
+    """Return the proxies passed to every STIX bundle download request."""
     proxy = ""
     if site_config.args.proxy:
         proxy = site_config.args.proxy
-    proxyDict = {"http": proxy, "https": proxy}
+    return {"http": proxy, "https": proxy}
+
 
+def get_download_session(pool_size=1):
+    """Return a requests session set up for STIX bundle downloads (retries, Workbench credentials).
+
+    The session can be shared between threads, pool_size is the number of connections it keeps per host. Proxies
+    are passed with each request (see get_download_proxies), so that they take precedence over the environment.
+    """
     download_from_workbench_instance = False
     if site_config.WORKBENCH_USER and site_config.WORKBENCH_API_KEY:
         download_from_workbench_instance = True
@@ -477,18 +432,72 @@ def download_stix_file(url, filepath):
         auth = (user, password)
 
     s = requests.Session()
+    s.auth = auth
     retries = Retry(total=10, backoff_factor=0.1, status_forcelist=[500, 502, 503, 504])
-    s.mount("http", HTTPAdapter(max_retries=retries))
-    response = s.get(url, proxies=proxyDict, auth=auth)
-
-    if response.status_code == 200:
-        stix_json = response.json()
-        with open(filepath, "w") as json_file:
-            json.dump(stix_json, json_file)
-    elif response.status_code == 404:
-        exit(f"\n{url} stix bundle was not found")
-    else:
-        exit(f"\n{url} stix bundle download was unsuccessful")
+    s.mount("http", HTTPAdapter(max_retries=retries, pool_connections=pool_size, pool_maxsize=pool_size))
+    return s
+
+
+def download_stix_file(url, filepath, session=None):
+    """Download a STIX file to disk.
+
+    A session from get_download_session() can be passed to share its connection pool between downloads. The bundle
+    is kept in the download cache with the ETag and Last-Modified headers of the response. Later builds revalidate
+    the cached copy with a conditional request and only download the bundle again when it has changed. With
+    --offline, the cached copy is used without any request.
+    """
+    cached_file, headers_file = get_download_cache_files(url)
+
+    if site_config.args.offline:
+        if not os.path.exists(cached_file):
+            exit(f"\n{url} stix bundle is not in the download cache, it cannot be used offline")
+        logger.info(f"Using cached {url} --> {filepath}")
+        shutil.copyfile(cached_file, filepath)
+        return
+
+    logger.info(f"Downloading {url} --> {filepath}")
+
+    # Revalidate the cached copy instead of downloading it again if it has not changed
+    headers = {}
+    if os.path.exists(cached_file) and os.path.exists(headers_file):
+        with open(headers_file, "r") as f:
+            validators = json.load(f)
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    if session is None:
+        session = get_download_session()
+
+    with session.get(url, headers=headers, proxies=get_download_proxies(), stream=True) as response:
+        if response.status_code == 304:
+            logger.info(f"{url} stix bundle was not modified, using the cached copy")
+        elif response.status_code == 200:
+            os.makedirs(site_config.stix_download_directory, exist_ok=True)
+
+            # Stream the body to disk as is, the bundle only replaces the cached copy once it is complete
+            tmp_file = f"{cached_file}.tmp"
+            with open(tmp_file, "wb") as f:
+                for chunk in response.iter_content(chunk_size=1024 * 1024):
+                    f.write(chunk)
+            os.replace(tmp_file, cached_file)
+
+            with open(headers_file, "w") as f:
+                json.dump(
+                    {
+                        "url": url,
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                    },
+                    f,
+                )
+        elif response.status_code == 404:
+            exit(f"\n{url} stix bundle was not found")
+        else:
+            exit(f"\n{url} stix bundle download was unsuccessful")
+
+    shutil.copyfile(cached_file, filepath)
 
 
 def get_url_from_stix(stix_object, is_subtechnique=False):
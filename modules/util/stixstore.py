@@ -0,0 +1,878 @@
+import hashlib
+import io
+import json
+import os
+import pickle
+import re
+
+from loguru import logger
+from stix2 import MemoryStore
+from stix2.base import _STIXBase
+from stix2.datastore.filters import FilterSet, apply_common_filters
+from stix2.parsing import parse
+
+from modules import site_config
+
+from . import buildhelpers
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Version of the loaded STIX layout (StixStore, RelationshipGraph), bump it whenever their attributes change so
+# snapshots written by an older loader are not used
+LOADER_VERSION = 9
+
+# Groups of STIX types whose objects are deduplicated together by STIX and ATT&CK ID, see merge_objects
+MERGED_TYPES = (
+    ("attack-pattern",),
+    ("malware", "tool"),
+    ("intrusion-set",),
+    ("course-of-action",),
+    ("campaign",),
+    ("x-mitre-asset",),
+    ("x-mitre-tactic",),
+    ("x-mitre-data-source",),
+)
+
+# STIX types whose x_mitre_contributors are credited on the contributors page, see StixStore.get_contributors
+CONTRIBUTOR_TYPES = (
+    "attack-pattern",
+    "campaign",
+    "course-of-action",
+    "intrusion-set",
+    "malware",
+    "tool",
+    "x-mitre-data-component",
+    "x-mitre-data-source",
+    "x-mitre-tactic",
+    "x-mitre-asset",
+)
+
+# Size of the chunks read from disk when bundles are parsed incrementally, see iter_bundle_objects
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Fields of STIX objects that are kept encoded by lazy stores until they are read, see LazyStixObject
+LAZY_FIELDS = ("description", "x_mitre_detection", "external_references", "content")
+
+
+class LazyStixObject(dict):
+    """STIX object dict whose heavy text fields are kept as encoded JSON bytes until one of them is read.
+
+    The fields listed in LAZY_FIELDS are removed from the dict and encoded together in one bytes blob, which takes
+    much less memory than the decoded strings, lists and dicts. Reading any of them (obj[field], obj.get(field),
+    field in obj) or the object as a whole (iteration, items(), copy, ...) decodes the blob once and puts the fields
+    back in the dict. The other fields are plain dict entries and are read at dict speed.
+    """
+
+    __slots__ = ("_encoded", "_encoded_fields")
+
+    def __init__(self, stix_obj, lazy_fields=LAZY_FIELDS):
+        encoded_fields = tuple(field for field in lazy_fields if field in stix_obj)
+        super().__init__((key, value) for key, value in stix_obj.items() if key not in encoded_fields)
+        self._encoded_fields = encoded_fields
+        self._encoded = dump_json({field: stix_obj[field] for field in encoded_fields}) if encoded_fields else None
+
+    @classmethod
+    def _restore(cls, fields, encoded, encoded_fields):
+        stix_obj = cls.__new__(cls)
+        dict.update(stix_obj, fields)
+        stix_obj._encoded = encoded
+        stix_obj._encoded_fields = encoded_fields
+        return stix_obj
+
+    def __reduce__(self):
+        # Pickle the encoded fields as they are, without decoding them (dict.copy would go through keys())
+        return (LazyStixObject._restore, (dict(dict.items(self)), self._encoded, self._encoded_fields))
+
+    def _decode(self):
+        if self._encoded is not None:
+            dict.update(self, load_json(self._encoded))
+            self._encoded = None
+            self._encoded_fields = ()
+
+    def to_dict(self):
+        """Return a plain dict of the object with the encoded fields decoded, leaving the object itself encoded."""
+        if self._encoded is None:
+            return dict(dict.items(self))
+        return {**dict(dict.items(self)), **load_json(self._encoded)}
+
+    def is_decoded(self):
+        """Return True if the encoded fields were decoded or if there were none."""
+        return self._encoded is None
+
+    def __missing__(self, key):
+        if key in self._encoded_fields:
+            self._decode()
+            return dict.__getitem__(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        """Return the value of key, or default, decoding the encoded fields first if key is one of them."""
+        if key in self._encoded_fields:
+            self._decode()
+        return dict.get(self, key, default)
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key in self._encoded_fields
+
+    def __len__(self):
+        return dict.__len__(self) + len(self._encoded_fields)
+
+    def __iter__(self):
+        self._decode()
+        return dict.__iter__(self)
+
+    def __eq__(self, other):
+        self._decode()
+        if isinstance(other, LazyStixObject):
+            other._decode()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        self._decode()
+        return dict.__repr__(self)
+
+    def keys(self):
+        """Return the keys of the object, decoding the encoded fields first."""
+        self._decode()
+        return dict.keys(self)
+
+    def values(self):
+        """Return the values of the object, decoding the encoded fields first."""
+        self._decode()
+        return dict.values(self)
+
+    def items(self):
+        """Return the items of the object, decoding the encoded fields first."""
+        self._decode()
+        return dict.items(self)
+
+    def copy(self):
+        """Return a plain dict copy of the object, with the encoded fields decoded."""
+        self._decode()
+        return dict.copy(self)
+
+    def pop(self, *args):
+        """Remove key and return its value, decoding the encoded fields first."""
+        self._decode()
+        return dict.pop(self, *args)
+
+    def setdefault(self, key, default=None):
+        """Insert key with default if it is missing and return its value, decoding the encoded fields first."""
+        self._decode()
+        return dict.setdefault(self, key, default)
+
+    def update(self, *args, **kwargs):
+        """Update the object from a dict or keyword arguments, decoding the encoded fields first."""
+        self._decode()
+        dict.update(self, *args, **kwargs)
+
+
+class StixStore:
+    """In-memory store of the STIX objects of a single domain, indexed for constant time lookups.
+
+    The objects are indexed once when they are added, by STIX ID, type, ATT&CK ID and, for relationships, by
+    relationship type, source_ref and target_ref. Lookups through the getters are served from these indexes
+    instead of scanning the whole bundle like stix2.MemoryStore.query() does.
+
+    Objects are kept as plain dicts, created once when they are added. By default they are the objects of the
+    bundle as decoded from JSON. With validate=True every object is parsed and validated by stix2 first, and the
+    canonical JSON form of the parsed object is kept instead. With lazy=True the objects are kept as
+    LazyStixObject, whose heavy text fields stay encoded until they are read. Every lookup returns these same dicts
+    by reference, so callers must treat them as read-only.
+
+    ATT&CK IDs are read from the objects as they are added and kept with the indexes, so indexing a lazy store does
+    not decode the external references.
+
+    If the same STIX ID is added more than once, the most recently modified version is kept.
+    """
+
+    def __init__(self, stix_data=None, lazy=False):
+        self.lazy = lazy
+        self._data = {}
+        self._attack_ids = {}
+        self._by_type = {}
+        self._by_attack_id = {}
+        self._relationships_by_type = {}
+        self._relationships_by_source = {}
+        self._relationships_by_target = {}
+        self._revoked = set()
+        self._deprecated = set()
+        self._replacements = {}
+        self._domain_masks = {}
+        self._domain_lists = {}
+        self._merged = {}
+        self._contributors = {}
+
+        if stix_data:
+            self.add(stix_data)
+
+    def load_from_file(self, file_path, validate=False, stream=False):
+        """Load a JSON STIX bundle or list of STIX objects from disk into the store.
+
+        With stream=True the objects are parsed and added one at a time (see iter_bundle_objects), so the decoded
+        document is never held in memory next to the store.
+        """
+        if stream:
+            self._add_objects(iter_bundle_objects(file_path), validate=validate)
+            self._build_indexes()
+            return
+
+        with open(os.path.abspath(file_path), "rb") as f:
+            stix_data = load_json(f.read())
+
+        self.add(stix_data, validate=validate)
+
+    def add(self, stix_data, validate=False):
+        """Add a bundle, a list of STIX objects or a single STIX object to the store and rebuild the indexes.
+
+        Plain dicts are stored as they are unless validate is set, stix2 objects are always converted to their
+        canonical dict. In a lazy store every object is stored as a LazyStixObject.
+        """
+        if isinstance(stix_data, dict) and stix_data.get("type") == "bundle":
+            stix_data = stix_data.get("objects", [])
+        elif not isinstance(stix_data, list):
+            stix_data = [stix_data]
+
+        self._add_objects(stix_data, validate=validate)
+        self._build_indexes()
+
+    def _add_objects(self, stix_objs, validate=False):
+        """Add an iterable of STIX objects to the store, without rebuilding the indexes."""
+        for stix_obj in stix_objs:
+            if validate or isinstance(stix_obj, _STIXBase):
+                stix_obj = to_canonical_dict(stix_obj)
+
+            current = self._data.get(stix_obj["id"])
+            if current and current.get("modified") and stix_obj.get("modified"):
+                if stix_obj["modified"] <= current["modified"]:
+                    continue
+
+            if stix_obj["type"] != "relationship":
+                self._attack_ids[stix_obj["id"]] = buildhelpers.get_attack_id(stix_obj)
+            if self.lazy and not isinstance(stix_obj, LazyStixObject):
+                stix_obj = LazyStixObject(stix_obj)
+
+            self._data[stix_obj["id"]] = stix_obj
+
+    def _build_indexes(self):
+        """Rebuild every index from the objects in the store."""
+        self._by_type = {}
+        self._by_attack_id = {}
+        self._relationships_by_type = {}
+        self._relationships_by_source = {}
+        self._relationships_by_target = {}
+        self._revoked = set()
+        self._deprecated = set()
+        self._replacements = {}
+        self._domain_masks = {}
+        self._domain_lists = {}
+        self._contributors = {}
+
+        for stix_id, stix_obj in self._data.items():
+            stix_type = stix_obj["type"]
+            self._by_type.setdefault(stix_type, []).append(stix_obj)
+            self._domain_masks[stix_id] = get_domain_mask(stix_obj.get("x_mitre_domains"))
+
+            if stix_obj.get("revoked"):
+                self._revoked.add(stix_id)
+            if stix_obj.get("x_mitre_deprecated"):
+                self._deprecated.add(stix_id)
+
+            if stix_type == "relationship":
+                self._relationships_by_type.setdefault(stix_obj["relationship_type"], []).append(stix_obj)
+                self._relationships_by_source.setdefault(stix_obj["source_ref"], []).append(stix_obj)
+                self._relationships_by_target.setdefault(stix_obj["target_ref"], []).append(stix_obj)
+                continue
+
+            attack_id = self._attack_ids.get(stix_id)
+            if attack_id:
+                self._by_attack_id.setdefault(attack_id, []).append(stix_obj)
+
+            if stix_type in CONTRIBUTOR_TYPES:
+                for contributor in stix_obj.get("x_mitre_contributors") or ():
+                    # Contributors are deduplicated regardless of case, under the first spelling seen
+                    _, stix_ids = self._contributors.setdefault(contributor.casefold(), (contributor, []))
+                    if not stix_ids or stix_ids[-1] != stix_id:
+                        stix_ids.append(stix_id)
+
+        self._build_replacements()
+        self._merged = merge_objects([self])
+
+    def _build_replacements(self):
+        """Map every revoked object to the object that finally replaces it, following chains of revoked-by.
+
+        An object revoked by an object that was revoked in turn is mapped to the last object of the chain. Objects
+        whose chain loops back on itself are not mapped.
+        """
+        revoked_by = {}
+        for relationship in self._relationships_by_type.get("revoked-by", []):
+            if relationship["target_ref"] in self._data:
+                revoked_by.setdefault(relationship["source_ref"], relationship["target_ref"])
+
+        for stix_id in revoked_by:
+            chain = [stix_id]
+            seen = {stix_id}
+            replacement_id = revoked_by[stix_id]
+            while replacement_id in revoked_by and replacement_id not in seen:
+                if replacement_id in self._replacements:
+                    replacement_id = self._replacements[replacement_id]
+                    break
+                chain.append(replacement_id)
+                seen.add(replacement_id)
+                replacement_id = revoked_by[replacement_id]
+
+            if replacement_id in seen:
+                logger.error(f"Cycle in revoked-by relationships: {' -> '.join(chain + [replacement_id])}")
+                replacement_id = None
+
+            for revoked_id in chain:
+                self._replacements[revoked_id] = replacement_id
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, stix_id):
+        return stix_id in self._data
+
+    def get(self, stix_id):
+        """Return the object with the given STIX ID, or None if it is not in the store."""
+        return self._data.get(stix_id)
+
+    def get_attack_id(self, stix_id):
+        """Return the ATT&CK ID of the object with the given STIX ID, or None."""
+        return self._attack_ids.get(stix_id)
+
+    def get_all(self, include_revoked=True):
+        """Return every object in the store."""
+        return self._filter_revoked(self._data.values(), include_revoked)
+
+    def get_contributors(self):
+        """Return a dict of contributor name => STIX IDs of the objects crediting them, see CONTRIBUTOR_TYPES.
+
+        Names that only differ in case are one contributor, under the first spelling in the store. Revoked and
+        deprecated objects are included. The contributors are collected once with the indexes.
+        """
+        return {name: list(stix_ids) for name, stix_ids in self._contributors.values()}
+
+    def get_by_type(self, stix_type, include_revoked=True):
+        """Return the objects of the given STIX type."""
+        return self._filter_revoked(self._by_type.get(stix_type, []), include_revoked)
+
+    def get_by_attack_id(self, attack_id, include_revoked=True):
+        """Return the objects that have the given ATT&CK ID."""
+        return self._filter_revoked(self._by_attack_id.get(attack_id, []), include_revoked)
+
+    def get_by_domain(self, stix_type, domain_name, include_revoked=True):
+        """Return the objects of the given STIX type that belong to the given domain.
+
+        Objects without x_mitre_domains belong to every domain. The list is built once per type and domain and
+        shared between callers, who must not modify it.
+        """
+        key = (stix_type, domain_name, include_revoked)
+        if key not in self._domain_lists:
+            bit = site_config.domain_bits[domain_name]
+            self._domain_lists[key] = [
+                stix_obj
+                for stix_obj in self.get_by_type(stix_type, include_revoked=include_revoked)
+                if self._domain_masks[stix_obj["id"]] & bit
+            ]
+        return self._domain_lists[key]
+
+    def in_domain(self, stix_id, domain_name):
+        """Return True if the object with the given STIX ID belongs to the given domain."""
+        return bool(self._domain_masks.get(stix_id, 0) & site_config.domain_bits[domain_name])
+
+    def get_merged(self, types):
+        """Return the objects of the given STIX types, deduplicated by STIX and ATT&CK ID (see merge_objects).
+
+        Revoked objects are included. The lists of the MERGED_TYPES groups are built once with the indexes.
+        """
+        types = tuple(types)
+        if types in self._merged:
+            return list(self._merged[types])
+        return merge_objects([self], type_groups=[types])[types]
+
+    def get_relationships(self, relationship_type=None, source_ref=None, target_ref=None, include_revoked=True):
+        """Return the relationships matching the given relationship type, source_ref and target_ref.
+
+        Parameters that are None are not filtered on. The most selective index available is used as the
+        starting point, remaining criteria are checked on the (small) candidate list.
+        """
+        if source_ref:
+            candidates = self._relationships_by_source.get(source_ref, [])
+        elif target_ref:
+            candidates = self._relationships_by_target.get(target_ref, [])
+        elif relationship_type:
+            candidates = self._relationships_by_type.get(relationship_type, [])
+        else:
+            candidates = self._by_type.get("relationship", [])
+
+        return [
+            relationship
+            for relationship in candidates
+            if (not relationship_type or relationship["relationship_type"] == relationship_type)
+            and (not source_ref or relationship["source_ref"] == source_ref)
+            and (not target_ref or relationship["target_ref"] == target_ref)
+            and (include_revoked or relationship["id"] not in self._revoked)
+        ]
+
+    def get_replacement(self, stix_id):
+        """Return the object that finally replaces the revoked object with the given STIX ID, or None."""
+        replacement_id = self._replacements.get(stix_id)
+        if replacement_id is None:
+            return None
+        return self._data[replacement_id]
+
+    def is_revoked(self, stix_id):
+        """Return True if the object with the given STIX ID is revoked."""
+        return stix_id in self._revoked
+
+    def is_deprecated(self, stix_id):
+        """Return True if the object with the given STIX ID is deprecated."""
+        return stix_id in self._deprecated
+
+    def query(self, query=None):
+        """Return the objects matching a list of stix2.Filter, for compatibility with stix2.MemoryStore.query.
+
+        Equality filters on "type" or "id" are answered from the indexes before the remaining filters are
+        applied.
+        """
+        query = FilterSet(query)
+
+        candidates = self._data.values()
+        for _filter in query:
+            if _filter.op == "=" and _filter.property == "id":
+                candidates = [self._data[_filter.value]] if _filter.value in self._data else []
+                break
+            if _filter.op == "=" and _filter.property == "type":
+                candidates = self._by_type.get(_filter.value, [])
+
+        return list(apply_common_filters(candidates, query))
+
+    def to_memory_store(self):
+        """Return a stix2.MemoryStore holding the objects of the store, for libraries that expect stix2 objects."""
+        return MemoryStore(stix_data=list(self._data.values()), allow_custom=True)
+
+    def _filter_revoked(self, stix_objs, include_revoked):
+        if include_revoked:
+            return list(stix_objs)
+        return [stix_obj for stix_obj in stix_objs if stix_obj["id"] not in self._revoked]
+
+
+class AttackIdIndex:
+    """Bidirectional index between STIX IDs and ATT&CK IDs over the stores of every domain.
+
+    Built once when the bundles are loaded. Maps the STIX ID of every object to its ATT&CK ID (None when the object
+    has none) and every ATT&CK ID to the objects that have it.
+    """
+
+    def __init__(self, stores, deprecated_stores=None):
+        self._attack_id_by_stix_id = {}
+        self._objects_by_attack_id = {}
+
+        deprecated_stores = deprecated_stores or []
+        for store in list(stores) + list(deprecated_stores):
+            from_deprecated_domain = store in deprecated_stores
+            for stix_obj in store.get_all():
+                if stix_obj["type"] == "relationship":
+                    continue
+
+                attack_id = store.get_attack_id(stix_obj["id"])
+                self._attack_id_by_stix_id.setdefault(stix_obj["id"], attack_id)
+                if attack_id:
+                    self._objects_by_attack_id.setdefault(attack_id, []).append((from_deprecated_domain, stix_obj))
+
+        # Order the objects sharing an ATT&CK ID by preference: objects of the current domains first, then objects
+        # that are not deprecated, then the most recently modified
+        for attack_id, candidates in self._objects_by_attack_id.items():
+            candidates.sort(key=lambda c: c[1].get("modified", ""), reverse=True)
+            candidates.sort(key=lambda c: (c[0], bool(c[1].get("x_mitre_deprecated"))))
+            self._objects_by_attack_id[attack_id] = [stix_obj for _, stix_obj in candidates]
+
+    def __contains__(self, stix_id):
+        return stix_id in self._attack_id_by_stix_id
+
+    def get_attack_id(self, stix_id):
+        """Return the ATT&CK ID of the object with the given STIX ID, or None."""
+        return self._attack_id_by_stix_id.get(stix_id)
+
+    def get_stix_ids(self, attack_id):
+        """Return the STIX IDs of the objects that have the given ATT&CK ID."""
+        return list(dict.fromkeys(stix_obj["id"] for stix_obj in self._objects_by_attack_id.get(attack_id, [])))
+
+    def get_object(self, attack_id, stix_types=None, include_revoked=False):
+        """Return the preferred object with the given ATT&CK ID and one of the given STIX types, or None."""
+        for stix_obj in self._objects_by_attack_id.get(attack_id, []):
+            if stix_types and stix_obj["type"] not in stix_types:
+                continue
+            if not include_revoked and stix_obj.get("revoked"):
+                continue
+            return stix_obj
+        return None
+
+    def get_name(self, attack_id, stix_types=None):
+        """Return the name of the preferred object with the given ATT&CK ID, or None."""
+        stix_obj = self.get_object(attack_id, stix_types=stix_types)
+        if stix_obj:
+            return stix_obj.get("name")
+        return None
+
+    def iter_stix_ids(self):
+        """Yield the (STIX ID, ATT&CK ID or None) of every indexed object."""
+        yield from self._attack_id_by_stix_id.items()
+
+    def iter_attack_ids(self):
+        """Yield the (ATT&CK ID, objects in their order of preference) of every ATT&CK ID."""
+        for attack_id, stix_objs in self._objects_by_attack_id.items():
+            yield attack_id, list(stix_objs)
+
+
+def merge_objects(stores, include_revoked=True, type_groups=MERGED_TYPES):
+    """Deduplicate the objects of each group of STIX types across stores by STIX and ATT&CK ID.
+
+    Objects without an ATT&CK ID are left out. Returns a dict of type group => objects, in the order they were first
+    added. Stores are visited in order and, for each store, types in the order of their group.
+    """
+    # ATT&CK IDs of the objects visited, by object: the same STIX ID can have another ATT&CK ID in another store
+    attack_ids = {}
+
+    def get_attack_id(stix_obj):
+        return attack_ids.get(id(stix_obj))
+
+    merged = {}
+    for types in type_groups:
+        stix_objs = {}
+        attack_id_objs = {}
+        for store in stores:
+            for stix_type in types:
+                for stix_obj in store.get_by_type(stix_type, include_revoked=include_revoked):
+                    attack_ids[id(stix_obj)] = store.get_attack_id(stix_obj["id"])
+                    add_replace_or_ignore(stix_objs, attack_id_objs, stix_obj, get_attack_id=get_attack_id)
+
+        merged[tuple(types)] = list(attack_id_objs.values())
+
+    return merged
+
+
+def add_replace_or_ignore(stix_objs, attack_id_objs, obj_in_question, get_attack_id=None):
+    """Add if object does not already exist.
+
+    Replace object if exist depending on deprecation status or modified date
+    Ignore if object already exists but object in question is outdated
+
+    Deconflicts objects by ATT&CK and STIX IDs. ATT&CK IDs are read with get_attack_id, by default from the
+    external references of the objects.
+    """
+    get_attack_id = get_attack_id or buildhelpers.get_attack_id
+
+    def has_STIX_ATTACK_ID_conflict(attack_id):
+        """Check if STIX ID has been seen before.
+
+        If it has, return ATT&CK ID of conflict ATT&CK if ATT&CK IDs are different.
+        """
+        conflict = stix_objs.get(obj_in_question.get("id"))
+        if conflict:
+            conflict_attack_id = get_attack_id(conflict)
+            if conflict_attack_id != attack_id and attack_id_objs.get(conflict_attack_id):
+                return conflict_attack_id
+
+        return None
+
+    def replace_object(attack_id, conflict_attack_id):
+        # Replaces object on ATT&CK and STIX maps
+        # Verify for STIX to ATT&CK conflict
+        if conflict_attack_id:
+            attack_id_objs[attack_id] = obj_in_question
+            # Remove outdated ATT&CK ID from map
+            attack_id_objs.pop(conflict_attack_id)
+        else:
+            attack_id_objs[attack_id] = obj_in_question
+
+        stix_objs[obj_in_question.get("id")] = obj_in_question
+
+    # Get ATT&CK ID
+    attack_id = get_attack_id(obj_in_question)
+
+    if not attack_id:
+        # Ignore if ATT&CK ID does not exist
+        return
+
+    # Get ATT&CK ID if there is possible conflict with STIX ID and ATT&CK ID
+    conflict_attack_id = has_STIX_ATTACK_ID_conflict(attack_id)
+
+    # Check if object in question exists by STIX ID
+    stix_id_obj_in_question = stix_objs.get(obj_in_question.get("id"))
+    if not stix_id_obj_in_question:
+        # Add if object does not exist in STIX ID map
+        stix_objs[obj_in_question.get("id")] = obj_in_question
+
+    # Get ATT&CK ID conflicts
+    if conflict_attack_id:
+        attack_id_obj_in_conflict = attack_id_objs.get(conflict_attack_id)
+    else:
+        attack_id_obj_in_conflict = attack_id_objs.get(attack_id)
+
+    # Add: Object does not exist
+    if not attack_id_obj_in_conflict:
+        # Add if object does not exist in ATT&CK ID map
+        attack_id_objs[attack_id] = obj_in_question
+
+    # Replace: Object already exists
+    # Ignore if object in question is deprecated and object in conflict is not
+    elif not attack_id_obj_in_conflict.get("x_mitre_deprecated") and obj_in_question.get("x_mitre_deprecated"):
+        return
+
+    # If object in conflict is deprecated and recent object is not, select recent
+    elif attack_id_obj_in_conflict.get("x_mitre_deprecated") and not obj_in_question.get("x_mitre_deprecated"):
+        # Replace object in conflict with object in question
+        replace_object(attack_id, conflict_attack_id)
+
+    # Replace if modified date is more recent
+    else:
+        conflict_modified = attack_id_obj_in_conflict.get("modified")
+        in_question_modified = obj_in_question.get("modified")
+
+        if in_question_modified > conflict_modified:
+            # Replace object in conflict with object in question
+            replace_object(attack_id, conflict_attack_id)
+
+
+def get_domain_mask(domain_names):
+    """Return the domain membership bitmask of a list of domain names (x_mitre_domains).
+
+    Objects without domains belong to every domain, domains unknown to site_config are ignored.
+    """
+    if not domain_names:
+        return sum(site_config.domain_bits.values())
+    return sum(site_config.domain_bits.get(domain_name, 0) for domain_name in set(domain_names))
+
+
+def load_store(file_path, validate=False, lazy=False, stream=False):
+    """Return a new StixStore loaded from a JSON STIX bundle on disk."""
+    store = StixStore(lazy=lazy)
+    store.load_from_file(file_path, validate=validate, stream=stream)
+    return store
+
+
+def iter_bundle_objects(file_path, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield the objects of a JSON STIX bundle, or list of STIX objects, on disk one at a time.
+
+    The file is parsed incrementally: only the object being parsed and a chunk of the file are held in memory. Uses
+    ijson when it is installed, otherwise the stdlib JSON decoder on successive chunks (see JsonStream).
+    """
+    with open(os.path.abspath(file_path), "rb") as f:
+        if ijson:
+            is_list = f.read(64).lstrip()[:1] == b"["
+            f.seek(0)
+            yield from ijson.items(f, "item" if is_list else "objects.item", use_float=True)
+        else:
+            yield from JsonStream(io.TextIOWrapper(f, encoding="utf-8"), chunk_size).iter_bundle_objects()
+
+
+class JsonStream:
+    """Incremental JSON reader over a text file, decoding one value at a time from a buffer of a few chunks.
+
+    Values are decoded with json.JSONDecoder.raw_decode. A value that is cut at the end of the buffer fails to decode
+    (or, for numbers and literals, is followed by nothing but number characters) and is decoded again once the next
+    chunk is read, so values larger than a chunk are supported.
+    """
+
+    _non_whitespace = re.compile(r"\S")
+    _number_tail = re.compile(r"[0-9.eE+-]*\Z")
+
+    def __init__(self, f, chunk_size=STREAM_CHUNK_SIZE):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._keys = {}
+        self._decoder = json.JSONDecoder(object_pairs_hook=self._make_object)
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _make_object(self, pairs):
+        # Share one string per distinct key across the decoded values, json only does it within a single value
+        return {self._keys.setdefault(key, key): value for key, value in pairs}
+
+    def _read(self):
+        """Append the next chunk of the file to the buffer, dropping what was consumed. Return False at the end."""
+        if self._eof:
+            return False
+
+        chunk = self._f.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character without consuming it, or "" at the end of the file."""
+        while True:
+            match = self._non_whitespace.search(self._buffer, self._pos)
+            if match:
+                self._pos = match.start()
+                return self._buffer[self._pos]
+
+            self._pos = len(self._buffer)
+            if not self._read():
+                return ""
+
+    def expect(self, chars):
+        """Consume and return the next character, which must be one of chars."""
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Invalid JSON: expected one of {chars!r}, found {char or 'end of file'!r}")
+        self._pos += 1
+        return char
+
+    def value(self):
+        """Decode and consume the next JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._read():
+                    continue
+                raise
+
+            # A number or literal followed by nothing but number characters may go on in the next chunk
+            if self._buffer[end - 1] not in '"]}' and self._number_tail.match(self._buffer, end) and self._read():
+                continue
+
+            self._pos = end
+            return value
+
+    def iter_array(self):
+        """Yield the values of the array whose opening bracket was just consumed."""
+        if self.peek() == "]":
+            self.expect("]")
+            return
+
+        while True:
+            yield self.value()
+            if self.expect(",]") == "]":
+                return
+
+    def iter_bundle_objects(self):
+        """Yield the values of the objects array of a bundle, or of a top level array."""
+        if self.expect("{[") == "[":
+            yield from self.iter_array()
+            return
+
+        if self.peek() == "}":
+            return
+
+        while True:
+            key = self.value()
+            self.expect(":")
+            if key == "objects":
+                self.expect("[")
+                yield from self.iter_array()
+            else:
+                self.value()
+
+            if self.expect(",}") == "}":
+                return
+
+
+def load_json(data):
+    """Decode JSON bytes or text, with orjson when it is installed."""
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_json(data):
+    """Encode data to JSON bytes, with orjson when it is installed.
+
+    A LazyStixObject is encoded with its encoded fields, which are not entries of the dict until they are read.
+    """
+    if isinstance(data, LazyStixObject):
+        data = data.to_dict()
+    if orjson:
+        # orjson over-allocates the bytes it returns, copy them so long-lived blobs take only their size
+        return memoryview(orjson.dumps(data)).tobytes()
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def to_canonical_dict(stix_obj):
+    """Return the canonical plain dict of a STIX object.
+
+    Objects are parsed and validated by stix2 and serialized back to their JSON form, so the dict holds the same
+    normalized values (e.g. timestamps) that stix2 would write out. Unknown custom objects are returned as is.
+    """
+    if not isinstance(stix_obj, _STIXBase):
+        stix_obj = parse(stix_obj, allow_custom=True)
+
+    if isinstance(stix_obj, _STIXBase):
+        return json.loads(stix_obj.serialize())
+
+    return stix_obj
+
+
+def get_file_sha256(file_path):
+    """Return the SHA-256 hex digest of a file."""
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def get_cache_key(stix_files, validate=False, lazy=False):
+    """Return the cache key for a dict of domain name => STIX bundle file.
+
+    The key is derived from the loader version, the validation and lazy modes, the configured domains (their order
+    sets the domain bitmasks) and the SHA-256 of every bundle, so it changes whenever any bundle or the cache format
+    changes.
+    """
+    domains = ",".join(site_config.domain_bits)
+    sha256 = hashlib.sha256(f"loader-v{LOADER_VERSION};validate={validate};lazy={lazy};domains={domains}".encode())
+    for domain_name, stix_file in sorted(stix_files.items()):
+        sha256.update(f";{domain_name}={get_file_sha256(stix_file)}".encode())
+    return sha256.hexdigest()
+
+
+def load_snapshot(cache_directory, cache_key):
+    """Return the snapshot cached under the given key, or None if there is no usable snapshot."""
+    snapshot_file = os.path.join(cache_directory, f"{cache_key}.pickle")
+    if not os.path.exists(snapshot_file):
+        return None
+
+    try:
+        with open(snapshot_file, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable STIX cache {snapshot_file}: {e}")
+        return None
+
+
+def save_snapshot(cache_directory, cache_key, snapshot):
+    """Write a snapshot to the cache under the given key and remove the snapshots of older keys."""
+    os.makedirs(cache_directory, exist_ok=True)
+    snapshot_file = os.path.join(cache_directory, f"{cache_key}.pickle")
+
+    tmp_file = f"{snapshot_file}.tmp"
+    with open(tmp_file, "wb") as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, snapshot_file)
+
+    for filename in os.listdir(cache_directory):
+        if filename.endswith(".pickle") and filename != os.path.basename(snapshot_file):
+            os.remove(os.path.join(cache_directory, filename))
@@ -21,11 +21,11 @@ def generate_versions():
 
     # Verify if resources directory exists
     if not os.path.isdir(site_config.resources_markdown_path):
-        os.mkdir(site_config.resources_markdown_path)
+        os.makedirs(site_config.resources_markdown_path, exist_ok=True)
 
     # Verify if resources directory exists
     if not os.path.isdir(versions_config.versions_markdown_path):
-        os.mkdir(versions_config.versions_markdown_path)
+        os.makedirs(versions_config.versions_markdown_path, exist_ok=True)
 
     deploy()
 
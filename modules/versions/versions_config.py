@@ -5,6 +5,9 @@ from modules import site_config
 module_name = "Versions"
 priority = 8.1
 
+inputs = ["output"]
+outputs = ["content/pages/resources/versions", "attack-theme/templates/versions", "attack-versions", "output"]
+
 # markdown path for versions
 versions_markdown_path = "content/pages/resources"
 
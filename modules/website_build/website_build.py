@@ -2,6 +2,7 @@ import json
 import os
 import shutil
 import subprocess
+import tempfile
 import hashlib
 from string import Template
 
@@ -274,9 +275,17 @@ def generate_changelog_page():
 
 def pelican_content():
     logger.info("Building website with Pelican")
-    pelican_cmd = "pelican content"
 
-    if site_config.subdirectory:
+    # Incremental builds render a copy of the content where only the pages that changed are written, see
+    # buildmanifest.sync_content
+    content_directory = "content"
+    if site_config.args.incremental:
+        content_directory = site_config.incremental_content_directory
+    pelican_cmd = f"pelican {content_directory}"
+
+    # Pelican compares the output files selected by incremental builds with the files it writes under the output path,
+    # they are only both absolute when the output path is given on the command line
+    if site_config.subdirectory or site_config.args.incremental:
         pelican_cmd = f"{pelican_cmd} -o {site_config.web_directory}"
 
     google_analytics = site_config.GOOGLE_ANALYTICS
@@ -298,7 +307,23 @@ def pelican_content():
 
     logger.debug(f"{pelican_cmd=}")
 
-    subprocess.check_output(pelican_cmd, shell=True)
+    # Fingerprint the pages and what they are rendered with, to only render the pages that changed since last time
+    plan = None
+    if site_config.args.incremental:
+        util.buildmanifest.sync_content(site_config.content_dir, content_directory)
+        manifest = util.buildmanifest.get_manifest({"pelican_cmd": pelican_cmd}, content_directory)
+        plan = util.buildmanifest.get_render_plan(manifest)
+
+    with tempfile.TemporaryDirectory(prefix="attack-website-") as tmp_dir:
+        env = None
+        if plan and plan["selected"] is not None:
+            selected_file = os.path.join(tmp_dir, "write-selected.txt")
+            env = {**os.environ, **util.buildmanifest.write_selected(plan["selected"], selected_file)}
+        subprocess.check_output(pelican_cmd, shell=True, env=env)
+
+    if plan:
+        util.buildmanifest.remove_outputs(plan["stale"])
+        util.buildmanifest.save_manifest(manifest)
 
 
 def remove_pelican_settings():
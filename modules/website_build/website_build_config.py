@@ -9,6 +9,25 @@ from modules import site_config
 module_name = "website_build"
 priority = 16
 
+inputs = [
+    "stix",
+    "content",
+    "attack-theme/templates",
+    "state:menu",
+    "state:resource_nav",
+    site_config.page_inputs_directory,
+]
+outputs = [
+    "content/pages",
+    "attack-theme/templates/general",
+    "attack-theme/templates/website_build",
+    "attack-theme/static",
+    "data/pelican_settings.json",
+    "output",
+    site_config.build_manifest_file,
+    site_config.incremental_content_directory,
+]
+
 # Template directory
 template_dir = os.path.join("attack-theme", "templates", "general/")
 
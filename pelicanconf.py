@@ -36,6 +36,13 @@ DEFAULT_PAGINATION = False
 STATIC_PATHS = ['docs']
 ARTICLE_PATHS = ['pages/updates']
 
+# Only write the output files listed in this file, one per line, instead of every page. Set by incremental builds
+# to the pages whose inputs changed since the last build (see modules/util/buildmanifest.py)
+WRITE_SELECTED = []
+if os.environ.get('PELICAN_WRITE_SELECTED_FILE'):
+    with open(os.environ['PELICAN_WRITE_SELECTED_FILE'], encoding='utf8') as f:
+        WRITE_SELECTED = f.read().splitlines()
+
 # Uncomment following line if you want document-relative URLs when developing
 RELATIVE_URLS = False
 
@@ -0,0 +1,56 @@
+import uuid
+
+import pytest
+
+CREATED = "2023-01-01T00:00:00.000Z"
+
+
+class StixFactory:
+    """Build the STIX 2.1 object dicts of the tests.
+
+    Objects are numbered instead of given random IDs, their STIX IDs are derived from their type and number and
+    are valid UUIDs, so that stix2 also accepts them. The objects belong to the enterprise domain unless
+    x_mitre_domains is given.
+    """
+
+    def id(self, stix_type, number):
+        """Return the STIX ID of the object of the given type and number."""
+        return f"{stix_type}--{uuid.UUID(int=number, version=4)}"
+
+    def object(self, stix_type, number, attack_id=None, **properties):
+        """Return an object of the given type and number, with an ATT&CK ID if one is given."""
+        stix_obj = {
+            "type": stix_type,
+            "spec_version": "2.1",
+            "id": self.id(stix_type, number),
+            "created": CREATED,
+            "modified": CREATED,
+            "x_mitre_domains": ["enterprise-attack"],
+        }
+        if stix_type != "relationship":
+            stix_obj["name"] = f"{stix_type} {number}"
+        if attack_id:
+            stix_obj["external_references"] = [{"source_name": "mitre-attack", "external_id": attack_id}]
+        stix_obj.update(properties)
+        return stix_obj
+
+    def relationship(self, number, relationship_type, source, target, **properties):
+        """Return a relationship of the given type from the source object to the target object."""
+        return self.object(
+            "relationship",
+            number,
+            relationship_type=relationship_type,
+            source_ref=source["id"],
+            target_ref=target["id"],
+            **properties,
+        )
+
+    def bundle(self, stix_objs):
+        """Return a bundle of the given objects."""
+        return {"type": "bundle", "id": self.id("bundle", 1), "objects": list(stix_objs)}
+
+
+@pytest.fixture
+def stix():
+    """Return the factory of the STIX objects of a test."""
+    return StixFactory()
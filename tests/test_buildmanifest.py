@@ -0,0 +1,198 @@
+import os
+import shutil
+
+import pytest
+
+from modules import site_config
+from modules.util import buildmanifest, relationshipgetters, stixdiff
+
+
+@pytest.fixture
+def build(tmp_path, monkeypatch):
+    """Point the output directory and the build manifest to a temporary directory, return its content directory."""
+    monkeypatch.setattr(site_config, "web_directory", str(tmp_path / "output"))
+    monkeypatch.setattr(site_config, "build_manifest_file", str(tmp_path / "build-manifest.json"))
+    content_directory = tmp_path / "content"
+    content_directory.mkdir()
+    return content_directory
+
+
+def write_page(content_directory, name, save_as, data="data: {}"):
+    """Write a markdown page to the content directory."""
+    page = content_directory / "pages" / f"{name}.md"
+    page.parent.mkdir(parents=True, exist_ok=True)
+    page.write_text(f"Title: {name}\nsave_as: {save_as}\n\n{data}\n")
+
+
+def render(plan, manifest):
+    """Write the output file of every page selected by a render plan, like Pelican, and record the manifest."""
+    for page in manifest["pages"].values():
+        output_file = buildmanifest.get_output_path(page["save_as"])
+        if plan["selected"] is None or output_file in plan["selected"]:
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+            with open(output_file, "w") as f:
+                f.write(page["fingerprint"])
+    buildmanifest.remove_outputs(plan["stale"])
+    buildmanifest.save_manifest(manifest)
+
+
+def get_plan(content_directory, settings=None):
+    """Return the manifest of the content directory and its render plan."""
+    manifest = buildmanifest.get_manifest(settings or {"pelican_cmd": "pelican content"}, str(content_directory))
+    return manifest, buildmanifest.get_render_plan(manifest)
+
+
+def test_get_save_as():
+    """save_as is read from the metadata of a page, which ends at the first blank line."""
+    assert buildmanifest.get_save_as(b"Title: A\nsave_as: a/index.html\n\ndata") == "a/index.html"
+    assert buildmanifest.get_save_as(b"Title: A\n\nsave_as: a/index.html") is None
+
+
+def test_render_plan(build):
+    """Only new and changed pages are rendered, and the outputs of removed pages are stale."""
+    write_page(build, "G0001", "groups/G0001/index.html")
+    write_page(build, "G0002", "groups/G0002/index.html")
+    write_page(build, "G0003", "groups/G0003/index.html")
+
+    manifest, plan = get_plan(build)
+    assert plan == {"selected": None, "stale": []}
+    render(plan, manifest)
+
+    manifest, plan = get_plan(build)
+    assert plan == {"selected": [], "stale": []}
+    render(plan, manifest)
+
+    write_page(build, "G0001", "groups/G0001/index.html", data="data: {changed}")
+    write_page(build, "G0004", "groups/G0004/index.html")
+    os.remove(build / "pages" / "G0003.md")
+    manifest, plan = get_plan(build)
+    assert plan == {
+        "selected": [
+            buildmanifest.get_output_path("groups/G0001/index.html"),
+            buildmanifest.get_output_path("groups/G0004/index.html"),
+        ],
+        "stale": [buildmanifest.get_output_path("groups/G0003/index.html")],
+    }
+    render(plan, manifest)
+    assert not os.path.exists(os.path.join(site_config.web_directory, "groups", "G0003"))
+
+    os.remove(buildmanifest.get_output_path("groups/G0002/index.html"))
+    _, plan = get_plan(build)
+    assert plan["selected"] == [buildmanifest.get_output_path("groups/G0002/index.html")]
+
+
+def test_render_plan_renders_every_page_when_settings_change(build):
+    """Every page is rendered when what they are all rendered with changed."""
+    write_page(build, "G0001", "groups/G0001/index.html")
+    manifest, plan = get_plan(build)
+    render(plan, manifest)
+
+    _, plan = get_plan(build, {"pelican_cmd": "pelican content -e SITEURL=x"})
+    assert plan["selected"] is None
+
+
+def test_render_plan_renders_every_page_when_static_files_change(build):
+    """Every page is rendered when a static file of the content was added, changed or removed."""
+    write_page(build, "G0001", "groups/G0001/index.html")
+    document = build / "docs" / "guide.pdf"
+    document.parent.mkdir()
+    document.write_bytes(b"first")
+    manifest, plan = get_plan(build)
+    render(plan, manifest)
+
+    _, plan = get_plan(build)
+    assert plan["selected"] == []
+
+    document.write_bytes(b"second")
+    manifest, plan = get_plan(build)
+    assert plan["selected"] is None
+    render(plan, manifest)
+
+    os.remove(document)
+    _, plan = get_plan(build)
+    assert plan["selected"] is None
+
+
+def test_write_selected_nothing(tmp_path, build):
+    """Pelican is given a file that no page is saved as when no page is selected."""
+    file_path = str(tmp_path / "selected.txt")
+    environment = buildmanifest.write_selected([], file_path)
+
+    with open(environment[buildmanifest.WRITE_SELECTED_VARIABLE]) as f:
+        assert f.read() == buildmanifest.get_output_path(buildmanifest.NOTHING_SELECTED)
+
+
+def test_sync_content(tmp_path):
+    """Only the files that changed are written to the target, the files no longer generated are removed."""
+    content_directory = tmp_path / "content"
+    target_directory = tmp_path / "target"
+    write_page(content_directory, "G0001", "groups/G0001/index.html")
+    write_page(content_directory, "G0002", "groups/G0002/index.html")
+    assert buildmanifest.sync_content(str(content_directory), str(target_directory)) == (2, 0)
+
+    unchanged = target_directory / "pages" / "G0001.md"
+    os.utime(unchanged, (0, 0))
+    write_page(content_directory, "G0002", "groups/G0002/index.html", data="data: {changed}")
+    write_page(content_directory, "G0003", "groups/G0003/index.html")
+    assert buildmanifest.sync_content(str(content_directory), str(target_directory)) == (2, 0)
+    assert os.stat(unchanged).st_mtime == 0
+    assert (target_directory / "pages" / "G0002.md").read_text().endswith("data: {changed}\n")
+
+    os.remove(content_directory / "pages" / "G0001.md")
+    assert buildmanifest.sync_content(str(content_directory), str(target_directory)) == (0, 1)
+    assert sorted(os.listdir(target_directory / "pages")) == ["G0002.md", "G0003.md"]
+
+
+def generate_group_page(group, side_menu):
+    """Page function of test_reuse_pages, the pages are written by the test."""
+
+
+def test_reuse_pages(stix, tmp_path, monkeypatch):
+    """Pages of objects that did not change, and show no object that changed, are copied from the last build."""
+    monkeypatch.setattr(site_config, "content_dir", str(tmp_path / "content"))
+    monkeypatch.setattr(site_config, "incremental_content_directory", str(tmp_path / "previous"))
+    monkeypatch.setattr(site_config, "page_inputs_directory", str(tmp_path / "page-inputs"))
+    monkeypatch.setattr(site_config, "build_manifest_file", str(tmp_path / "build-manifest.json"))
+    markdown_path = str(tmp_path / "content" / "pages" / "groups")
+    os.makedirs(markdown_path)
+    groups = [stix.object("intrusion-set", number, f"G000{number}") for number in range(1, 5)]
+    side_menu = [{"name": "Groups", "children": ["G0001", "G0002", "G0003"]}]
+
+    # The last build generated every page, nothing to reuse yet
+    assert buildmanifest.reuse_pages(generate_group_page, groups[:3], (side_menu,), markdown_path) == groups[:3]
+    write_page(tmp_path / "previous", "groups/G0001", "groups/G0001/index.html", data='data: {"menu": "x"}')
+    write_page(tmp_path / "previous", "groups/G0001-techniques-enterprise", "G0001-layer.json")
+    write_page(tmp_path / "previous", "groups/G0002", "groups/G0002/index.html", data='data: {"uses": ["T0001"]}')
+    write_page(tmp_path / "previous", "groups/G0003", "groups/G0003/index.html", data='data: {"uses": ["T0002"]}')
+    buildmanifest.save_manifest(
+        {
+            "version": buildmanifest.MANIFEST_VERSION,
+            "generator": buildmanifest.get_generator_fingerprint(),
+            "stix": {"enterprise-attack": "previous"},
+            "page_inputs": buildmanifest.load_page_inputs(),
+        }
+    )
+    shutil.rmtree(site_config.page_inputs_directory)
+
+    # T0001 changed since, G0004 is new
+    change_set = stixdiff.diff_indexes(
+        stixdiff.index_objects(
+            [stix.object("attack-pattern", 1, "T0001", name="Old"), stix.object("attack-pattern", 2, "T0002")]
+        ),
+        stixdiff.index_objects(
+            [stix.object("attack-pattern", 1, "T0001", name="New"), stix.object("attack-pattern", 2, "T0002")]
+        ),
+    )
+    relationshipgetters.memo.restore(
+        {
+            "values": {"stix_changes": {"enterprise-attack": {"previous_sha256": "previous", **change_set}}},
+            "dependents": {},
+        }
+    )
+    try:
+        generated = buildmanifest.reuse_pages(generate_group_page, groups, (side_menu,), markdown_path)
+    finally:
+        relationshipgetters.invalidate("stix_changes")
+
+    assert generated == [groups[1], groups[3]]
+    assert sorted(os.listdir(markdown_path)) == ["G0001-techniques-enterprise.md", "G0001.md", "G0003.md"]
@@ -0,0 +1,86 @@
+import pytest
+
+from modules.util import graphfile, stixstore
+from modules.util.relationshiphelpers import RelationshipGraph
+
+
+@pytest.fixture
+def stix_objects(stix):
+    """Return two groups, a software and a technique, with a description, and relationships between them."""
+    group, other_group = stix.object("intrusion-set", 1, "G0001"), stix.object("intrusion-set", 2, "G0002")
+    malware, technique = stix.object("malware", 1, "S0001"), stix.object("attack-pattern", 1, "T0001")
+    for stix_obj in (group, other_group, malware, technique):
+        stix_obj["description"] = f"Description of {stix_obj['name']}"
+    return [
+        group,
+        other_group,
+        malware,
+        technique,
+        stix.relationship(1, "uses", group, malware),
+        stix.relationship(2, "uses", group, technique),
+        stix.relationship(3, "uses", other_group, technique),
+        stix.relationship(4, "mitigates", malware, technique),
+    ]
+
+
+def write_and_open(tmp_path, stix_objects, lazy=False):
+    """Write the objects to a graph file and return their StixStore and the opened graph file."""
+    store = stixstore.StixStore([dict(stix_obj) for stix_obj in stix_objects], lazy=lazy)
+    ms = {"enterprise-attack": store}
+    file_path = str(tmp_path / "stix.graph")
+    graphfile.write_graph_file(file_path, ms, RelationshipGraph([store]), stixstore.AttackIdIndex([store]))
+    return store, graphfile.open_graph_file(file_path)
+
+
+def get_ids(stix_objs):
+    """Return the STIX IDs of a list of objects."""
+    return [stix_obj["id"] for stix_obj in stix_objs]
+
+
+def test_round_trip(stix, stix_objects, tmp_path):
+    """Objects, ATT&CK IDs and the ATT&CK ID index are read back as they were written."""
+    store, snapshot = write_and_open(tmp_path, stix_objects)
+    mapped = snapshot["ms"]["enterprise-attack"]
+
+    assert mapped.get_all() == store.get_all()
+    assert mapped.get_attack_id(stix.id("malware", 1)) == "S0001"
+    assert snapshot["attack_id_index"].get_object("G0002")["name"] == "intrusion-set 2"
+    assert snapshot["attack_id_index"].get_attack_id(stix.id("intrusion-set", 1)) == "G0001"
+
+
+def test_round_trip_of_lazy_objects(stix, stix_objects, tmp_path):
+    """The encoded fields of lazy objects are written to the graph file."""
+    store, snapshot = write_and_open(tmp_path, stix_objects, lazy=True)
+    mapped = snapshot["ms"]["enterprise-attack"]
+
+    # Writing the file must not decode the objects of the store
+    assert not any(stix_obj.is_decoded() for stix_obj in store.get_all() if stix_obj["type"] != "relationship")
+    assert [mapped.get(stix_obj["id"]) for stix_obj in stix_objects] == stix_objects
+    assert mapped.get(stix.id("malware", 1))["description"] == "Description of malware 1"
+    assert snapshot["attack_id_index"].get_object("T0001")["external_references"][0]["external_id"] == "T0001"
+
+
+def test_get_relationships(stix, stix_objects, tmp_path):
+    """Relationship lookups match StixStore, in store order."""
+    store, snapshot = write_and_open(tmp_path, stix_objects)
+    mapped = snapshot["ms"]["enterprise-attack"]
+    group_id, technique_id = stix.id("intrusion-set", 1), stix.id("attack-pattern", 1)
+
+    for criteria in (
+        {},
+        {"relationship_type": "uses"},
+        {"source_ref": group_id},
+        {"target_ref": technique_id},
+        {"relationship_type": "uses", "target_ref": technique_id},
+        {"relationship_type": "mitigates", "source_ref": group_id},
+        {"source_ref": stix.id("malware", 1), "target_ref": technique_id},
+        {"source_ref": stix.id("intrusion-set", 3)},
+        {"relationship_type": "subtechnique-of"},
+    ):
+        assert get_ids(mapped.get_relationships(**criteria)) == get_ids(store.get_relationships(**criteria))
+
+    assert get_ids(mapped.get_relationships(target_ref=technique_id)) == [
+        stix.id("relationship", 2),
+        stix.id("relationship", 3),
+        stix.id("relationship", 4),
+    ]
@@ -0,0 +1,60 @@
+import io
+import json
+
+import pytest
+
+from modules.util import stixstore
+
+OBJECTS = [
+    {"type": "attack-pattern", "id": "attack-pattern--1", "name": "Ünïcode " * 20, "x_mitre_version": "1.0"},
+    {"type": "relationship", "id": "relationship--1", "confidence": 12345.5e-2, "revoked": False, "x": None},
+    {"type": "x-mitre-matrix", "id": "x-mitre-matrix--1", "tactic_refs": [[], {}, [1, [2, {"a": "}]"}]]]},
+]
+
+
+def iter_objects(text, chunk_size):
+    """Return the objects of a JSON text read by JsonStream in chunks of the given size."""
+    return list(stixstore.JsonStream(io.StringIO(text), chunk_size).iter_bundle_objects())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 1024 * 1024])
+def test_bundle(chunk_size):
+    """The objects of a bundle are decoded whatever the chunk size, other keys are skipped."""
+    text = json.dumps({"type": "bundle", "id": "bundle--1", "objects": OBJECTS, "spec_version": "2.1"}, indent=1)
+    assert iter_objects(text, chunk_size) == OBJECTS
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1024])
+def test_list_and_empty_values(chunk_size):
+    """Top level arrays, empty arrays and empty bundles are supported."""
+    assert iter_objects(json.dumps(OBJECTS), chunk_size) == OBJECTS
+    assert iter_objects(" [ ] ", chunk_size) == []
+    assert iter_objects('{"objects": []}', chunk_size) == []
+    assert iter_objects("{}", chunk_size) == []
+
+
+def test_numbers_cut_at_chunk_end():
+    """A number cut at the end of a chunk is decoded once the next chunk is read."""
+    assert iter_objects("[123456789, -1.5e10, 7]", 4) == [123456789, -1.5e10, 7]
+
+
+def test_keys_are_shared():
+    """The keys of the decoded objects are the same string objects."""
+    first, second = iter_objects(json.dumps(OBJECTS[:2]), 16)
+    assert next(key for key in first if key == "type") is next(key for key in second if key == "type")
+
+
+def test_invalid_json():
+    """Invalid or truncated JSON raises ValueError."""
+    with pytest.raises(ValueError):
+        iter_objects('{"objects": [{"id": 1}', 4)
+    with pytest.raises(ValueError):
+        iter_objects("nope", 4)
+
+
+def test_iter_bundle_objects(tmp_path):
+    """Bundles on disk are read one object at a time, with or without ijson."""
+    bundle_file = tmp_path / "bundle.json"
+    bundle_file.write_text(json.dumps({"type": "bundle", "objects": OBJECTS}), encoding="utf-8")
+
+    assert list(stixstore.iter_bundle_objects(str(bundle_file), chunk_size=5)) == OBJECTS
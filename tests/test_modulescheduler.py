@@ -0,0 +1,95 @@
+from modules.util import modulescheduler
+
+
+def make_module(name, priority, inputs=None, outputs=None, run_module=None):
+    """Return a module entry of run_ptr."""
+    module = {"module_name": name, "priority": priority, "run_module": run_module or (lambda: None)}
+    if inputs is not None:
+        module["inputs"] = inputs
+    if outputs is not None:
+        module["outputs"] = outputs
+    return module
+
+
+def make_task(name, inputs, outputs):
+    """Return a task as returned by get_tasks."""
+    return {"name": name, "priority": 0, "run_module": None, "inputs": inputs, "outputs": outputs}
+
+
+def test_normalize_resource():
+    """Equal paths have equal names, state resources are kept as they are."""
+    assert modulescheduler.normalize_resource("./content/pages/") == "content/pages"
+    assert modulescheduler.normalize_resource("state:menu") == "state:menu"
+
+
+def test_conflicts():
+    """Modules conflict when one writes what the other reads or writes, or when one declares nothing."""
+    writer = make_task("writer", [], ["content/pages"])
+
+    assert modulescheduler.conflicts(writer, make_task("reader", ["content/pages/groups"], []))
+    assert modulescheduler.conflicts(writer, make_task("other_writer", [], ["content"]))
+    assert modulescheduler.conflicts(make_task("reader", ["content"], []), writer)
+    assert modulescheduler.conflicts(writer, make_task("undeclared", None, None))
+    assert not modulescheduler.conflicts(writer, make_task("independent", ["stix"], ["content/pages-other"]))
+    assert not modulescheduler.conflicts(make_task("reader", ["stix"], []), make_task("other_reader", ["stix"], []))
+
+
+def test_get_tasks_orders_by_priority_and_loads_stix_first():
+    """Tasks are in priority order, with the STIX task before the first module that reads the STIX data."""
+    run_ptr = [
+        make_module("groups", 6, ["stix"], ["content/pages/groups"]),
+        make_module("clean", 1, [], ["content"]),
+        make_module("tactics", 4, ["stix"], ["content/pages/tactics"]),
+    ]
+
+    tasks = modulescheduler.get_tasks(run_ptr)
+
+    assert [task["name"] for task in tasks] == ["clean", modulescheduler.STIX_TASK, "tactics", "groups"]
+
+
+def test_get_dependencies_follows_priority_without_cycles():
+    """Modules that read what each other write wait for the one with the higher priority, never for each other."""
+    tasks = [
+        make_task("first", ["b"], ["a"]),
+        make_task("second", ["a"], ["b"]),
+        make_task("third", ["c"], ["d"]),
+        make_task("fourth", ["b", "d"], ["e"]),
+    ]
+
+    dependencies = modulescheduler.get_dependencies(tasks)
+
+    assert dependencies == {"first": [], "second": ["first"], "third": [], "fourth": ["second", "third"]}
+
+
+def test_get_direct_dependencies():
+    """Dependencies already waited for through another dependency are left out."""
+    tasks = [make_task("a", [], ["x"]), make_task("b", ["x"], ["y"]), make_task("c", ["x", "y"], [])]
+    dependencies = modulescheduler.get_dependencies(tasks)
+
+    assert dependencies["c"] == ["a", "b"]
+    assert modulescheduler.get_direct_dependencies(tasks, dependencies)["c"] == ["b"]
+
+
+def test_get_critical_path():
+    """The critical path is the chain of dependent tasks with the longest total duration."""
+    tasks = [make_task("a", [], ["x"]), make_task("b", [], ["y"]), make_task("c", ["x"], [])]
+    dependencies = modulescheduler.get_dependencies(tasks)
+
+    path, length = modulescheduler.get_critical_path(tasks, dependencies, {"a": 1.0, "b": 2.5, "c": 2.0})
+
+    assert path == ["a", "c"]
+    assert length == 3.0
+
+
+def test_run_modules_in_priority_order():
+    """With one job, modules run in the main process in priority order."""
+    ran = []
+    run_ptr = [
+        make_module(name, priority, [], [name], run_module=lambda name=name: ran.append(name))
+        for name, priority in (("second", 2), ("third", 3), ("first", 1))
+    ]
+
+    report = modulescheduler.run_modules(run_ptr, jobs=1)
+
+    assert ran == ["first", "second", "third"]
+    assert [task["process"] for task in report["tasks"]] == ["main", "main", "main"]
@@ -0,0 +1,30 @@
+from modules.util import pagepool
+
+
+def test_get_page_chunks_keeps_pages_together(stix):
+    """Objects writing the same page are in the same chunk, every object is in exactly one chunk."""
+    objects = [
+        stix.object("intrusion-set", 1, "G0001"),
+        stix.object("intrusion-set", 2, "G0002"),
+        stix.object("intrusion-set", 3, "G0001"),
+        stix.object("intrusion-set", 4),
+        stix.object("intrusion-set", 5, "G0003"),
+    ]
+
+    chunks = pagepool.get_page_chunks(objects, 3)
+
+    assert sorted(index for chunk in chunks for index in chunk) == list(range(len(objects)))
+    assert any({0, 2} <= set(chunk) for chunk in chunks)
+    assert len(chunks) <= 3
+
+
+def test_generate_pages_in_process(stix):
+    """With one job the pages are generated in this process, in the order of the objects."""
+    generated = []
+    pagepool.generate_pages(
+        lambda stix_obj, suffix: generated.append(stix_obj["name"] + suffix),
+        [stix.object("intrusion-set", 1), stix.object("intrusion-set", 2)],
+        "!",
+    )
+
+    assert generated == ["intrusion-set 1!", "intrusion-set 2!"]
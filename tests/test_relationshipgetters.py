@@ -0,0 +1,68 @@
+from modules.util import relationshipgetters
+
+
+def make_registry(stix_values):
+    """Return a registry of a "stix" entry read from stix_values, a mapping and a closure derived from it."""
+    memo = relationshipgetters.MemoRegistry()
+
+    def get_stix():
+        return memo.get("stix", lambda: stix_values.pop(0))
+
+    def get_mapping():
+        return memo.get("mapping", lambda: [value * 2 for value in get_stix()])
+
+    def get_closure():
+        return memo.get("closure", lambda: sum(get_mapping()))
+
+    return memo, get_stix, get_mapping, get_closure
+
+
+def test_computed_once():
+    """Entries are computed on first use only, empty datasets included."""
+    memo, get_stix, get_mapping, _ = make_registry([[], [1]])
+
+    assert get_mapping() == []
+    assert get_mapping() == []
+    assert get_stix() == []
+    stats = memo.get_stats()["stix"]
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_invalidate_drops_derived_entries():
+    """An invalidated entry is computed again, and so is every entry computed from it."""
+    memo, get_stix, get_mapping, get_closure = make_registry([[1, 2], [5]])
+    assert get_closure() == 6
+    unrelated = memo.get("unrelated", object)
+
+    memo.invalidate("stix")
+
+    assert memo.peek("mapping") is None
+    assert memo.peek("closure") is None
+    assert get_closure() == 10
+    assert get_mapping() == [10]
+    assert get_stix() == [5]
+    assert memo.get("unrelated", object) is unrelated
+
+
+def test_invalidate_derived_entry_only():
+    """Invalidating a derived entry keeps the entries it was computed from."""
+    memo, get_stix, _, get_closure = make_registry([[1], [2]])
+    get_closure()
+
+    memo.invalidate("mapping")
+
+    assert memo.peek("stix") == [1]
+    assert memo.peek("closure") is None
+    assert get_closure() == 2
+
+
+def test_restored_entries_keep_their_dependencies():
+    """Entries restored from an export are still dropped with the entries they were computed from."""
+    memo, _, _, get_closure = make_registry([[1]])
+    get_closure()
+
+    restored = relationshipgetters.MemoRegistry()
+    restored.restore(memo.export())
+    restored.invalidate("stix")
+
+    assert restored.export()["values"] == {}
@@ -0,0 +1,146 @@
+import itertools
+import random
+
+from modules.util import relationshiphelpers, stixstore
+
+
+def make_entry(stix_id):
+    """Return a RelatedObject dict of an object."""
+    return {"object": {"id": stix_id}, "relationship": {}}
+
+
+def test_add_colors():
+    """Every entry is colored by all the ways its object is reached, in the order of the entries."""
+    direct, inherited, both = make_entry("a"), make_entry("b"), make_entry("c")
+    entries = [(direct, False), (both, False), (inherited, True), (both, True), (inherited, True)]
+
+    assert relationshiphelpers.add_colors(entries) == [
+        (direct, False, relationshiphelpers.DIRECT_COLOR),
+        (both, False, relationshiphelpers.BOTH_COLOR),
+        (inherited, True, relationshiphelpers.INHERITED_COLOR),
+        (both, True, relationshiphelpers.BOTH_COLOR),
+        (inherited, True, relationshiphelpers.INHERITED_COLOR),
+    ]
+
+
+def get_related_ids(mapping):
+    """Return stix_id => [related STIX ID] of a get_related mapping."""
+    return {stix_id: [related["object"]["id"] for related in value] for stix_id, value in mapping.items()}
+
+
+def test_relationship_graph(stix):
+    """Relationships of every store are filed once by key, in both directions, without the revoked or deprecated ones."""
+    group, other_group = stix.object("intrusion-set", 1, "G0001"), stix.object("intrusion-set", 2, "G0002")
+    technique, revoked_technique = stix.object("attack-pattern", 1, "T0001"), stix.object(
+        "attack-pattern", 2, revoked=True
+    )
+    uses = stix.relationship(1, "uses", group, technique)
+    enterprise = stixstore.StixStore(
+        [
+            group,
+            other_group,
+            technique,
+            revoked_technique,
+            uses,
+            stix.relationship(2, "uses", other_group, technique, x_mitre_deprecated=True),
+            stix.relationship(3, "uses", other_group, revoked_technique),
+            stix.relationship(4, "uses", other_group, technique, revoked=True),
+        ]
+    )
+    mobile = stixstore.StixStore([group, technique, uses])
+
+    graph = relationshiphelpers.RelationshipGraph([enterprise, mobile])
+
+    assert get_related_ids(graph.related("intrusion-set", "uses", "attack-pattern")) == {
+        group["id"]: [technique["id"]],
+        other_group["id"]: [],
+    }
+    assert get_related_ids(graph.related("intrusion-set", "uses", "attack-pattern", reverse=True)) == {
+        technique["id"]: [group["id"]],
+        revoked_technique["id"]: [other_group["id"]],
+    }
+    assert graph.related("intrusion-set", "mitigates", "attack-pattern") == {}
+    assert relationshiphelpers.techniques_used_by_groups([enterprise], graph=graph) is graph.related(
+        "intrusion-set", "uses", "attack-pattern"
+    )
+
+
+def test_mappings_share_the_objects_of_the_stores(stix):
+    """Related objects, relationships and notes are the dicts of the stores, not copies."""
+    group, technique = stix.object("intrusion-set", 1, "G0001"), stix.object("attack-pattern", 1, "T0001")
+    note = stix.object("note", 1, object_refs=[group["id"], technique["id"]], content="Note")
+    store = stixstore.StixStore(
+        [group, technique, note, stix.relationship(1, "uses", group, technique), stix.object("note", 2, revoked=True)]
+    )
+
+    (related,) = relationshiphelpers.techniques_used_by_groups([store])[group["id"]]
+    assert related["object"] is store.get(technique["id"])
+    assert related["relationship"] is store.get(stix.id("relationship", 1))
+
+    notes = relationshiphelpers.get_objects_using_notes([store])
+    assert notes == {group["id"]: [note], technique["id"]: [note]}
+    assert notes[group["id"]][0] is store.get(note["id"])
+
+
+def get_related_by_scan(srcs, src_type, rel_type, target_type, reverse=False):
+    """Return the get_related mapping as the related IDs and relationship IDs, built by scanning the stores.
+
+    This is how the mappings were built before the relationship graph, every view of the graph must match it.
+    """
+    relationships = {}
+    for src in srcs:
+        for relationship in src.get_relationships(rel_type, include_revoked=False):
+            relationships.setdefault(relationship["id"], relationship)
+
+    related_type = src_type if reverse else target_type
+    targets = {}
+    for src in srcs:
+        for target in src.get_by_type(related_type, include_revoked=related_type.startswith("x-mitre")):
+            targets[target["id"]] = target
+
+    output = {}
+    for relationship in relationships.values():
+        source_ref, target_ref = relationship["source_ref"], relationship["target_ref"]
+        if relationship.get("x_mitre_deprecated") or relationshiphelpers.get_stix_type(source_ref) != src_type:
+            continue
+        if relationshiphelpers.get_stix_type(target_ref) != target_type:
+            continue
+        from_id, related_id = (target_ref, source_ref) if reverse else (source_ref, target_ref)
+        value = output.setdefault(from_id, [])
+        if related_id in targets:
+            value.append((targets[related_id]["id"], relationship["id"]))
+    return output
+
+
+def test_relationship_graph_views_match_a_scan(stix):
+    """Every view of the relationship graph matches the mapping built by scanning the stores."""
+    rng = random.Random(0)
+    types = ["intrusion-set", "malware", "attack-pattern", "x-mitre-data-component"]
+    objects = [
+        stix.object(stix_type, number, revoked=rng.random() < 0.2) for stix_type in types for number in range(1, 6)
+    ]
+    relationships = [
+        stix.relationship(
+            number,
+            rng.choice(["uses", "detects", "subtechnique-of"]),
+            rng.choice(objects),
+            rng.choice(objects),
+            revoked=rng.random() < 0.1,
+            x_mitre_deprecated=rng.random() < 0.1,
+        )
+        for number in range(1, 200)
+    ]
+    srcs = [
+        stixstore.StixStore(rng.sample(objects, 15) + rng.sample(relationships, 120)),
+        stixstore.StixStore(rng.sample(objects, 15) + rng.sample(relationships, 120)),
+    ]
+    graph = relationshiphelpers.RelationshipGraph(srcs)
+
+    for src_type, target_type in itertools.product(types, types):
+        for rel_type in ("uses", "detects", "subtechnique-of"):
+            for reverse in (False, True):
+                view = graph.related(src_type, rel_type, target_type, reverse=reverse)
+                assert {
+                    stix_id: [(related["object"]["id"], related["relationship"]["id"]) for related in value]
+                    for stix_id, value in view.items()
+                } == get_related_by_scan(srcs, src_type, rel_type, target_type, reverse)
@@ -0,0 +1,59 @@
+import pytest
+
+from modules.util import relationshipgetters, relationshiphelpers, sharedsnapshot, stixstore
+
+
+@pytest.fixture
+def memo(stix, monkeypatch):
+    """Restore a STIX store and its relationship graph into the memo of relationshipgetters, clear it afterwards."""
+    group, technique = stix.object("intrusion-set", 1, "G0001"), stix.object("attack-pattern", 1, "T0001")
+    store = stixstore.StixStore([group, technique, stix.relationship(1, "uses", group, technique)])
+    # Only the datasets restored here are written to the snapshot
+    monkeypatch.setattr(sharedsnapshot, "compute_all", lambda: None)
+    monkeypatch.setattr(sharedsnapshot, "_current_snapshot", None)
+    relationshipgetters.memo.restore(
+        {
+            "values": {"store": store, "relationship_graph": relationshiphelpers.RelationshipGraph([store])},
+            "dependents": {"store": {"relationship_graph"}},
+        }
+    )
+    yield relationshipgetters.memo
+    relationshipgetters.invalidate()
+
+
+def get_uses(graph):
+    """Return the techniques used by every group of a relationship graph, as STIX IDs."""
+    return {
+        stix_id: [related["object"]["id"] for related in value]
+        for stix_id, value in graph.related("intrusion-set", "uses", "attack-pattern").items()
+    }
+
+
+def test_attach_snapshot(memo, tmp_path):
+    """Attached datasets are copies of the exported ones, the arrays of the graph are read-only views of the file."""
+    snapshot_file = sharedsnapshot.export_snapshot(str(tmp_path / "snapshot"))
+    exported = memo.peek("relationship_graph")
+    relationshipgetters.invalidate()
+
+    sharedsnapshot.attach_snapshot(snapshot_file)
+    graph = memo.peek("relationship_graph")
+
+    assert graph is not exported
+    assert get_uses(graph) == get_uses(exported)
+    assert memo.peek("store").get_by_attack_id("T0001")[0]["name"] == "attack-pattern 1"
+    assert not graph.edge_source.flags.writeable
+    assert graph.edge_source.ctypes.data % sharedsnapshot.BUFFER_ALIGNMENT == 0
+    assert sharedsnapshot.get_current_snapshot() == snapshot_file
+
+    # Dependencies are restored with the datasets
+    relationshipgetters.invalidate("store")
+    assert memo.peek("relationship_graph") is None
+
+
+def test_attach_invalid_snapshot(tmp_path):
+    """Files that are not snapshots are rejected."""
+    snapshot_file = tmp_path / "snapshot"
+    snapshot_file.write_bytes(b"not a snapshot at all, but long enough to be read")
+
+    with pytest.raises(ValueError):
+        sharedsnapshot.attach_snapshot(str(snapshot_file))
@@ -0,0 +1,128 @@
+import json
+
+from modules import site_config
+from modules.util import stixdiff, stixstore
+
+
+def make_technique(stix, number, **properties):
+    """Return a technique with a description."""
+    return stix.object("attack-pattern", number, **{"description": f"Description of technique {number}", **properties})
+
+
+def index(stix_objs):
+    """Return the bundle index of a list of objects."""
+    return stixdiff.index_objects(stix_objs)
+
+
+def get_ids(changes):
+    """Return the STIX IDs of a list of changes."""
+    return [change["id"] for change in changes]
+
+
+def test_digest_ignores_key_order(stix):
+    """The digest depends on the content of an object only."""
+    stix_obj = make_technique(stix, 1)
+    assert stixdiff.get_digest(stix_obj) == stixdiff.get_digest(dict(reversed(list(stix_obj.items()))))
+    assert stixdiff.get_digest(stix_obj) != stixdiff.get_digest({**stix_obj, "name": "Renamed"})
+
+
+def test_digest_of_lazy_object(stix):
+    """The digest of a lazy object covers its encoded fields, without decoding them."""
+    stix_obj = make_technique(stix, 1)
+    lazy_obj = stixstore.LazyStixObject(stix_obj)
+
+    assert stixdiff.get_digest(lazy_obj) == stixdiff.get_digest(stix_obj)
+    assert not lazy_obj.is_decoded()
+    assert stixdiff.get_digest(lazy_obj) != stixdiff.get_digest(
+        stixstore.LazyStixObject({**stix_obj, "description": "Changed"})
+    )
+
+
+def test_diff_indexes(stix):
+    """Every object and relationship is in the category of its change."""
+    previous = index(
+        [
+            make_technique(stix, 1),
+            make_technique(stix, 2),
+            make_technique(stix, 3),
+            make_technique(stix, 4),
+            make_technique(stix, 5),
+            make_technique(stix, 6),
+            stix.relationship(1, "subtechnique-of", make_technique(stix, 1), make_technique(stix, 2)),
+        ]
+    )
+    current = index(
+        [
+            make_technique(stix, 1),
+            make_technique(stix, 2, description="Changed", x_mitre_data_source_ref=stix.id("attack-pattern", 1)),
+            make_technique(stix, 3, modified="2023-02-01T00:00:00.000Z", x_mitre_deprecated=True),
+            make_technique(stix, 4, modified="2023-02-01T00:00:00.000Z", revoked=True),
+            make_technique(stix, 6),
+            make_technique(stix, 7),
+            stix.relationship(2, "subtechnique-of", make_technique(stix, 6), make_technique(stix, 7)),
+        ]
+    )
+
+    change_set = stixdiff.diff_indexes(previous, current)
+
+    assert get_ids(change_set["added"]) == [stix.id("attack-pattern", 7)]
+    assert get_ids(change_set["modified"]) == [stix.id("attack-pattern", 2)]
+    assert get_ids(change_set["deprecated"]) == [stix.id("attack-pattern", 3)]
+    assert get_ids(change_set["revoked"]) == [stix.id("attack-pattern", 4)]
+    assert get_ids(change_set["removed"]) == [stix.id("attack-pattern", 5)]
+    assert get_ids(change_set["relationships"]["added"]) == [stix.id("relationship", 2)]
+    assert get_ids(change_set["relationships"]["removed"]) == [stix.id("relationship", 1)]
+    assert get_ids(change_set["relationship_changed"]) == [
+        stix.id("attack-pattern", 1),
+        stix.id("attack-pattern", 2),
+        stix.id("attack-pattern", 6),
+        stix.id("attack-pattern", 7),
+    ]
+    assert get_ids(change_set["reference_changed"]) == [stix.id("attack-pattern", 1)]
+    assert change_set["unchanged"] == 2
+
+    stix_ids, attack_ids = stixdiff.get_changed_ids({"enterprise-attack": change_set})
+    assert stix_ids == {stix.id("attack-pattern", number) for number in range(1, 8)}
+    assert attack_ids == set()
+
+
+def test_index_bundle_keeps_most_recent_version(stix, tmp_path):
+    """A STIX ID that is in a bundle twice is indexed with its most recently modified version."""
+    bundle_file = tmp_path / "bundle.json"
+    bundle_file.write_text(
+        json.dumps(
+            stix.bundle(
+                [
+                    make_technique(stix, 1, modified="2023-02-01T00:00:00.000Z", name="New"),
+                    make_technique(stix, 1, name="Old"),
+                ]
+            )
+        )
+    )
+
+    assert stixdiff.index_bundle(str(bundle_file))[stix.id("attack-pattern", 1)]["name"] == "New"
+
+
+def test_update_change_sets(stix, tmp_path, monkeypatch):
+    """Change sets are computed against the index recorded by the previous build."""
+    monkeypatch.setattr(site_config, "stix_index_directory", str(tmp_path / "index"))
+    bundle_file = tmp_path / "enterprise-attack.json"
+
+    def build(stix_objs):
+        bundle_file.write_text(json.dumps(stix.bundle(stix_objs)))
+        return stixdiff.update_change_sets({"enterprise-attack": str(bundle_file)})["enterprise-attack"]
+
+    assert not stixdiff.has_change_sets()
+    first = build([make_technique(stix, 1)])
+    assert stixdiff.has_change_sets()
+    assert first["previous_sha256"] is None
+    assert get_ids(first["added"]) == [stix.id("attack-pattern", 1)]
+
+    unchanged = build([make_technique(stix, 1)])
+    assert unchanged["previous_sha256"] == unchanged["sha256"]
+    assert unchanged["unchanged"] == 1
+
+    changed = build([make_technique(stix, 1, description="Changed"), make_technique(stix, 2)])
+    assert get_ids(changed["modified"]) == [stix.id("attack-pattern", 1)]
+    assert get_ids(changed["added"]) == [stix.id("attack-pattern", 2)]
+    assert (tmp_path / "index" / "changes.json").exists()
@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+
+import pytest
+
+from modules import site_config
+from modules.util import relationshipgetters, relationshiphelpers, stixhelpers, stixstore
+
+URL = "https://example.com/enterprise-attack.json"
+
+
+class Response:
+    """Response of FakeSession, usable as a context manager like a streamed requests response."""
+
+    def __init__(self, status_code, body=b"", headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def iter_content(self, chunk_size):
+        """Yield the body in chunks of the given size."""
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start : start + chunk_size]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class FakeSession:
+    """Session of download_stix_file that answers with the given responses and records the request headers."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers, proxies, stream):
+        """Return the next response."""
+        self.requests.append(headers)
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def downloads(tmp_path, monkeypatch):
+    """Point the download cache to a temporary directory and set the command line arguments of downloads."""
+    monkeypatch.setattr(site_config, "stix_download_directory", str(tmp_path / "downloads"))
+    monkeypatch.setattr(site_config, "args", argparse.Namespace(offline=False, proxy=None))
+    return tmp_path
+
+
+def test_download_is_revalidated(downloads):
+    """The cached bundle is revalidated with its ETag and used as is when it was not modified."""
+    bundle_file = downloads / "bundle.json"
+    session = FakeSession(Response(200, b'{"objects": []}', {"ETag": '"v1"'}), Response(304))
+
+    stixhelpers.download_stix_file(URL, str(bundle_file), session)
+    bundle_file.unlink()
+    stixhelpers.download_stix_file(URL, str(bundle_file), session)
+
+    assert session.requests == [{}, {"If-None-Match": '"v1"'}]
+    assert bundle_file.read_bytes() == b'{"objects": []}'
+
+
+def test_modified_download_replaces_the_cached_bundle(downloads):
+    """A bundle that was modified since it was cached is downloaded again."""
+    bundle_file = downloads / "bundle.json"
+    session = FakeSession(
+        Response(200, b"first", {"Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}), Response(200, b"second")
+    )
+
+    stixhelpers.download_stix_file(URL, str(bundle_file), session)
+    stixhelpers.download_stix_file(URL, str(bundle_file), session)
+
+    assert session.requests[1] == {"If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    assert bundle_file.read_bytes() == b"second"
+
+
+def test_offline_download(downloads):
+    """Offline, the cached bundle is used without any request, and the build stops if there is none."""
+    bundle_file = downloads / "bundle.json"
+    stixhelpers.download_stix_file(URL, str(bundle_file), FakeSession(Response(200, b"cached")))
+    bundle_file.unlink()
+    site_config.args.offline = True
+
+    stixhelpers.download_stix_file(URL, str(bundle_file), FakeSession())
+    assert bundle_file.read_bytes() == b"cached"
+
+    with pytest.raises(SystemExit):
+        stixhelpers.download_stix_file("https://example.com/other.json", str(bundle_file), FakeSession())
+
+
+def test_load_stix_files_in_processes(stix, tmp_path, monkeypatch):
+    """Bundles validated in separate processes are loaded the same as in this process."""
+    stix_files = {}
+    for number, domain_name in enumerate(("enterprise-attack", "mobile-attack"), start=1):
+        stix_files[domain_name] = str(tmp_path / f"{domain_name}.json")
+        technique = stix.object("attack-pattern", number, f"T000{number}", x_mitre_domains=[domain_name])
+        with open(stix_files[domain_name], "w") as f:
+            json.dump(stix.bundle([technique]), f)
+
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+    in_processes = stixhelpers.load_stix_files(stix_files, validate=True)
+    monkeypatch.setattr(os, "cpu_count", lambda: 1)
+    in_process = stixhelpers.load_stix_files(stix_files, validate=True)
+
+    assert list(in_processes) == list(stix_files)
+    for domain_name in stix_files:
+        assert in_processes[domain_name].get_all() == in_process[domain_name].get_all()
+    assert in_processes["mobile-attack"].get_by_attack_id("T0002")[0]["x_mitre_domains"] == ["mobile-attack"]
+
+
+def test_get_contributions(stix):
+    """Contributors of every current domain are merged regardless of case, objects shared by domains count once."""
+    shared = stix.object("attack-pattern", 1, "T0001", x_mitre_contributors=["Ada", "Grace"])
+    ms = {domain["name"]: stixstore.StixStore() for domain in site_config.domains}
+    ms["enterprise-attack"].add([shared, stix.object("x-mitre-matrix", 1, x_mitre_contributors=["Matrix"])])
+    ms["mobile-attack"].add([shared, stix.object("malware", 1, "S0001", x_mitre_contributors=["ada"])])
+    ms["pre-attack"].add(stix.object("attack-pattern", 2, "T0002", x_mitre_contributors=["Deprecated domain"]))
+
+    contributions = stixhelpers.get_contributions(ms)
+
+    assert contributions["Ada"] == {shared["id"], stix.id("malware", 1)}
+    assert contributions["Grace"] == {shared["id"]}
+    assert stixhelpers.get_contributors(ms) == sorted(["Ada", "Grace", *stixhelpers.EXTRA_CONTRIBUTORS], key=str.lower)
+
+
+def test_get_datasource_maps(stix):
+    """Data sources map to their data components and to the domains of the techniques the components detect."""
+    enterprise_technique = stix.object("attack-pattern", 1, "T0001")
+    ics_technique = stix.object("attack-pattern", 2, "T0002")
+    datasource = stix.object("x-mitre-data-source", 1, "DS0001")
+    detecting, deprecated, unknown_source = (
+        stix.object("x-mitre-data-component", 1, x_mitre_data_source_ref=datasource["id"]),
+        stix.object("x-mitre-data-component", 2, x_mitre_data_source_ref=datasource["id"], x_mitre_deprecated=True),
+        stix.object("x-mitre-data-component", 3, x_mitre_data_source_ref=stix.id("x-mitre-data-source", 2)),
+    )
+    store = stixstore.StixStore(
+        [
+            enterprise_technique,
+            ics_technique,
+            datasource,
+            detecting,
+            deprecated,
+            unknown_source,
+            stix.relationship(1, "detects", detecting, ics_technique),
+            stix.relationship(2, "detects", detecting, enterprise_technique),
+            stix.relationship(3, "detects", deprecated, enterprise_technique),
+            stix.relationship(4, "detects", deprecated, stix.object("attack-pattern", 3, "T0003")),
+        ]
+    )
+    relationshipgetters.memo.restore(
+        {
+            "values": {
+                "datasource_list": [datasource],
+                "datacomponent_list": [detecting, deprecated, unknown_source],
+                "techniques_detected_by_datacomponent": relationshiphelpers.techniques_detected_by_datacomponent(
+                    [store]
+                ),
+                "technique_to_domain": {"T0001": "enterprise-attack", "T0002": "ics-attack"},
+            },
+            "dependents": {},
+        }
+    )
+    try:
+        maps = stixhelpers.get_datasource_maps()
+    finally:
+        relationshipgetters.invalidate()
+
+    assert maps["datacomponent_of"] == {
+        datasource["id"]: [detecting, deprecated],
+        unknown_source["x_mitre_data_source_ref"]: [unknown_source],
+    }
+    assert maps["datasource_of"] == {detecting["id"]: datasource, deprecated["id"]: datasource}
+    assert maps["domains_of_datacomponent"] == {
+        detecting["id"]: ["ics", "enterprise"],
+        deprecated["id"]: ["enterprise"],
+        unknown_source["id"]: [],
+    }
+    assert maps["domains_of_datasource"] == {
+        datasource["id"]: ["ics", "enterprise"],
+        unknown_source["x_mitre_data_source_ref"]: [],
+    }
+
+
+def test_get_datacomponents_keeps_the_first_copy(stix):
+    """Data components in several stores are listed once, as found in the first store."""
+    first = stix.object("x-mitre-data-component", 1, name="First")
+    other = stix.object("x-mitre-data-component", 2)
+    srcs = [stixstore.StixStore([first]), stixstore.StixStore([{**first, "name": "Second"}, other])]
+
+    assert stixhelpers.get_datacomponents(srcs) == [first, other]
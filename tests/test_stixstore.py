@@ -0,0 +1,285 @@
+import json
+
+import pytest
+from stix2.exceptions import InvalidValueError
+from stix2.parsing import parse
+
+from modules import site_config
+from modules.util import buildhelpers, stixstore
+
+
+@pytest.fixture
+def techniques(stix):
+    """Return a few techniques and a group, and relationships between them."""
+    return [
+        stix.object("attack-pattern", 1, "T0001", x_mitre_contributors=["Ada"]),
+        stix.object("attack-pattern", 2, "T0002", revoked=True),
+        stix.object("attack-pattern", 3, "T0003", x_mitre_contributors=["ada", "Grace"]),
+        stix.object("attack-pattern", 4, "T0004", x_mitre_deprecated=True),
+        stix.object("intrusion-set", 1, "G0001"),
+    ]
+
+
+@pytest.fixture
+def store(stix, techniques):
+    """Return a StixStore of the techniques and the relationships between them."""
+    first, revoked, replacement, _, group = techniques
+    return stixstore.StixStore(
+        stix.bundle(
+            [
+                *techniques,
+                stix.relationship(1, "uses", group, first),
+                stix.relationship(2, "revoked-by", revoked, replacement),
+                stix.relationship(3, "uses", group, replacement),
+            ]
+        )
+    )
+
+
+def get_ids(stix_objs):
+    """Return the STIX IDs of a list of objects."""
+    return [stix_obj["id"] for stix_obj in stix_objs]
+
+
+def test_lookups(stix, store):
+    """Objects are looked up by STIX ID, type and ATT&CK ID."""
+    assert len(store) == 8
+    assert stix.id("attack-pattern", 1) in store
+    assert store.get(stix.id("attack-pattern", 5)) is None
+    assert store.get_attack_id(stix.id("attack-pattern", 3)) == "T0003"
+    assert get_ids(store.get_by_attack_id("T0001")) == [stix.id("attack-pattern", 1)]
+    assert get_ids(store.get_by_type("attack-pattern", include_revoked=False)) == [
+        stix.id("attack-pattern", 1),
+        stix.id("attack-pattern", 3),
+        stix.id("attack-pattern", 4),
+    ]
+    assert store.is_revoked(stix.id("attack-pattern", 2))
+    assert store.is_deprecated(stix.id("attack-pattern", 4))
+
+
+def test_get_relationships(stix, store):
+    """Relationships are filtered on every criterion given, in the order they were added."""
+    group_id = stix.id("intrusion-set", 1)
+
+    assert get_ids(store.get_relationships(source_ref=group_id)) == [
+        stix.id("relationship", 1),
+        stix.id("relationship", 3),
+    ]
+    assert get_ids(store.get_relationships("uses", target_ref=stix.id("attack-pattern", 3))) == [
+        stix.id("relationship", 3)
+    ]
+    assert get_ids(store.get_relationships("revoked-by")) == [stix.id("relationship", 2)]
+    assert store.get_relationships("uses", source_ref=stix.id("attack-pattern", 1)) == []
+
+
+def test_replacement_and_contributors(stix, store):
+    """Revoked objects map to their replacement, contributors are deduplicated regardless of case."""
+    assert store.get_replacement(stix.id("attack-pattern", 2))["id"] == stix.id("attack-pattern", 3)
+    assert store.get_replacement(stix.id("attack-pattern", 1)) is None
+    assert store.get_contributors() == {
+        "Ada": [stix.id("attack-pattern", 1), stix.id("attack-pattern", 3)],
+        "Grace": [stix.id("attack-pattern", 3)],
+    }
+
+
+def test_most_recent_version_is_kept(stix):
+    """An object added again is only replaced by a more recently modified version."""
+    stix_id = stix.id("attack-pattern", 1)
+    store = stixstore.StixStore([stix.object("attack-pattern", 1, "T0001", name="Old")])
+    store.add(stix.object("attack-pattern", 1, "T0001", modified="2022-01-01T00:00:00.000Z", name="Older"))
+    assert store.get(stix_id)["name"] == "Old"
+
+    store.add(stix.object("attack-pattern", 1, "T0001", modified="2024-01-01T00:00:00.000Z", name="New"))
+    assert store.get(stix_id)["name"] == "New"
+
+
+def test_lazy_object(stix):
+    """The heavy text fields of a lazy object are only decoded when one of them is read."""
+    stix_obj = stix.object("attack-pattern", 1, "T0001", description="Text")
+    lazy_obj = stixstore.LazyStixObject(stix_obj)
+
+    assert lazy_obj["name"] == "attack-pattern 1"
+    assert "description" in lazy_obj
+    assert len(lazy_obj) == len(stix_obj)
+    assert not lazy_obj.is_decoded()
+    assert lazy_obj.to_dict() == stix_obj
+    assert not lazy_obj.is_decoded()
+
+    assert lazy_obj["description"] == "Text"
+    assert lazy_obj.is_decoded()
+    assert lazy_obj == stix_obj
+
+
+def test_lazy_store(stix):
+    """A lazy store holds lazy objects and answers the same lookups without decoding them."""
+    stix_id = stix.id("attack-pattern", 1)
+    store = stixstore.StixStore([stix.object("attack-pattern", 1, "T0001", description="Text")], lazy=True)
+    stix_obj = store.get(stix_id)
+
+    assert isinstance(stix_obj, stixstore.LazyStixObject)
+    assert store.get_attack_id(stix_id) == "T0001"
+    assert not stix_obj.is_decoded()
+    assert stixstore.load_json(stixstore.dump_json(stix_obj))["description"] == "Text"
+
+
+def test_stix2_objects_are_kept_as_canonical_dicts(stix):
+    """stix2 objects are converted once to the plain dicts stix2 writes out, custom objects are kept as they are."""
+    stix_obj = stix.object("attack-pattern", 1, "T0001", modified="2024-01-01T00:00:00Z")
+    custom_obj = {"type": "x-custom-object", "id": "x-custom-object--1"}
+    store = stixstore.StixStore([parse(stix_obj, allow_custom=True)])
+
+    assert type(store.get(stix_obj["id"])) is dict
+    assert store.get(stix_obj["id"]) == {**stix_obj, "modified": "2024-01-01T00:00:00.000Z"}
+    assert stixstore.to_canonical_dict(custom_obj) is custom_obj
+
+
+def test_load_store_validates_on_request(stix, tmp_path):
+    """Bundles are loaded as plain JSON, stix2 only parses and rejects invalid objects with validate=True."""
+    bundle_file = tmp_path / "bundle.json"
+    invalid_obj = stix.object("attack-pattern", 2, "T0002", created="not a timestamp")
+    bundle_file.write_text(json.dumps(stix.bundle([stix.object("attack-pattern", 1, "T0001"), invalid_obj])))
+
+    store = stixstore.load_store(str(bundle_file))
+    assert store.get(invalid_obj["id"]) == invalid_obj
+    assert store.get_by_attack_id("T0001")[0]["modified"] == "2023-01-01T00:00:00.000Z"
+
+    with pytest.raises(InvalidValueError):
+        stixstore.load_store(str(bundle_file), validate=True)
+
+
+def test_cache_key_changes_with_the_bundles_and_modes(stix, tmp_path):
+    """The cache key changes when a bundle or the loading mode changes, and only then."""
+    bundle_file = tmp_path / "enterprise-attack.json"
+    bundle_file.write_text(json.dumps(stix.bundle([stix.object("attack-pattern", 1, "T0001")])))
+    stix_files = {"enterprise-attack": str(bundle_file)}
+    cache_key = stixstore.get_cache_key(stix_files)
+
+    assert stixstore.get_cache_key(stix_files) == cache_key
+    assert stixstore.get_cache_key(stix_files, validate=True) != cache_key
+    assert stixstore.get_cache_key(stix_files, lazy=True) != cache_key
+
+    bundle_file.write_text(json.dumps(stix.bundle([stix.object("attack-pattern", 1, "T0001", name="Changed")])))
+    assert stixstore.get_cache_key(stix_files) != cache_key
+
+
+def test_snapshots(tmp_path):
+    """A snapshot is read back under its key only, older snapshots are removed and unreadable ones ignored."""
+    cache_directory = str(tmp_path / "cache")
+    stixstore.save_snapshot(cache_directory, "old", {"ms": "old"})
+    stixstore.save_snapshot(cache_directory, "new", {"ms": "new"})
+
+    assert stixstore.load_snapshot(cache_directory, "new") == {"ms": "new"}
+    assert stixstore.load_snapshot(cache_directory, "old") is None
+
+    (tmp_path / "cache" / "new.pickle").write_bytes(b"truncated")
+    assert stixstore.load_snapshot(cache_directory, "new") is None
+
+
+def test_attack_id_index(stix):
+    """ATT&CK IDs resolve both ways, to the object of a current domain, not deprecated and most recent first."""
+    current = stix.object("attack-pattern", 1, "T0001", name="Current")
+    newer = stix.object("attack-pattern", 2, "T0001", name="Newer", modified="2024-01-01T00:00:00.000Z")
+    deprecated = stix.object("attack-pattern", 3, "T0001", name="Deprecated", x_mitre_deprecated=True)
+    revoked = stix.object("attack-pattern", 4, "T0002", revoked=True)
+    no_attack_id = stix.object("x-mitre-matrix", 1)
+    index = stixstore.AttackIdIndex(
+        [stixstore.StixStore([deprecated, current, revoked, no_attack_id])],
+        [stixstore.StixStore([newer])],
+    )
+
+    assert index.get_attack_id(current["id"]) == "T0001"
+    assert no_attack_id["id"] in index
+    assert index.get_attack_id(no_attack_id["id"]) is None
+    assert index.get_stix_ids("T0001") == [current["id"], deprecated["id"], newer["id"]]
+    assert index.get_name("T0001", stix_types=["attack-pattern"]) == "Current"
+    assert index.get_object("T0001", stix_types=["course-of-action"]) is None
+    assert index.get_object("T0002") is None
+    assert index.get_object("T0002", include_revoked=True) is revoked
+
+
+def test_revoked_by_chains_and_cycles(stix):
+    """Revoked objects map to the last object of their revoked-by chain, objects of a cycle map to nothing."""
+    first, second, last, looping, looped, into_cycle = (
+        stix.object("attack-pattern", number, f"T000{number}", revoked=number != 3) for number in range(1, 7)
+    )
+    missing = stix.object("attack-pattern", 7)
+    store = stixstore.StixStore(
+        [
+            first,
+            second,
+            last,
+            looping,
+            looped,
+            into_cycle,
+            stix.relationship(1, "revoked-by", first, second),
+            stix.relationship(2, "revoked-by", second, last),
+            stix.relationship(3, "revoked-by", looping, looped),
+            stix.relationship(4, "revoked-by", looped, looping),
+            stix.relationship(5, "revoked-by", into_cycle, looping),
+            stix.relationship(6, "revoked-by", last, missing),
+        ]
+    )
+
+    assert store.get_replacement(first["id"]) is last
+    assert store.get_replacement(second["id"]) is last
+    assert store.get_replacement(last["id"]) is None
+    assert store.get_replacement(looping["id"]) is None
+    assert store.get_replacement(looped["id"]) is None
+    assert store.get_replacement(into_cycle["id"]) is None
+
+
+def test_domains(stix):
+    """Objects belong to the domains they list, or to every domain when they list none."""
+    enterprise = stix.object("attack-pattern", 1, "T0001")
+    both = stix.object("attack-pattern", 2, "T0002", x_mitre_domains=["mobile-attack", "enterprise-attack"])
+    every_domain = stix.object("attack-pattern", 3, "T0003")
+    del every_domain["x_mitre_domains"]
+    store = stixstore.StixStore([enterprise, both, every_domain, stix.object("course-of-action", 1, "M0001")])
+
+    assert get_ids(store.get_by_domain("attack-pattern", "mobile-attack")) == [both["id"], every_domain["id"]]
+    assert store.get_by_domain("attack-pattern", "enterprise-attack") == [enterprise, both, every_domain]
+    assert store.in_domain(enterprise["id"], "enterprise-attack")
+    assert not store.in_domain(enterprise["id"], "ics-attack")
+    assert stixstore.get_domain_mask(["enterprise-attack", "unknown"]) == stixstore.get_domain_mask(
+        ["enterprise-attack"]
+    )
+    assert stixstore.get_domain_mask([]) == stixstore.get_domain_mask(list(site_config.domain_bits))
+
+
+def test_merge_objects_precedence(stix):
+    """Objects sharing an ATT&CK ID are merged to the one not deprecated, then the most recently modified."""
+    recent = "2024-01-01T00:00:00.000Z"
+    enterprise = stixstore.StixStore(
+        [
+            stix.object("malware", 1, "S0001", name="Deprecated", x_mitre_deprecated=True, modified=recent),
+            stix.object("tool", 1, "S0002", name="Old"),
+            stix.object("malware", 3, "S0003", name="First"),
+            stix.object("malware", 4, "S0004", name="Renumbered"),
+            stix.object("malware", 5, name="No ATT&CK ID"),
+        ]
+    )
+    mobile = stixstore.StixStore(
+        [
+            stix.object("malware", 11, "S0001", name="Current"),
+            stix.object("tool", 12, "S0002", name="Recent", modified=recent),
+            stix.object("malware", 13, "S0003", name="Same date"),
+            stix.object("malware", 4, "S0005", name="Renumbered recently", modified=recent),
+        ]
+    )
+
+    merged = stixstore.merge_objects([enterprise, mobile], type_groups=[("malware", "tool")])[("malware", "tool")]
+
+    assert [(stix_obj["name"], buildhelpers.get_attack_id(stix_obj)) for stix_obj in merged] == [
+        ("Current", "S0001"),
+        ("First", "S0003"),
+        ("Recent", "S0002"),
+        ("Renumbered recently", "S0005"),
+    ]
+
+    # The same objects as adding them one by one, in the same order
+    stix_objs, attack_id_objs = {}, {}
+    for store in (enterprise, mobile):
+        for stix_obj in store.get_by_type("malware") + store.get_by_type("tool"):
+            stixstore.add_replace_or_ignore(stix_objs, attack_id_objs, stix_obj)
+    assert merged == list(attack_id_objs.values())
+    assert mobile.get_merged(["malware", "tool"]) == mobile.get_by_type("malware") + mobile.get_by_type("tool")
@@ -114,6 +114,92 @@ def get_parsed_args():
         "--attack-brand", action="store_true", help="Applies ATT&CK brand colors. See also the --extras flag."
     )
     parser.add_argument("--proxy", help="set proxy")
+    parser.add_argument(
+        "--validate-stix",
+        action="store_true",
+        help=(
+            "Parse and validate every STIX object with the stix2 library when loading the bundles. "
+            "By default the bundles are loaded as plain JSON, which is much faster."
+        ),
+    )
+    parser.add_argument(
+        "--no-stix-cache",
+        action="store_true",
+        help=(
+            "Do not use the cache of loaded STIX bundles. "
+            "By default the loaded bundles are cached and reused by later builds until one of the bundles changes."
+        ),
+    )
+    parser.add_argument(
+        "--lazy-stix-text",
+        action="store_true",
+        help=(
+            "Keep the descriptions, detections, external references and note contents of STIX objects encoded "
+            "in memory until a page reads them. Lowers memory use, at the cost of decoding them on first use."
+        ),
+    )
+    parser.add_argument(
+        "--stix-cache-format",
+        choices=["pickle", "mapped"],
+        default="pickle",
+        help=(
+            "Format of the cache of loaded STIX bundles. 'mapped' writes a memory-mapped graph file that opens "
+            "without parsing anything and is read lazily, which speeds up builds of a few modules."
+        ),
+    )
+    parser.add_argument(
+        "--stream-stix",
+        action="store_true",
+        help=(
+            "Parse the STIX bundles incrementally, one object at a time, instead of decoding each bundle as a "
+            "whole. Lowers peak memory when loading large bundles, most of all with --lazy-stix-text."
+        ),
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help=(
+            "Do not download the STIX bundles, build from the copies in the download cache instead. "
+            "Fails if a bundle has never been downloaded."
+        ),
+    )
+    parser.add_argument(
+        "--module-jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help=(
+            "Run up to N independent modules at once in worker processes, each module once the modules it depends on "
+            "are done. By default the modules are run one at a time in priority order."
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help=(
+            "Generate the pages of techniques, groups, software, campaigns and mitigations with a pool of N worker "
+            "processes. The pages are the same whatever the number of jobs."
+        ),
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Keep the website of the last build and only render the pages whose inputs changed since, removing the "
+            "pages that are no longer generated. Every page is rendered when the templates or settings changed."
+        ),
+    )
+    parser.add_argument(
+        "--stix-changes",
+        action="store_true",
+        help=(
+            "Compare the STIX bundles with the bundles of the previous build and write the change sets of every "
+            "domain to changes.json in the STIX index directory. Done by default with --incremental, or once a "
+            "previous build wrote them."
+        ),
+    )
     parser.add_argument(
         "--subdirectory",
         help="If you intend to host the site from a sub-directory, specify the directory using this flag.",
@@ -169,6 +255,11 @@ def get_parsed_args():
     if not args.extras and isinstance(args.extras, list):
         args.extras = extras
 
+    # Links to the site are rewritten in place in every page for a subdirectory, which can only be done once per page
+    if args.incremental and args.subdirectory:
+        logger.warning("--incremental is not supported with --subdirectory, rendering every page")
+        args.incremental = False
+
     # Set global argument list for modules
     site_config.args = args
 
@@ -223,14 +314,15 @@ if __name__ == "__main__":
     # Init colorama for output
     colorama.init()
 
-    # Get running modules and priorities
-    for ptr in modules.run_ptr:
-        util.buildhelpers.print_start(ptr["module_name"])
-        start_time = time.time()
-        ptr["run_module"]()
-        end_time = time.time()
-        util.buildhelpers.print_end(ptr["module_name"], start_time, end_time)
-    
+    # Run modules once the modules they depend on are done
+    schedule_report = util.modulescheduler.run_modules(modules.run_ptr, jobs=args.module_jobs)
+
     # Print end of module
     update_end = time.time()
     util.buildhelpers.print_end("TOTAL Update Time", update_start, update_end)
+
+    # Print when and where modules ran and the critical path of the build
+    util.modulescheduler.log_report(schedule_report)
+
+    # Print hits, misses and compute time of the memoized STIX datasets
+    util.relationshipgetters.memo.dump_stats()